@@ -0,0 +1,252 @@
+"""
+批量分析（非交互）：多只股票 × 多个指标，读取行情 → 计算 → 保存数据 / 出图，多进程并行
+
+    python analyze.py 300100,600276 --indicator MACD --indicator "薛斯通道(N=40,M=10)"
+    python analyze.py @watchlist.txt --indicator ADX --indicator "Keltner(multiplier=1.5)" \\
+        --start 20240101 --format csv --format png --workers 8
+    python analyze.py @watchlist.txt --indicator MACD --update         # 先增量下载缺失的K线
+    python analyze.py 300100 --indicator 薛斯通道 --format png --profile  # 记录 cProfile
+
+指标总在完整历史上计算（保证预热期正确），输出时截取 [start, end]。每个 股票 × 指标 输出
+{输出目录}/{代码}_{请求标签}.{格式}：csv / json 为行情列 + 指标列，png / svg 为图表（仅限有图表模板的指标）。
+
+每个阶段（下载、读取、指标计算、绘图、保存）按股票计时，结束时在日志中输出汇总，
+并写出 JSON（默认 reports/profiles/analyze.json）。
+
+退出码：0 全部成功；1 部分失败；2 参数错误（未知指标、参数或格式）；3 全部失败
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+import typer
+
+import config
+from config import PRICE_STORE_DIR, REPORTS_DIR
+from utils.cli import parse_indicator, parse_symbols
+from profiling import PROFILE_DIR, TIMINGS, profiled_run, stage, symbol_scope
+
+ANALYSIS_DIR = REPORTS_DIR / "analysis"
+DATA_FORMATS = ('csv', 'json')
+CHART_FORMATS = ('png', 'svg')
+EXIT_OK, EXIT_PARTIAL, EXIT_USAGE, EXIT_FAILED = 0, 1, 2, 3
+app = typer.Typer()
+
+Request = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class AnalysisResult:
+    symbol: str
+    label: str
+    status: str                 # ok / failed
+    paths: List[str] = field(default_factory=list)
+    rows: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+def _analyze_symbol(task) -> List[AnalysisResult]:
+    """读取一只股票，计算全部请求的指标并保存"""
+    with symbol_scope(task[0]):
+        return _analyze(task)
+
+
+def _analyze_in_worker(task):
+    """在工作进程中执行，连同本只股票的计时记录一起交回主进程"""
+    return _analyze_symbol(task), TIMINGS.snapshot(reset=True)
+
+
+def _analyze(task) -> List[AnalysisResult]:
+    from data_processing.data_downloader import clean_filename
+    from data_processing.price_store import PriceStore
+    from indicators.pipeline import IndicatorPipeline, build_indicator, request_label
+    from visualization.batch import CHARTS, get_template
+
+    symbol, requests, store_root, start, end, output_dir, formats, dpi, width_px = task
+    labels = [request_label(build_indicator(name, params), params) for name, params in requests]
+    started = time.perf_counter()
+    try:
+        df = PriceStore(store_root).read_frame(symbol)
+        if df.empty:
+            raise ValueError("行情库中没有该股票的数据")
+        rows = df.index.slice_indexer(start, end)
+        results = IndicatorPipeline(requests).run(df)
+    except Exception as e:
+        return [AnalysisResult(symbol, label, "failed", error=f"{type(e).__name__}: {e}") for label in labels]
+    load_elapsed = (time.perf_counter() - started) / len(requests)
+
+    output = []
+    for (name, params), label in zip(requests, labels):
+        t0 = time.perf_counter()
+        try:
+            frame = df.assign(**results[label])
+            visible = frame.iloc[rows]
+            if visible.empty:
+                raise ValueError("行情库中没有该区间的数据")
+            paths = []
+            stem = Path(output_dir) / clean_filename(f"{symbol}_{label}")
+            for fmt in formats:
+                path = stem.with_name(f"{stem.name}.{fmt}")
+                if fmt in DATA_FORMATS:
+                    with stage("save", rows=len(visible)) as span:
+                        if fmt == 'csv':
+                            visible.to_csv(path, encoding='utf-8-sig')
+                        else:
+                            visible.reset_index().to_json(path, orient='records', date_format='iso',
+                                                          force_ascii=False, indent=0)
+                        span.bytes = path.stat().st_size
+                elif name in CHARTS:
+                    # 图表用完整数据渲染、只显示请求区间（降采样按可见范围计算）
+                    get_template(name, width_px).render(frame, symbol, start, end).save(path, dpi=dpi)
+                else:
+                    continue
+                paths.append(str(path))
+            output.append(AnalysisResult(symbol, label, "ok", paths, len(visible),
+                                         load_elapsed + time.perf_counter() - t0))
+        except Exception as e:
+            output.append(AnalysisResult(symbol, label, "failed", error=f"{type(e).__name__}: {e}"))
+    return output
+
+
+def analyze_batch(symbols: List[str], requests: List[Request], output_dir: Path = ANALYSIS_DIR,
+                  store_root: Path = PRICE_STORE_DIR, start: Optional[str] = None, end: Optional[str] = None,
+                  formats: Tuple[str, ...] = ('csv',), dpi: int = 100, width_px: Optional[int] = None,
+                  max_workers: Optional[int] = None, progress: bool = True) -> List[AnalysisResult]:
+    """
+    批量分析 股票 × 指标
+    :param requests: [(指标名, 参数字典), ...]，指标名须在指标注册表中
+    :param formats: 输出格式，csv / json / png / svg 的任意组合
+    :param max_workers: 进程数，1 表示在当前进程中运行，默认 CPU 核数
+    """
+    from visualization.batch import init_worker
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    symbols = list(dict.fromkeys(symbols))
+    tasks = [(symbol, requests, str(store_root), start, end, str(output_dir), tuple(formats), dpi, width_px)
+             for symbol in symbols]
+    charts = any(fmt in CHART_FORMATS for fmt in formats)
+    initializer = init_worker if charts else None
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks) or 1))
+    if max_workers == 1:
+        if initializer:
+            initializer()
+        batches = map(_analyze_symbol, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer)
+        # 每个进程连续处理一批股票，图表模板在批内复用；计时记录随结果交回并合并
+        def merged(outputs):
+            for batch, timings in outputs:
+                TIMINGS.merge(timings)
+                yield batch
+        batches = merged(executor.map(_analyze_in_worker, tasks,
+                                      chunksize=max(1, len(tasks) // (max_workers * 4))))
+
+    if progress:
+        from tqdm import tqdm
+        batches = tqdm(batches, total=len(tasks), desc="分析", unit="只")
+
+    results: List[AnalysisResult] = []
+    try:
+        for batch in batches:
+            results.extend(batch)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return results
+
+
+def exit_code(results: List[AnalysisResult]) -> int:
+    failed = sum(r.status == "failed" for r in results)
+    if not failed:
+        return EXIT_OK
+    return EXIT_FAILED if failed == len(results) else EXIT_PARTIAL
+
+
+@app.command()
+def main(
+    symbols: str = typer.Argument(..., help="股票代码，逗号分隔，或 @文件"),
+    indicator: List[str] = typer.Option(["MACD"], help="指标，如 MACD 或 \"薛斯通道(N=40,M=10)\"，可重复"),
+    start: Optional[str] = typer.Option(None, help="起始日期 YYYYMMDD"),
+    end: Optional[str] = typer.Option(None, help="结束日期 YYYYMMDD"),
+    format: List[str] = typer.Option(["csv"], help="输出格式 csv / json / png / svg，可重复"),
+    output_dir: Path = typer.Option(ANALYSIS_DIR, help="输出目录"),
+    store_root: Path = typer.Option(PRICE_STORE_DIR, help="本地行情库目录"),
+    update: bool = typer.Option(False, help="先增量下载缺失或过期的K线（从固定的历史起点下载，不受 --start 限制）"),
+    source: Optional[str] = typer.Option(None, help="--update 使用的数据源 akshare / eastmoney，默认取环境变量 STOCK_DATA_SOURCE"),
+    dpi: int = typer.Option(100),
+    width_px: Optional[int] = typer.Option(None, help="图表目标像素宽度，超过时降采样；默认取图形宽度，0 不降采样"),
+    workers: Optional[int] = typer.Option(None, help="进程数，默认 CPU 核数"),
+    progress: bool = typer.Option(True, help="显示进度条"),
+    profile: bool = typer.Option(False, help="用 cProfile 记录整个运行（在当前进程中运行，忽略 --workers）"),
+    timings: Path = typer.Option(PROFILE_DIR / "analyze.json", help="阶段计时 JSON 汇总路径"),
+):
+    from data_processing.sources import SOURCES
+    from indicators.pipeline import build_indicator
+    from visualization.batch import CHARTS
+
+    config.setup()
+    try:
+        codes = parse_symbols(symbols)
+        requests = [parse_indicator(text) for text in indicator]
+        for name, params in requests:
+            build_indicator(name, params)   # 在启动进程前检查指标名和参数
+        unknown = [fmt for fmt in format if fmt not in DATA_FORMATS + CHART_FORMATS]
+        if unknown:
+            raise ValueError(f"不支持的格式: {unknown}，可选：{', '.join(DATA_FORMATS + CHART_FORMATS)}")
+        if source is not None and source.lower() not in SOURCES:
+            raise ValueError(f"未知的数据源: {source}，可选：{', '.join(SOURCES)}")
+    except (KeyError, ValueError, TypeError, OSError, typer.BadParameter) as e:
+        logger.error(str(e).strip("'\""))
+        raise typer.Exit(code=EXIT_USAGE)
+    if not codes:
+        logger.error("没有指定股票")
+        raise typer.Exit(code=EXIT_USAGE)
+    if any(fmt in CHART_FORMATS for fmt in format):
+        no_chart = sorted({name for name, _ in requests if name not in CHARTS})
+        if no_chart:
+            logger.warning(f"{', '.join(no_chart)} 没有图表模板，只输出数据格式（有图表的指标：{', '.join(CHARTS)}）")
+
+    if profile and workers != 1:
+        logger.info("--profile：cProfile 只能记录当前进程，改为在当前进程中运行")
+        workers = 1
+
+    started = time.perf_counter()
+    with profiled_run("analyze", profile, timings) as run:
+        if update:
+            from data_processing.data_downloader import StockDataDownloader
+            from data_processing.price_store import PriceStore
+            from data_processing.sources import create_source
+            from utils.dates import get_latest_trading_day, history_start
+
+            # 下载起点与分析区间无关：指标在完整历史上计算，预热期需要区间之前的K线
+            report = StockDataDownloader(codes, history_start(start), end or get_latest_trading_day(),
+                                         store=PriceStore(store_root), source=create_source(source)).download_data()
+            logger.info(f"行情更新：{report.summary()}")
+
+        results = analyze_batch(codes, requests, output_dir, store_root, start, end,
+                                tuple(dict.fromkeys(format)), dpi, width_px, workers, progress)
+        elapsed = time.perf_counter() - started
+
+        for r in results:
+            if r.status == "failed":
+                logger.error(f"{r.symbol} {r.label}: {r.error}")
+        ok = sum(r.status == "ok" for r in results)
+        code = exit_code(results)
+        run.update(symbols=len(codes), requests=[text for text in indicator], formats=list(format),
+                   ok=ok, failed=len(results) - ok, exit_code=code)
+        log = logger.success if code == EXIT_OK else logger.warning
+        log(f"{len(codes)} 只股票 × {len(requests)} 个指标：成功 {ok}，失败 {len(results) - ok}，"
+            f"用时 {elapsed:.1f}s，输出到 {output_dir}")
+    raise typer.Exit(code=code)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,343 @@
+"""
+性能基准：TechnicalBase 原语、所有注册指标（单只股票与面板）、回测、数据加载和绘图
+
+    python benchmark.py                                  # 默认规模，结果写入 reports/benchmarks/latest.json
+    python benchmark.py --rows 1e3,1e5,1e7 --symbols 1,500,5000
+    python benchmark.py --save-baseline                  # 把本次结果保存为基线
+    python benchmark.py --threshold 0.25                 # 与基线比较，变慢超过 25% 时退出码为 1
+
+所有数据都是按固定随机种子生成的合成 OHLCV 序列，记录每个用例的耗时（多次运行取中位数）和峰值内存。
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+import gc
+import json
+from pathlib import Path
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+import warnings
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import typer
+
+import config
+from config import REPORTS_DIR
+
+BENCHMARK_DIR = REPORTS_DIR / "benchmarks"
+app = typer.Typer()
+
+
+# ---------------- 合成数据 ----------------
+
+def synthetic_ohlcv(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """几何随机游走生成的 OHLCV 数据，以 '日期' 为索引（超过日线范围时按分钟）"""
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+    spread = np.abs(rng.normal(0, 0.01, n_rows)) * close
+    open_ = close * (1 + rng.normal(0, 0.003, n_rows))
+    freq = 'D' if n_rows <= 20_000 else 'min'
+    index = pd.date_range('2000-01-01', periods=n_rows, freq=freq, name='日期')
+    return pd.DataFrame({
+        '开盘': open_,
+        '收盘': close,
+        '最高': np.maximum(open_, close) + spread,
+        '最低': np.minimum(open_, close) - spread,
+        '成交量': rng.integers(1_000, 1_000_000, n_rows),
+    }, index=index)
+
+
+def synthetic_panel(n_dates: int, n_symbols: int, seed: int = 0, suspend_rate: float = 0.02):
+    """合成面板数据，带随机停牌和参差的上市日期"""
+    from indicators.panel import Panel
+
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_dates, n_symbols)), axis=0))
+    spread = np.abs(rng.normal(0, 0.01, (n_dates, n_symbols))) * close
+    mask = rng.random((n_dates, n_symbols)) > suspend_rate
+    listing = rng.integers(0, max(1, n_dates // 4), n_symbols)
+    mask &= np.arange(n_dates)[:, None] >= listing[None, :]
+    data = {
+        '开盘': close.copy(), '收盘': close, '最高': close + spread, '最低': close - spread,
+        '成交量': rng.integers(1_000, 1_000_000, (n_dates, n_symbols)).astype(float),
+    }
+    dates = pd.date_range('2000-01-01', periods=n_dates, freq='D', name='日期')
+    return Panel(dates, [f"{i:06d}" for i in range(n_symbols)], data, mask)
+
+
+# ---------------- 测量 ----------------
+
+@dataclass
+class BenchResult:
+    name: str
+    size: int
+    repeat: int
+    time_median: float
+    time_min: float
+    peak_memory: int
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+def measure(name: str, size: int, func: Callable[[], Any], repeat: int = 3,
+            params: Optional[Dict[str, Any]] = None) -> BenchResult:
+    """先预热一次（JIT 编译、缓存加载），再运行 repeat 次记录耗时，最后单独运行一次用 tracemalloc 记录峰值内存"""
+    func()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return BenchResult(name, size, repeat, statistics.median(times), min(times), peak, params or {})
+
+
+# ---------------- 用例 ----------------
+
+def bench_primitives(rows: List[int], repeat: int) -> List[BenchResult]:
+    from indicators.technical import TechnicalBase
+
+    results = []
+    for n in rows:
+        df = synthetic_ohlcv(n)
+        alpha = pd.Series(np.full(n, 0.1), index=df.index)
+        cases = {
+            'weighted_price': lambda: TechnicalBase.weighted_price(df),
+            'volatility': lambda: TechnicalBase.volatility(df),
+            'dynamic_ma': lambda: TechnicalBase.dynamic_ma(df['收盘'], alpha),
+            'get_true_range': lambda: TechnicalBase.get_true_range(df),
+            'average_true_range': lambda: TechnicalBase.average_true_range(df),
+            'rolling_std': lambda: TechnicalBase.rolling_std(df['收盘'], 20),
+            'rolling_max': lambda: TechnicalBase.rolling_max(df['最高'], 20),
+            'wilder_smooth': lambda: TechnicalBase.wilder_smooth(df['收盘'], 14),
+        }
+        for name, func in cases.items():
+            results.append(measure(f"primitive.{name}", n, func, repeat))
+    return results
+
+
+def bench_indicators(rows: List[int], repeat: int) -> List[BenchResult]:
+    from indicators import INDICATOR_REGISTRY
+
+    results = []
+    for n in rows:
+        df = synthetic_ohlcv(n)
+        for name, cls in INDICATOR_REGISTRY.items():
+            indicator = cls.create()
+            results.append(measure(f"indicator.{name}", n, lambda: indicator.calculate(df), repeat))
+    return results
+
+
+def bench_panel(symbols: List[int], n_dates: int, repeat: int) -> List[BenchResult]:
+    from indicators import INDICATOR_REGISTRY
+
+    results = []
+    for n_symbols in symbols:
+        panel = synthetic_panel(n_dates, n_symbols)
+        for name, cls in INDICATOR_REGISTRY.items():
+            indicator = cls.create()
+            results.append(measure(f"panel.{name}", n_symbols, lambda: indicator.calculate_panel(panel),
+                                   repeat, {'dates': n_dates}))
+    return results
+
+
+def bench_backtest(symbols: List[int], n_dates: int, repeat: int) -> List[BenchResult]:
+    from indicators.backtest import backtest
+
+    entry, exit = ["MACD crosses_above Signal"], ["MACD crosses_below Signal"]
+    grid = {"MACD": {"fast_period": [8, 12], "slow_period": [21, 26]}}
+    results = []
+    for n_symbols in symbols:
+        panel = synthetic_panel(n_dates, n_symbols)
+        r = measure("backtest.macd_grid", n_symbols, lambda: backtest(panel, entry, exit, grid), repeat,
+                    {'dates': n_dates, 'combos': 4})
+        r.params['symbol_days_per_s'] = int(panel.mask.sum()) * 4 / r.time_median
+        results.append(r)
+    return results
+
+
+def bench_loading(rows: List[int], repeat: int) -> List[BenchResult]:
+    from data_processing.loader import csv_engine, load_many
+    from data_processing.price_store import PriceStore
+    from main import load_and_preprocess
+
+    def read_csv_untyped(path):
+        # 改为带类型加载器之前的读取方式：所有列、类型推断、日期保持字符串
+        return pd.read_csv(path, encoding='utf-8').set_index('日期')
+
+    def frame_bytes(df):
+        return int(df.memory_usage(deep=True).sum())
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PriceStore(Path(tmp) / "store")
+        for n in rows:
+            df = synthetic_ohlcv(n)
+            csv_path = Path(tmp) / f"{n:08d}_bench_his.csv"
+            # 与 akshare 导出的 CSV 列一致，包含加载时用不到的列
+            full = df.assign(成交额=df['收盘'] * df['成交量'], 振幅=0.0, 涨跌幅=0.0, 涨跌额=0.0, 换手率=0.0)
+            full.reset_index().to_csv(csv_path, index=False, encoding='utf-8')
+            store.write(f"{n:08d}", df)
+            cases = {
+                "load.read_csv_untyped": lambda: read_csv_untyped(csv_path),
+                "load.load_and_preprocess": lambda: load_and_preprocess(csv_path),
+                "load.load_and_preprocess_float32": lambda: load_and_preprocess(csv_path, 'float32'),
+                "load.price_store": lambda: store.read_frame(f"{n:08d}"),
+            }
+            for name, func in cases.items():
+                params = {'frame_bytes': frame_bytes(func()), 'engine': csv_engine()}
+                results.append(measure(name, n, func, repeat, params))
+
+            if n > 100_000:
+                continue
+            # 并发读取多个文件（只在较小规模上测，避免用例组耗时过长）
+            paths = [csv_path.with_name(f"{i:06d}_{csv_path.name}") for i in range(8)]
+            for path in paths:
+                path.write_bytes(csv_path.read_bytes())
+            results.append(measure("load.load_many", n, lambda: load_many(paths), repeat, {'files': len(paths)}))
+    return results
+
+
+def bench_plots(rows: List[int], repeat: int) -> List[BenchResult]:
+    import logging
+    import matplotlib
+    matplotlib.use('Agg')  # 无界面后端，plt.show() 不会阻塞
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    from matplotlib import pyplot as plt
+    from indicators import INDICATOR_REGISTRY
+    from visualization.Plot_Schaffchannel import plot_xuess_channel
+    from visualization.plot_macd import plot_macd
+    from visualization.polt_adx import plot_adx
+
+    plots = {'薛斯通道': plot_xuess_channel, 'ADX': plot_adx, 'MACD': plot_macd}
+    results = []
+    for n in rows:
+        df = synthetic_ohlcv(n)
+        for name, plot in plots.items():
+            data = INDICATOR_REGISTRY[name].create().calculate(df)
+
+            def run():
+                plot(data.copy(), "BENCH")
+                for num in plt.get_fignums():  # Agg 下 show() 不绘制，这里强制渲染
+                    plt.figure(num).canvas.draw()
+                plt.close('all')
+
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')  # 缺少中文字体等绘图警告
+                results.append(measure(f"plot.{name}", n, run, repeat))
+    return results
+
+
+# ---------------- 比较 ----------------
+
+def compare(current: List[dict], baseline: List[dict], threshold: float) -> List[dict]:
+    """返回相对基线变慢超过 threshold 的用例"""
+    base = {f"{r['name']}[{r['size']}]": r for r in baseline}
+    regressions = []
+    for r in current:
+        ref = base.get(f"{r['name']}[{r['size']}]")
+        if ref is None or ref['time_median'] <= 0:
+            continue
+        ratio = r['time_median'] / ref['time_median']
+        if ratio > 1 + threshold:
+            regressions.append({'name': r['name'], 'size': r['size'], 'ratio': ratio,
+                                'time_median': r['time_median'], 'baseline': ref['time_median']})
+    return regressions
+
+
+def _parse_sizes(text: str) -> List[int]:
+    return [int(float(x)) for x in text.split(',') if x.strip()]
+
+
+@app.command()
+def main(
+    rows: str = typer.Option("1e3,1e4,1e5", help="单只股票用例的行数，逗号分隔（支持 1e7 写法）"),
+    symbols: str = typer.Option("1,100,1000", help="面板用例的股票数，逗号分隔"),
+    panel_dates: int = typer.Option(250, help="面板用例的日期数"),
+    max_load_rows: int = typer.Option(1_000_000, help="加载用例的最大行数"),
+    max_plot_rows: int = typer.Option(100_000, help="绘图用例的最大行数"),
+    repeat: int = typer.Option(3, help="每个用例运行次数"),
+    suites: str = typer.Option("primitives,indicators,panel,backtest,loading,plots", help="要运行的用例组"),
+    output: Path = typer.Option(BENCHMARK_DIR / "latest.json", help="结果 JSON 路径"),
+    baseline: Path = typer.Option(BENCHMARK_DIR / "baseline.json", help="基线 JSON 路径"),
+    threshold: float = typer.Option(0.2, help="允许的变慢比例，超过即视为性能回退"),
+    save_baseline: bool = typer.Option(False, help="把本次结果保存为基线"),
+):
+    config.setup()
+    row_sizes = _parse_sizes(rows)
+    selected = {s.strip() for s in suites.split(',')}
+    runners = {
+        'primitives': lambda: bench_primitives(row_sizes, repeat),
+        'indicators': lambda: bench_indicators(row_sizes, repeat),
+        'panel': lambda: bench_panel(_parse_sizes(symbols), panel_dates, repeat),
+        'backtest': lambda: bench_backtest(_parse_sizes(symbols), panel_dates, repeat),
+        'loading': lambda: bench_loading([n for n in row_sizes if n <= max_load_rows], repeat),
+        'plots': lambda: bench_plots([n for n in row_sizes if n <= max_plot_rows], repeat),
+    }
+
+    results: List[BenchResult] = []
+    for suite, runner in runners.items():
+        if suite not in selected:
+            continue
+        logger.info(f"运行基准用例组: {suite}")
+        try:
+            suite_results = runner()
+        except ImportError as e:
+            logger.warning(f"跳过 {suite}：缺少依赖 ({e})")
+            continue
+        for r in suite_results:
+            resident = f"  结果占用 {r.params['frame_bytes'] / 2**20:>8.1f} MiB" if 'frame_bytes' in r.params else ""
+            if 'symbol_days_per_s' in r.params:
+                resident += f"  {r.params['symbol_days_per_s'] / 1e6:>6.2f} M 股票日/s"
+            logger.info(f"{r.key:<40} {r.time_median * 1e3:>10.2f} ms  峰值内存 {r.peak_memory / 2**20:>8.1f} MiB{resident}")
+        results.extend(suite_results)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+        },
+        'results': [asdict(r) for r in results],
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    logger.success(f"基准结果已保存: {output}")
+
+    if save_baseline:
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        logger.success(f"已保存为基线: {baseline}")
+        return
+
+    if baseline.exists():
+        ref = json.loads(baseline.read_text(encoding='utf-8'))['results']
+        regressions = compare(report['results'], ref, threshold)
+        for r in regressions:
+            logger.error(f"性能回退 {r['name']}[{r['size']}]: {r['baseline'] * 1e3:.2f} ms -> "
+                         f"{r['time_median'] * 1e3:.2f} ms (x{r['ratio']:.2f})")
+        if regressions:
+            raise typer.Exit(code=1)
+        logger.success(f"与基线相比没有超过 {threshold:.0%} 的性能回退")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,32 +1,47 @@
 from pathlib import Path
 
-from dotenv import load_dotenv
-from loguru import logger
-
-# Load environment variables from .env file if it exists
-load_dotenv()
-
 # Paths
 PROJ_ROOT = Path(__file__).resolve().parents[1]
-logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
 
 DATA_DIR = PROJ_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 INTERIM_DATA_DIR = DATA_DIR / "interim"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 EXTERNAL_DATA_DIR = DATA_DIR / "external"
+PRICE_STORE_DIR = DATA_DIR / "store"  # 按股票分区的列式行情库
+SYMBOL_CATALOG_PATH = EXTERNAL_DATA_DIR / "symbols.json"  # 股票代码/简称/交易所/上市日期
 
 MODELS_DIR = PROJ_ROOT / "models"
 
 REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
 
-# If tqdm is installed, configure loguru with tqdm.write
-# https://github.com/Delgan/loguru/issues/135
-try:
-    from tqdm import tqdm
+_initialized = False
+
+
+def setup() -> None:
+    """
+    Load .env and configure logging. Deferred so that importing config (for the paths above)
+    stays cheap; entry points call this once before doing any work.
+    """
+    global _initialized
+    if _initialized:
+        return
+    _initialized = True
+
+    from dotenv import load_dotenv
+    from loguru import logger
+
+    # Load environment variables from .env file if it exists
+    load_dotenv()
+    logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
+
+    # If tqdm is installed, configure loguru with tqdm.write
+    # https://github.com/Delgan/loguru/issues/135
+    try:
+        from tqdm import tqdm
 
-    logger.remove(0)
-    logger.add(lambda msg: tqdm.write(msg, end=""), colorize=True)
-except ModuleNotFoundError:
-    pass
+        logger.remove(0)
+        logger.add(lambda msg: tqdm.write(msg, end=""), colorize=True)
+    except ModuleNotFoundError:
+        pass
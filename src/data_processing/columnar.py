@@ -0,0 +1,119 @@
+# src/data_processing/columnar.py
+"""
+极简列式存储：一个目录即一张表，每列一个原始二进制文件（{列}.bin），
+_meta.json 记录行数与每列 dtype。读取时用 np.memmap 映射，不经过文本解析，也不复制数据。
+
+追加写入只在各列文件末尾追加字节，最后才更新 _meta.json 中的行数，
+因此中途失败时读者仍然只会看到上一次完整写入的行。
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+META_FILE = "_meta.json"
+
+
+def _column_path(path: Path, name: str) -> Path:
+    return path / f"{name}.bin"
+
+
+def read_meta(path: Path) -> Optional[dict]:
+    """读取表的元数据，表不存在时返回 None"""
+    meta_file = Path(path) / META_FILE
+    if not meta_file.exists():
+        return None
+    with open(meta_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_meta(path: Path, meta: dict) -> None:
+    tmp = path / (META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, path / META_FILE)
+
+
+def write_table(path: Path, columns: Dict[str, np.ndarray], extra: Optional[dict] = None) -> None:
+    """整表覆盖写入（先写临时文件再原子替换）"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    lengths = {len(v) for v in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"各列长度不一致：{ {k: len(v) for k, v in columns.items()} }")
+
+    for name, values in columns.items():
+        target = _column_path(path, name)
+        tmp = target.with_suffix(".bin.tmp")
+        np.ascontiguousarray(values).tofile(tmp)
+        os.replace(tmp, target)
+
+    meta = {
+        "rows": lengths.pop() if lengths else 0,
+        "columns": {name: np.asarray(values).dtype.str for name, values in columns.items()},
+    }
+    if extra:
+        meta.update(extra)
+    _write_meta(path, meta)
+
+
+def append_table(path: Path, columns: Dict[str, np.ndarray], extra: Optional[dict] = None) -> int:
+    """在表末尾追加行，表不存在时等同于 write_table；返回追加后的总行数"""
+    path = Path(path)
+    meta = read_meta(path)
+    if meta is None:
+        write_table(path, columns, extra)
+        return len(next(iter(columns.values()))) if columns else 0
+
+    if set(columns) != set(meta["columns"]):
+        raise KeyError(f"追加的列 {sorted(columns)} 与表结构 {sorted(meta['columns'])} 不一致")
+    rows = meta["rows"]
+    added = {len(v) for v in columns.values()}
+    if len(added) > 1:
+        raise ValueError("追加的各列长度不一致")
+    added = added.pop()
+
+    for name, values in columns.items():
+        dtype = np.dtype(meta["columns"][name])
+        target = _column_path(path, name)
+        with open(target, "r+b" if target.exists() else "wb") as f:
+            # 截掉上次失败追加可能留下的多余字节
+            f.truncate(rows * dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            np.ascontiguousarray(values, dtype=dtype).tofile(f)
+
+    meta["rows"] = rows + added
+    if extra:
+        meta.update(extra)
+    _write_meta(path, meta)
+    return meta["rows"]
+
+
+def read_table(path: Path, columns: Optional[Iterable[str]] = None,
+               mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    读取表的列
+    :param columns: 需要的列，默认全部
+    :param mmap: True 返回只读 memmap（零拷贝），False 读入内存
+    """
+    path = Path(path)
+    meta = read_meta(path)
+    if meta is None:
+        raise FileNotFoundError(f"列式表 {path} 不存在")
+    rows = meta["rows"]
+    names = list(columns) if columns is not None else list(meta["columns"])
+
+    result = {}
+    for name in names:
+        if name not in meta["columns"]:
+            raise KeyError(f"表 {path} 中没有列 {name}")
+        dtype = np.dtype(meta["columns"][name])
+        if rows == 0:
+            result[name] = np.empty(0, dtype=dtype)
+        elif mmap:
+            result[name] = np.memmap(_column_path(path, name), dtype=dtype, mode="r", shape=(rows,))
+        else:
+            result[name] = np.fromfile(_column_path(path, name), dtype=dtype, count=rows)
+    return result
@@ -1,10 +1,21 @@
-import akshare as ak
-import pandas as pd
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+import random
 import re
+import time
 from pathlib import Path
-from typing import List, Union
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from typing import Callable, List, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+import pandas as pd
+
+from profiling import stage
+from .price_store import PriceStore
+from .sources import DataSource, DataSourceError, create_source
+from .symbol_catalog import SymbolCatalog, get_catalog
+
+T = TypeVar('T')
 
 def clean_filename(name: str) -> str:
     """清理文件名中的非法字符"""
@@ -19,64 +30,296 @@ def get_stock_type(symbol: str) -> str:
     else:
         return 'us'  # 美股
 
-def get_filename(symbol: str, name: str, end_date: str) -> str:
-    """生成符合要求的文件名"""
+def get_filename(symbol: str, name: Optional[str], end_date: str) -> str:
+    """生成符合要求的文件名（name 为 None 时从本地股票目录查询简称）"""
     stock_type = get_stock_type(symbol)
     
     if stock_type in ['sh', 'sz']:
+        if name is None:
+            name = clean_filename(get_catalog().name(symbol))
         return f"{symbol}_{name}_his_{end_date}.csv"
     else:
         return f"{symbol}_his_{end_date}.csv"
 
+
+class TokenBucket:
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        """
+        令牌桶限速
+        :param rate: 平均每秒允许的请求数，None 或 <=0 表示不限速
+        :param capacity: 桶容量（允许的突发请求数），默认 max(1, rate)
+        """
+        self.rate = rate if rate and rate > 0 else None
+        self.capacity = capacity or max(1.0, self.rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """取一个令牌，桶空时等待"""
+        if self.rate is None:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = 3        # 首次请求之外最多重试的次数
+    base_delay: float = 1.0     # 第一次重试前的等待（秒），之后每次翻倍
+    max_delay: float = 30.0
+    jitter: float = 0.5         # 在等待时间上随机增加的比例，避免大量请求同时重试
+    non_retryable: Tuple[type, ...] = (DataSourceError, NotImplementedError)
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次重试（从 0 开始）前的等待时间"""
+        return min(self.max_delay, self.base_delay * 2 ** attempt) * (1 + self.jitter * random.random())
+
+
+@dataclass
+class DownloadResult:
+    symbol: str
+    status: str = "pending"     # updated / rewritten / up_to_date / failed
+    rows_added: int = 0
+    rows_total: int = 0
+    attempts: int = 0           # 实际发出的请求次数（含重试）
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    csv_path: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+
+@dataclass
+class DownloadReport:
+    results: List[DownloadResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> List[DownloadResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[DownloadResult]:
+        return [r for r in self.results if not r.ok]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([asdict(r) for r in self.results])
+
+    def summary(self) -> str:
+        counts = self.to_frame()['status'].value_counts().to_dict() if self.results else {}
+        parts = ", ".join(f"{status} {n}" for status, n in counts.items())
+        return f"共 {len(self.results)} 只股票，用时 {self.elapsed:.1f} 秒：{parts}"
+
+
 class StockDataDownloader:
-    def __init__(self, symbols: Union[str, List[str]], start_date: str, end_date: str):
+    def __init__(self, symbols: Union[str, List[str]], start_date: str, end_date: str,
+                 store: PriceStore = None, save_csv: bool = False, source: DataSource = None,
+                 max_concurrency: int = 8, rate_limit: Optional[float] = 5.0,
+                 retry: RetryPolicy = None, catalog: SymbolCatalog = None):
         """
         :param symbols: 单个股票代码或股票代码列表
         :param start_date: 起始日期 (YYYYMMDD)
         :param end_date: 结束日期 (YYYYMMDD)
+        :param store: 本地行情库，默认 config.PRICE_STORE_DIR
+        :param save_csv: 是否额外导出旧格式的 CSV 文件到 data/
+        :param source: 数据源，默认由 create_source() 按环境变量 STOCK_DATA_SOURCE 选择（首次请求时创建）
+        :param max_concurrency: 同时进行中的股票数（也是执行请求的线程数）
+        :param rate_limit: 每秒最多发出的请求数，None 表示不限速
+        :param retry: 失败重试策略
+        :param catalog: 股票元数据目录（导出 CSV 时查询简称），默认使用共享目录；指定了 source 时用同一数据源
         """
         self.symbols = [symbols] if isinstance(symbols, str) else symbols
         self.start_date = start_date
         self.end_date = end_date
+        self.store = store if store is not None else PriceStore()
+        self.save_csv = save_csv
+        self._source = source
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limit = rate_limit
+        self.retry = retry or RetryPolicy()
+        self._catalog = catalog
         self.data_dir = Path("data")
-        self.data_dir.mkdir(exist_ok=True)
+        if save_csv:
+            self.data_dir.mkdir(exist_ok=True)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._bucket: Optional[TokenBucket] = None
 
-    def _download_single(self, symbol: str) -> None:
-        """下载单个股票数据"""
-        try:
-            stock_type = get_stock_type(symbol)
-            
-            if stock_type == 'us':
-                # 美股数据下载
-                df = ak.stock_us_daily(symbol=symbol)
+    @property
+    def source(self) -> DataSource:
+        if self._source is None:
+            self._source = create_source()
+        return self._source
+
+    @property
+    def catalog(self) -> SymbolCatalog:
+        if self._catalog is None:
+            self._catalog = get_catalog() if self._source is None else SymbolCatalog(source=self._source)
+        return self._catalog
+
+    def _plan_update(self, symbol: str) -> Optional[Tuple[str, bool]]:
+        """
+        根据行情库中已有的数据决定请求范围
+        :return: None 表示已是最新无需请求；否则为 (请求起始日期 YYYYMMDD, 是否全量重写)
+        """
+        date_range = self.store.date_range(symbol)
+        if date_range is None:
+            return self.start_date, True
+        last = date_range[1]
+        if self.store.history_start(symbol) > pd.Timestamp(self.start_date):
+            # 库中历史比要求的起始日期短，重新拉取全量
+            return self.start_date, True
+        if last >= pd.Timestamp(self.end_date):
+            return None
+        # 多请求最后一根已存储的K线，用于校验复权价格是否变化
+        return last.strftime('%Y%m%d'), False
+
+    def _write_full(self, symbol: str, df: pd.DataFrame, start: Optional[str] = None) -> int:
+        """全量覆盖写入，返回相对原有数据的新增行数"""
+        rows_before = self.store.rows(symbol)
+        return self.store.write(symbol, df, start=start) - rows_before
+
+    def _merge_tail(self, symbol: str, tail: pd.DataFrame) -> Optional[int]:
+        """
+        将增量数据合并进行情库，返回新增行数。
+        前复权价格在除权除息后会整体变化：重叠那根K线的收盘价对不上时返回 None，由调用方重新拉取全量历史。
+        """
+        last = self.store.last_date(symbol)
+        if last is None:
+            return self.store.write(symbol, tail, start=self.start_date)
+
+        overlap = tail[pd.to_datetime(tail['日期']) == last]
+        stored_close = self.store.read_arrays(symbol, start=last, end=last, columns=['收盘'])['收盘']
+        if len(overlap) and len(stored_close) and not np.isclose(overlap['收盘'].iloc[-1], stored_close[-1]):
+            return None
+        return self.store.append(symbol, tail)
+
+    def _export_csv(self, symbol: str, stock_name: str) -> Path:
+        filename = get_filename(symbol, clean_filename(stock_name), self.end_date)
+        filepath = self.data_dir / filename
+        self.store.read_frame(symbol).reset_index().to_csv(filepath, index=False, encoding="utf_8_sig")
+        return filepath
+
+    # ---------------- 异步调度 ----------------
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        """在下载线程池中执行阻塞调用；同一线程上的数据源会复用自己的 HTTP 连接"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _fetch(self, result: DownloadResult, func: Callable[..., T], *args,
+                     stage_name: Optional[str] = "download") -> T:
+        """
+        限速并按指数退避重试地调用数据源
+        :param stage_name: 计时阶段名（只计请求本身，不含限速等待），None 表示由 func 自己计时
+        """
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            result.attempts += 1
+            try:
+                if stage_name is None:
+                    return await self._run(func, *args)
+                with stage(stage_name, result.symbol) as span:
+                    value = await self._run(func, *args)
+                    if isinstance(value, pd.DataFrame):
+                        span.rows, span.bytes = len(value), int(value.memory_usage(deep=True).sum())
+                return value
+            except self.retry.non_retryable:
+                raise
+            except Exception as e:
+                if attempt >= self.retry.max_retries:
+                    raise
+                delay = self.retry.delay(attempt)
+                attempt += 1
+                print(f"⚠️ {result.symbol} 第 {attempt} 次请求失败（{e}），{delay:.1f} 秒后重试")
+                await asyncio.sleep(delay)
+
+    async def _update_symbol(self, symbol: str, result: DownloadResult) -> None:
+        if get_stock_type(symbol) == 'us':
+            # 美股接口不支持指定日期范围，每次全量覆盖
+            df = await self._fetch(result, self.source.fetch_us_daily, symbol)
+            result.rows_added = await self._run(self._write_full, symbol, df)
+            result.status = "rewritten"
+            result.rows_total = self.store.rows(symbol)
+            return
+
+        plan = self._plan_update(symbol)
+        if plan is None:
+            result.status = "up_to_date"
+            result.rows_total = self.store.rows(symbol)
+            return
+
+        start_date, full = plan
+        if not full:
+            tail = await self._fetch(result, self.source.fetch_hist, symbol, start_date, self.end_date)
+            added = await self._run(self._merge_tail, symbol, tail)
+            if added is None:
+                print(f"🔄 {symbol} 复权价格已变化，重新下载全量历史")
+                full = True
             else:
-                # A股数据下载
-                stock_info = ak.stock_individual_info_em(symbol=symbol)
-                stock_name = stock_info[stock_info['item'] == '股票简称']['value'].values[0]
-                cleaned_name = clean_filename(stock_name)
-                
-                df = ak.stock_zh_a_hist(
-                    symbol=symbol,
-                    period="daily",
-                    start_date=self.start_date,
-                    end_date=self.end_date,
-                    adjust="qfq"
-                )
-                
-                filename = get_filename(symbol, cleaned_name, self.end_date)
-                filepath = self.data_dir / filename
-                df.to_csv(filepath, index=False, encoding="utf_8_sig")
-                print(f"✅ 成功保存: {filepath}")
-                
-        except Exception as e:
-            print(f"❌ 下载失败 {symbol}: {str(e)}")
-
-    def download_data(self) -> None:
-        """批量下载股票历史数据"""
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self._download_single, symbol) for symbol in self.symbols]
-            for future in as_completed(futures):
-                future.result()
+                result.rows_added, result.status = added, "updated"
+        if full:
+            df = await self._fetch(result, self.source.fetch_hist, symbol, self.start_date, self.end_date)
+            result.rows_added = await self._run(self._write_full, symbol, df, self.start_date)
+            result.status = "rewritten"
+        result.rows_total = self.store.rows(symbol)
+
+        if self.save_csv:
+            info = self.catalog.get(symbol, fetch_missing=False)
+            if info is None:  # 目录中没有（如新股），单独请求一次并写回目录
+                info = await self._fetch(result, self.catalog.get, symbol, stage_name=None)
+            result.csv_path = str(await self._run(self._export_csv, symbol, info.name))
+
+    async def _download_one(self, symbol: str, semaphore: asyncio.Semaphore) -> DownloadResult:
+        result = DownloadResult(symbol)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await self._update_symbol(symbol, result)
+            except Exception as e:
+                result.status, result.error = "failed", f"{type(e).__name__}: {e}"
+            result.elapsed = time.perf_counter() - start
+
+        if result.status == "failed":
+            print(f"❌ 下载失败 {symbol}（{result.attempts} 次请求）: {result.error}")
+        elif result.status == "up_to_date":
+            print(f"⏭️ 已是最新: {symbol}")
+        else:
+            print(f"✅ 成功保存: {symbol} 新增 {result.rows_added} 条，共 {result.rows_total} 条")
+        return result
+
+    async def download_async(self) -> DownloadReport:
+        """并发下载所有股票（已在事件循环中时使用，例如 Jupyter）"""
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.rate_limit)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix="downloader")
+        try:
+            if self.save_csv:
+                await self._run(self.catalog.ensure_fresh)  # 一次全市场列表请求，之后按代码 O(1) 查询
+            results = await asyncio.gather(*(self._download_one(s, semaphore) for s in self.symbols))
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        report = DownloadReport(list(results), time.perf_counter() - start)
+        print(f"📊 {report.summary()}")
+        return report
+
+    def download_data(self) -> DownloadReport:
+        """批量下载股票历史数据，返回每只股票的下载结果"""
+        return asyncio.run(self.download_async())
 
 # 配置示例
 if __name__ == "__main__":
@@ -86,4 +329,6 @@ if __name__ == "__main__":
         "end_date": "20250314"
     }
     downloader = StockDataDownloader(**config)
-    downloader.download_data()
+    report = downloader.download_data()
+    if report.failed:
+        print(report.to_frame().query("status == 'failed'"))
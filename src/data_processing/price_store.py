@@ -0,0 +1,195 @@
+# src/data_processing/price_store.py
+"""
+本地行情库：按股票代码分区的列式存储，取代 data/ 下每天一份的全量 CSV。
+
+    data/store/300100/date.bin, open.bin, close.bin, ... , _meta.json
+
+日线只追加写入；读取返回 DataFrame 或零拷贝的 numpy 数组。
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+
+from config import PRICE_STORE_DIR
+from profiling import stage
+from .columnar import META_FILE, append_table, read_meta, read_table, write_table
+
+# 列名: (磁盘文件名, dtype)
+PRICE_SCHEMA = {
+    '日期': ('date', 'datetime64[D]'),
+    '开盘': ('open', 'float64'),
+    '收盘': ('close', 'float64'),
+    '最高': ('high', 'float64'),
+    '最低': ('low', 'float64'),
+    '成交量': ('volume', 'int64'),
+}
+FIELD_TO_COLUMN = {field: col for col, (field, _) in PRICE_SCHEMA.items()}
+
+DateLike = Union[str, pd.Timestamp, np.datetime64, None]
+
+
+def _to_day(value: DateLike) -> Optional[np.datetime64]:
+    if value is None:
+        return None
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+def normalize_prices(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    将 akshare / CSV 格式的行情数据转换为符合 PRICE_SCHEMA 的列数组（按日期排序、去重）
+    成交量为整数列无法存 NaN，缺失的成交量按 0 写入并记录警告
+    """
+    if '日期' not in df.columns and df.index.name == '日期':
+        df = df.reset_index()
+    missing = [col for col in PRICE_SCHEMA if col not in df.columns]
+    if missing:
+        raise KeyError(f"行情数据缺少列：{missing}")
+
+    dates = pd.to_datetime(df['日期']).values.astype('datetime64[D]')
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    # 同一日期出现多次时保留最后一条
+    keep = np.ones(len(dates), dtype=bool)
+    keep[:-1] = dates[1:] != dates[:-1]
+
+    columns = {}
+    for col, (field, dtype) in PRICE_SCHEMA.items():
+        if col == '日期':
+            values = dates
+        else:
+            values = df[col].to_numpy()[order]
+            if dtype == 'int64':
+                values = values.astype('float64')
+                missing_count = int(np.isnan(values[keep]).sum())
+                if missing_count:
+                    first = pd.Timestamp(dates[keep][np.isnan(values[keep])][0]).date()
+                    logger.warning(f"{col}有 {missing_count} 个缺失值（首个在 {first}），按 0 写入")
+                values = np.nan_to_num(values).round()
+            values = values.astype(dtype)
+        columns[field] = values[keep]
+    return columns
+
+
+class PriceStore:
+    def __init__(self, root: Path = PRICE_STORE_DIR):
+        """
+        :param root: 行情库根目录，每只股票一个子目录
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, symbol: str) -> Path:
+        return self.root / symbol
+
+    def symbols(self) -> List[str]:
+        """库中已有的股票代码"""
+        return sorted(p.name for p in self.root.iterdir() if read_meta(p) is not None)
+
+    def has(self, symbol: str) -> bool:
+        return read_meta(self._path(symbol)) is not None
+
+    def rows(self, symbol: str) -> int:
+        meta = read_meta(self._path(symbol))
+        return meta["rows"] if meta else 0
+
+    def version(self, symbol: str) -> Optional[str]:
+        """数据版本（行数 + 元数据修改时间），每次写入或追加后都会改变，无数据时返回 None"""
+        path = self._path(symbol)
+        meta = read_meta(path)
+        if meta is None:
+            return None
+        return f"{meta['rows']}:{(path / META_FILE).stat().st_mtime_ns}"
+
+    def date_range(self, symbol: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """已存储K线的 (首日, 末日)，无数据时返回 None"""
+        if not self.rows(symbol):
+            return None
+        dates = read_table(self._path(symbol), ['date'])['date']
+        return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+    def last_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        """最后一根已存储K线的日期，无数据时返回 None"""
+        date_range = self.date_range(symbol)
+        return date_range[1] if date_range else None
+
+    def history_start(self, symbol: str) -> Optional[pd.Timestamp]:
+        """写入全量历史时请求的起始日期（早于首根K线时说明之前本就没有交易），无数据时返回 None"""
+        meta = read_meta(self._path(symbol))
+        if not meta:
+            return None
+        if meta.get("start"):
+            return pd.Timestamp(meta["start"])
+        date_range = self.date_range(symbol)
+        return date_range[0] if date_range else None
+
+    def write(self, symbol: str, df: pd.DataFrame, start: DateLike = None) -> int:
+        """
+        用 df 覆盖该股票的全部历史，返回行数
+        :param start: 这份历史请求的起始日期，记录在元数据中供增量更新判断
+        """
+        columns = normalize_prices(df)
+        extra = {"start": str(_to_day(start))} if start is not None else None
+        write_table(self._path(symbol), columns, extra)
+        return len(columns['date'])
+
+    def append(self, symbol: str, df: pd.DataFrame) -> int:
+        """追加最后存储日期之后的新K线（更早或重复的日期被忽略），返回实际追加的行数"""
+        columns = normalize_prices(df)
+        last = self.last_date(symbol)
+        if last is not None:
+            newer = columns['date'] > _to_day(last)
+            columns = {k: v[newer] for k, v in columns.items()}
+        added = len(columns['date'])
+        if added:
+            append_table(self._path(symbol), columns)
+        return added
+
+    def read_arrays(self, symbol: str, start: DateLike = None, end: DateLike = None,
+                    columns: Optional[Iterable[str]] = None,
+                    mmap: bool = True, tail: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        读取 [start, end] 区间的列数组
+        :param columns: 中文列名，默认全部；结果总是包含 '日期'
+        :param mmap: True 返回 memmap 切片（零拷贝、只读，每列占用一个文件句柄），False 读入内存
+        :param tail: 只取区间内最后 tail 根K线
+        """
+        fields = ['date'] + [PRICE_SCHEMA[c][0] for c in (columns or PRICE_SCHEMA) if c != '日期']
+        with stage("load", symbol) as span:
+            arrays = read_table(self._path(symbol), fields, mmap=mmap)
+            dates = arrays['date']
+            lo = 0 if start is None else np.searchsorted(dates, _to_day(start), side='left')
+            hi = len(dates) if end is None else np.searchsorted(dates, _to_day(end), side='right')
+            if tail is not None:
+                lo = max(lo, hi - tail)
+            result = {FIELD_TO_COLUMN[f]: arr[lo:hi] for f, arr in arrays.items()}
+            span.rows = int(hi - lo)
+            span.bytes = sum(arr.nbytes for arr in result.values())
+        return result
+
+    def read_frame(self, symbol: str, start: DateLike = None, end: DateLike = None,
+                   columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """读取为以 '日期'（DatetimeIndex）为索引的 DataFrame"""
+        arrays = self.read_arrays(symbol, start, end, columns, mmap=False)
+        index = pd.DatetimeIndex(arrays.pop('日期').astype('datetime64[ns]'), name='日期')
+        return pd.DataFrame(arrays, index=index, copy=False)
+
+    def read_many(self, symbols: Iterable[str], start: DateLike = None, end: DateLike = None,
+                  columns: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+        """批量读取，库中不存在的股票会被跳过"""
+        return {
+            symbol: self.read_frame(symbol, start, end, columns)
+            for symbol in symbols if self.has(symbol)
+        }
+
+    def import_csv(self, filepath: Path, symbol: Optional[str] = None) -> int:
+        """
+        导入旧版 {symbol}_{name}_his_{end_date}.csv 文件（覆盖写入），返回行数
+        :param symbol: 默认从文件名开头的代码推断
+        """
+        from .loader import load_ohlcv, symbol_from_filename
+        if symbol is None:
+            symbol = symbol_from_filename(filepath)
+        return self.write(symbol, load_ohlcv(filepath))
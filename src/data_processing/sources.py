@@ -0,0 +1,236 @@
+# src/data_processing/sources.py
+"""
+行情数据源接口
+
+下载器只通过 DataSource 取数据，便于替换实现或在测试中指向本地的假服务：
+
+- AkshareSource：直接调用 akshare（默认）
+- EastmoneySource：按 akshare 的方式直接请求东方财富 K 线接口，每个线程复用一个 requests.Session
+  （保持 HTTP 长连接）；base_url 可指向本地的假服务器
+
+未显式传入数据源时由 create_source() 创建：命令行 --source > 环境变量 STOCK_DATA_SOURCE（akshare / eastmoney，
+可写在 .env 中）> akshare；STOCK_DATA_SOURCE_URL 指定 eastmoney 的接口地址。
+"""
+from abc import ABC, abstractmethod
+import os
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+HIST_COLUMNS = ['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
+US_COLUMNS = {'date': '日期', 'open': '开盘', 'high': '最高', 'low': '最低', 'close': '收盘', 'volume': '成交量'}
+ADJUST_CODES = {'': '0', 'qfq': '1', 'hfq': '2'}
+LISTING_COLUMNS = ['代码', '股票简称', '交易所', '上市日期']
+
+
+class DataSourceError(Exception):
+    """数据源返回了无法使用的结果（非网络错误）"""
+
+
+class DataSource(ABC):
+    @abstractmethod
+    def fetch_hist(self, symbol: str, start_date: str, end_date: str, adjust: str = "qfq") -> pd.DataFrame:
+        """A股日线，列名与 ak.stock_zh_a_hist 一致（至少包含 日期/开盘/收盘/最高/最低/成交量）"""
+
+    def fetch_us_daily(self, symbol: str) -> pd.DataFrame:
+        """美股日线，列名同 fetch_hist"""
+        raise NotImplementedError(f"{type(self).__name__} 不支持美股数据")
+
+    def fetch_name(self, symbol: str) -> str:
+        """股票简称"""
+        raise NotImplementedError(f"{type(self).__name__} 不支持查询股票简称")
+
+    def fetch_listing(self) -> pd.DataFrame:
+        """全市场A股列表，列为 LISTING_COLUMNS（交易所为 sh/sz/bj，上市日期为 YYYYMMDD 或空）"""
+        raise NotImplementedError(f"{type(self).__name__} 不支持查询股票列表")
+
+    def close(self) -> None:
+        """释放连接等资源"""
+
+
+class AkshareSource(DataSource):
+    def __init__(self):
+        import akshare as ak
+        self.ak = ak
+
+    def fetch_hist(self, symbol: str, start_date: str, end_date: str, adjust: str = "qfq") -> pd.DataFrame:
+        return self.ak.stock_zh_a_hist(
+            symbol=symbol,
+            period="daily",
+            start_date=start_date,
+            end_date=end_date,
+            adjust=adjust
+        )
+
+    def fetch_us_daily(self, symbol: str) -> pd.DataFrame:
+        return self.ak.stock_us_daily(symbol=symbol).rename(columns=US_COLUMNS)
+
+    def fetch_name(self, symbol: str) -> str:
+        stock_info = self.ak.stock_individual_info_em(symbol=symbol)
+        return stock_info[stock_info['item'] == '股票简称']['value'].values[0]
+
+    def fetch_listing(self) -> pd.DataFrame:
+        # akshare 没有带上市日期的全市场单一接口，按交易所各取一次
+        frames = []
+        for board in ("主板A股", "科创板"):
+            df = self.ak.stock_info_sh_name_code(symbol=board)
+            frames.append(_listing(df, '证券代码', '证券简称', '上市日期', 'sh'))
+        df = self.ak.stock_info_sz_name_code(symbol="A股列表")
+        frames.append(_listing(df, 'A股代码', 'A股简称', 'A股上市日期', 'sz'))
+        df = self.ak.stock_info_bj_name_code()
+        frames.append(_listing(df, '证券代码', '证券简称', '上市日期', 'bj'))
+        return pd.concat(frames, ignore_index=True)
+
+
+def _listing(df: pd.DataFrame, code_col: str, name_col: str, date_col: str, exchange: str) -> pd.DataFrame:
+    """把各交易所列表整理为 LISTING_COLUMNS"""
+    dates = pd.to_datetime(df[date_col], errors='coerce')
+    return pd.DataFrame({
+        '代码': df[code_col].astype(str).str.zfill(6),
+        '股票简称': df[name_col].astype(str).str.replace(' ', ''),
+        '交易所': exchange,
+        '上市日期': dates.dt.strftime('%Y%m%d').fillna(''),
+    })
+
+
+def market_code(symbol: str) -> str:
+    """东方财富 secid 中的市场代码：上交所 1，深交所/北交所 0"""
+    return '1' if symbol.startswith(('6', '9')) else '0'
+
+
+class EastmoneySource(DataSource):
+    DEFAULT_BASE_URL = "https://push2his.eastmoney.com"
+    KLINE_PATH = "/api/qt/stock/kline/get"
+    INFO_PATH = "/api/qt/stock/get"
+    LIST_URL = "https://82.push2.eastmoney.com/api/qt/clist/get"
+    EXCHANGES = {'1': 'sh', '0': 'sz'}
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, timeout: float = 15.0,
+                 headers: Optional[Dict[str, str]] = None, list_url: Optional[str] = None):
+        """
+        :param base_url: 接口地址，测试时可指向本地假服务器，如 http://127.0.0.1:8000
+        :param timeout: 单次请求超时（秒）
+        :param list_url: 股票列表接口地址，默认在指定 base_url 时使用 base_url 下的同一路径
+        """
+        self.base_url = base_url.rstrip('/')
+        if list_url is None:
+            list_url = self.LIST_URL if base_url == self.DEFAULT_BASE_URL else self.base_url + "/api/qt/clist/get"
+        self.list_url = list_url
+        self.timeout = timeout
+        self.headers = headers or {"User-Agent": "Mozilla/5.0"}
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """当前线程的 Session，首次使用时创建，之后复用同一个连接池"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _get_json(self, path: str, params: Dict[str, str]) -> dict:
+        url = path if path.startswith('http') else self.base_url + path
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_hist(self, symbol: str, start_date: str, end_date: str, adjust: str = "qfq") -> pd.DataFrame:
+        payload = self._get_json(self.KLINE_PATH, {
+            "fields1": "f1,f2,f3,f4,f5,f6",
+            "fields2": "f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61",
+            "ut": "7eea3edcaed734bea9cbfc24409ed989",
+            "klt": "101",
+            "fqt": ADJUST_CODES[adjust],
+            "secid": f"{market_code(symbol)}.{symbol}",
+            "beg": start_date,
+            "end": end_date,
+        })
+        data = payload.get("data") or {}
+        klines = data.get("klines")
+        if klines is None:
+            raise DataSourceError(f"{symbol} 没有返回K线数据")
+        df = pd.DataFrame([line.split(',') for line in klines], columns=HIST_COLUMNS)
+        numeric = HIST_COLUMNS[1:]
+        df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce')
+        df.insert(1, '股票代码', symbol)
+        return df
+
+    def fetch_name(self, symbol: str) -> str:
+        payload = self._get_json(self.INFO_PATH, {
+            "ut": "fa5fd1943c7b386f172d6893dbfba10b",
+            "fltt": "2",
+            "invt": "2",
+            "fields": "f57,f58",
+            "secid": f"{market_code(symbol)}.{symbol}",
+        })
+        data = payload.get("data") or {}
+        if not data.get("f58"):
+            raise DataSourceError(f"{symbol} 没有返回股票简称")
+        return data["f58"]
+
+    def fetch_listing(self) -> pd.DataFrame:
+        # 一次请求取回沪深京全部A股：f12 代码、f13 市场、f14 名称、f26 上市日期
+        payload = self._get_json(self.list_url, {
+            "pn": "1",
+            "pz": "50000",
+            "po": "1",
+            "np": "1",
+            "ut": "bd1d9ddb04089700cf9c27f6f7426281",
+            "fltt": "2",
+            "invt": "2",
+            "fid": "f12",
+            "fs": "m:0 t:6,m:0 t:80,m:1 t:2,m:1 t:23,m:0 t:81 s:2048",
+            "fields": "f12,f13,f14,f26",
+        })
+        rows = ((payload.get("data") or {}).get("diff")) or []
+        if not rows:
+            raise DataSourceError("股票列表为空")
+        if isinstance(rows, dict):
+            rows = list(rows.values())
+        df = pd.DataFrame(rows)
+        exchange = df['f13'].astype(str).map(self.EXCHANGES)
+        # 北交所代码以 4/8/92 开头，市场代码与深交所相同
+        exchange[df['f12'].astype(str).str.match(r'^(4|8|92)')] = 'bj'
+        dates = pd.to_datetime(df['f26'].astype(str), format='%Y%m%d', errors='coerce')
+        return pd.DataFrame({
+            '代码': df['f12'].astype(str),
+            '股票简称': df['f14'].astype(str),
+            '交易所': exchange.fillna(''),
+            '上市日期': dates.dt.strftime('%Y%m%d').fillna(''),
+        })
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        self._local = threading.local()
+
+
+SOURCES = {
+    'akshare': AkshareSource,
+    'eastmoney': EastmoneySource,
+}
+
+
+def create_source(name: Optional[str] = None, base_url: Optional[str] = None) -> DataSource:
+    """
+    按名称创建数据源
+    :param name: SOURCES 中的名称，默认取环境变量 STOCK_DATA_SOURCE，未设置时为 akshare
+    :param base_url: eastmoney 的接口地址，默认取环境变量 STOCK_DATA_SOURCE_URL
+    """
+    name = (name or os.getenv("STOCK_DATA_SOURCE") or "akshare").lower()
+    if name not in SOURCES:
+        raise ValueError(f"未知的数据源: {name}，可选：{', '.join(SOURCES)}")
+    base_url = base_url or os.getenv("STOCK_DATA_SOURCE_URL")
+    if name == 'eastmoney' and base_url:
+        return EastmoneySource(base_url=base_url)
+    return SOURCES[name]()
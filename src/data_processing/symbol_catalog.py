@@ -0,0 +1,176 @@
+# src/data_processing/symbol_catalog.py
+"""
+本地股票元数据目录：代码 -> 股票简称、交易所、上市日期
+
+    catalog = get_catalog()
+    catalog.name("300100")        # O(1) 字典查询，不再每次调用 stock_individual_info_em
+
+整个目录由一次全市场列表请求批量刷新，保存为 config.SYMBOL_CATALOG_PATH 下的 JSON；
+超过 ttl 后下次查询时自动刷新。列表里没有的代码（例如新股）才单独请求一次并写回目录。
+"""
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Dict, Iterator, Optional
+
+from config import SYMBOL_CATALOG_PATH
+from profiling import stage
+from .sources import DataSource, LISTING_COLUMNS, create_source
+
+DEFAULT_TTL = timedelta(days=1)
+RETRY_INTERVAL = timedelta(minutes=10)  # 刷新失败后，在此期间内继续使用旧目录而不再请求
+
+
+@dataclass
+class SymbolInfo:
+    code: str
+    name: str
+    exchange: str = ""
+    list_date: str = ""         # YYYYMMDD，未知时为空
+    updated: str = ""           # 该条目最后一次从数据源更新的时间（ISO 格式）
+
+
+class SymbolCatalog:
+    def __init__(self, path: Path = SYMBOL_CATALOG_PATH, ttl: timedelta = DEFAULT_TTL,
+                 source: DataSource = None):
+        """
+        :param path: 目录文件路径
+        :param ttl: 批量刷新的有效期，超过后下次查询时重新拉取全市场列表
+        :param source: 数据源，默认由 create_source() 按环境变量 STOCK_DATA_SOURCE 选择（首次刷新时创建）
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self._source = source
+        self._lock = threading.RLock()
+        self._symbols: Dict[str, SymbolInfo] = {}
+        self.refreshed_at: Optional[datetime] = None
+        self._retry_at: Optional[datetime] = None
+        self._load()
+
+    @property
+    def source(self) -> DataSource:
+        if self._source is None:
+            self._source = create_source()
+        return self._source
+
+    # ---------------- 持久化 ----------------
+
+    def _load(self) -> None:
+        try:
+            payload = json.loads(self.path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return
+        self._symbols = {code: SymbolInfo(**info) for code, info in payload.get('symbols', {}).items()}
+        if payload.get('refreshed_at'):
+            self.refreshed_at = datetime.fromisoformat(payload['refreshed_at'])
+
+    def save(self) -> None:
+        payload = {
+            'refreshed_at': self.refreshed_at.isoformat(timespec='seconds') if self.refreshed_at else None,
+            'symbols': {code: asdict(info) for code, info in self._symbols.items()},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    # ---------------- 刷新 ----------------
+
+    def is_stale(self) -> bool:
+        now = datetime.now()
+        if self._retry_at is not None and now < self._retry_at:
+            return False
+        return self.refreshed_at is None or now - self.refreshed_at > self.ttl
+
+    def refresh(self, force: bool = False) -> int:
+        """从全市场列表批量刷新（未过期且 force=False 时不请求），返回目录中的股票数"""
+        with self._lock:
+            if not force and not self.is_stale():
+                return len(self._symbols)
+            with stage("metadata_refresh") as span:
+                listing = self.source.fetch_listing()[LISTING_COLUMNS]
+                span.rows = len(listing)
+            now = datetime.now()
+            stamp = now.isoformat(timespec='seconds')
+            for code, name, exchange, list_date in listing.itertuples(index=False):
+                self._symbols[code] = SymbolInfo(code, name, exchange, list_date, stamp)
+            self.refreshed_at = now
+            self.save()
+            return len(self._symbols)
+
+    def ensure_fresh(self) -> None:
+        """目录过期时刷新；刷新失败时继续使用旧目录"""
+        if not self.is_stale():
+            return
+        with self._lock:
+            if not self.is_stale():  # 等锁期间可能已被其他线程刷新
+                return
+            try:
+                self.refresh(force=True)
+                self._retry_at = None
+            except Exception as e:
+                if not self._symbols:
+                    raise
+                self._retry_at = datetime.now() + RETRY_INTERVAL
+                print(f"⚠️ 股票列表刷新失败，继续使用 {self.refreshed_at:%Y-%m-%d %H:%M} 的目录: {e}")
+
+    # ---------------- 查询 ----------------
+
+    def get(self, code: str, fetch_missing: bool = True) -> Optional[SymbolInfo]:
+        """
+        查询单只股票
+        :param fetch_missing: 目录中没有时是否单独请求股票简称并写回目录
+        """
+        with stage("metadata", code):
+            if self.is_stale():
+                self.ensure_fresh()
+            info = self._symbols.get(code)
+            if info is not None or not fetch_missing:
+                return info
+            with self._lock:
+                info = self._symbols.get(code)
+                if info is None:
+                    from .data_downloader import get_stock_type
+                    name = self.source.fetch_name(code)
+                    info = SymbolInfo(code, name, get_stock_type(code),
+                                      updated=datetime.now().isoformat(timespec='seconds'))
+                    self._symbols[code] = info
+                    self.save()
+                return info
+
+    def name(self, code: str, default: Optional[str] = None) -> Optional[str]:
+        """股票简称；查不到时返回 default（default 为 None 时抛出 KeyError）"""
+        try:
+            info = self.get(code)
+        except Exception:
+            if default is None:
+                raise
+            info = None
+        if info is None:
+            if default is None:
+                raise KeyError(f"未找到股票代码 {code}")
+            return default
+        return info.name
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._symbols
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._symbols)
+
+
+_default_catalog: Optional[SymbolCatalog] = None
+
+
+def get_catalog() -> SymbolCatalog:
+    """进程内共享的默认目录"""
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = SymbolCatalog()
+    return _default_catalog
@@ -1,28 +1,378 @@
+"""
+特征矩阵构建（基于本地行情库，分块流式计算，结果为分区列式表）
+
+    python features.py                                   # 全部股票，只重算输入有变化的分区
+    python features.py --symbols @watchlist.txt --workers 4
+    python features.py --indicator MACD --indicator "Keltner(multiplier=1.5)" --lags 1,2,3 --force
+
+股票按代码哈希分到固定数量的分区，每个分区是 PROCESSED_DATA_DIR/features/part-XXXXX/ 下的一张列式表
+（长表：代码、日期 + 各特征列，见 data_processing.columnar）。每次只把一个分区的股票读入内存，
+用指标注册表在压紧布局上一次算完整个分区，内存占用与分区大小成正比。
+
+分区元数据记录输入指纹（特征配置 + 分区内各股票在行情库中的数据版本），
+重新运行时指纹不变的分区直接跳过；追加了新K线的股票只会使它所在的分区重算。
+
+特征：
+- 指标输出列（同名列加上 请求标签. 前缀）
+- ret_{h}：h 日收益率 收盘 / h 根K线前的收盘 - 1
+- {列}_lag{k}：指定列 k 根K线前的值（默认对 DEFAULT_LAG_COLUMNS 中实际存在的列）
+- fwd_ret_{h}：未来 h 日收益率（训练标签），最后 h 根K线为 NaN
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
 from pathlib import Path
+import re
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import zlib
 
 from loguru import logger
+import numpy as np
+import pandas as pd
 from tqdm import tqdm
 import typer
 
-from stock_analyzer.config import PROCESSED_DATA_DIR
+import config
+from config import PRICE_STORE_DIR, PROCESSED_DATA_DIR
 
+FEATURE_DIR = PROCESSED_DATA_DIR / "features"
+FEATURE_VERSION = 1  # 特征计算方式有不兼容修改时递增，使已有分区全部重算
+KEY_COLUMNS = ('代码', '日期')
+DEFAULT_LAG_COLUMNS = ('ret_1', 'Hist', 'ADX')
 app = typer.Typer()
 
 
+@dataclass
+class FeatureSpec:
+    indicators: List[Tuple[str, Dict[str, Any]]] = field(default_factory=lambda: [
+        ("MACD", {}), ("ADX", {}), ("薛斯通道", {}), ("Donchian", {}), ("Keltner", {})])
+    returns: Tuple[int, ...] = (1, 5, 20)           # ret_{h}
+    lags: Tuple[int, ...] = (1, 2, 3, 5)            # 滞后阶数
+    lag_columns: Optional[Tuple[str, ...]] = None   # 需要滞后的列；None 为 DEFAULT_LAG_COLUMNS 中实际存在的列
+    targets: Tuple[int, ...] = (5,)                 # fwd_ret_{h}
+    dtype: str = 'float32'                          # 特征列的存储类型
+
+    def digest(self) -> str:
+        """配置指纹（含特征与指标实现的版本号）"""
+        from indicators.cache import CACHE_VERSION
+
+        payload = json.dumps({"feature_version": FEATURE_VERSION, "indicator_version": CACHE_VERSION,
+                              "spec": asdict(self)}, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def base_columns(self) -> List[str]:
+        """指标输出列和收益率列，即可以滞后的列（不读取数据，按指标的 OUTPUT_COLUMNS 推算）"""
+        from indicators.pipeline import build_indicator, request_label
+
+        outputs: Dict[str, Tuple[str, ...]] = {}
+        for name, params in self.indicators:
+            indicator = build_indicator(name, params)
+            outputs[request_label(indicator, params)] = indicator.OUTPUT_COLUMNS
+        return _feature_names(outputs) + [f'ret_{h}' for h in self.returns]
+
+    def resolve_lag_columns(self, available: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+        """
+        实际滞后的列：显式指定的列必须存在，否则抛出 KeyError；未指定时取默认列中存在的
+        :param available: 可滞后的列，默认 base_columns()
+        """
+        available = list(self.base_columns() if available is None else available)
+        if self.lag_columns is None:
+            return tuple(col for col in DEFAULT_LAG_COLUMNS if col in available)
+        missing = [col for col in self.lag_columns if col not in available]
+        if missing:
+            raise KeyError(f"滞后列 {', '.join(missing)} 不在特征中，可选：{', '.join(available)}")
+        return tuple(self.lag_columns)
+
+
+@dataclass
+class BuildResult:
+    built: List[int]                   # 重算的分区
+    skipped: List[int]                 # 输入未变化而跳过的分区
+    removed: List[int]                 # 已无股票而删除的分区
+    rows: int                          # 本次写入的行数
+    elapsed: float
+
+
+def partition_of(symbol: str, partitions: int) -> int:
+    """股票所在分区（代码的 CRC32 取模，与股票列表的增减无关）"""
+    return zlib.crc32(symbol.encode()) % partitions
+
+
+def partition_path(root: Path, part: int) -> Path:
+    return Path(root) / f"part-{part:05d}"
+
+
+def _feature_names(outputs: Dict[str, Iterable[str]]) -> List[str]:
+    """{请求标签: 输出列} -> 特征名：只出现一次的列用原名，多个指标同名的列加上 请求标签. 前缀"""
+    counts: Dict[str, int] = {}
+    for columns in outputs.values():
+        for name in columns:
+            counts[name] = counts.get(name, 0) + 1
+    return [name if counts[name] == 1 else f"{label}.{name}"
+            for label, columns in outputs.items() for name in columns]
+
+
+def _lag(values: np.ndarray, k: int) -> np.ndarray:
+    """压紧布局中沿K线方向平移 k 行（k < 0 向上取未来值），移出的位置为 NaN"""
+    out = np.full_like(values, np.nan)
+    if k > 0:
+        out[k:] = values[:-k]
+    elif k < 0:
+        out[:k] = values[-k:]
+    else:
+        out[:] = values
+    return out
+
+
+def compute_features(data: Dict[str, np.ndarray], spec: FeatureSpec) -> Dict[str, np.ndarray]:
+    """
+    在压紧布局上计算特征（见 Panel.pack）
+    :return: 特征名 -> (K线序号 × 股票) 数组
+    """
+    from indicators.pipeline import IndicatorPipeline
+
+    outputs = IndicatorPipeline(spec.indicators).run_packed(data)
+    arrays = [values for columns in outputs.values() for values in columns.values()]
+    features = dict(zip(_feature_names(outputs), arrays))
+
+    close = data['收盘']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for h in spec.returns:
+            features[f'ret_{h}'] = close / _lag(close, h) - 1
+        for col in spec.resolve_lag_columns(features):
+            for k in spec.lags:
+                features[f'{col}_lag{k}'] = _lag(features[col], k)
+        for h in spec.targets:
+            features[f'fwd_ret_{h}'] = _lag(close, -h) / close - 1
+    return features
+
+
+def build_partition(symbols: List[str], spec: FeatureSpec, store_root: Path = PRICE_STORE_DIR) -> Dict[str, np.ndarray]:
+    """
+    读取一个分区的股票并计算特征
+    :return: 长表的列（代码、日期、各特征），按 代码、日期 排序
+    """
+    from data_processing.price_store import PriceStore
+    from indicators.panel import Panel
+
+    panel = Panel.from_store(PriceStore(store_root), symbols)
+    features = compute_features(panel.pack(), spec)
+    # 压紧布局中第 j 列的有效K线就是该股票按日期排列的K线，转置后取有效位置即为按股票、日期排序的长表
+    symbol_idx, date_idx = np.nonzero(panel.mask.T)
+    counts = panel.mask.sum(axis=0)
+    valid = (np.arange(panel.shape[0])[:, None] < counts[None, :]).T
+    columns = {
+        '代码': np.asarray(panel.symbols, dtype=str)[symbol_idx],
+        '日期': panel.dates.values.astype('datetime64[D]')[date_idx],
+    }
+    for name, values in features.items():
+        columns[name] = values.T[valid].astype(spec.dtype)
+    return columns
+
+
+def _build_one(part: int, symbols: List[str], spec: FeatureSpec, store_root: Path, output_dir: Path,
+               extra: Dict[str, Any]) -> int:
+    """计算并写入一个分区，返回行数（在工作进程中运行）"""
+    from data_processing.columnar import write_table
+
+    columns = build_partition(symbols, spec, store_root)
+    write_table(partition_path(output_dir, part), columns, extra)
+    return len(columns['代码'])
+
+
+def build_features(symbols: Optional[Iterable[str]] = None, spec: Optional[FeatureSpec] = None,
+                   store_root: Path = PRICE_STORE_DIR, output_dir: Path = FEATURE_DIR,
+                   partitions: int = 64, workers: Optional[int] = 1, force: bool = False,
+                   progress: bool = True) -> BuildResult:
+    """
+    构建特征分区，跳过输入指纹未变化的分区
+    :param symbols: 股票代码，None 表示行情库中的全部股票（此时不再包含任何股票的分区会被删除）；
+                    指定时只更新这些股票所在的分区，分区中已有的其他股票一并重算保留，其余分区不动
+    :param partitions: 分区数（决定每次读入内存的股票数）；改变分区数需要对全部股票重建
+    :param workers: 进程数，1 表示在当前进程中依次计算，None 为 CPU 核数
+    :param force: 忽略指纹，全部重算
+    """
+    from data_processing.columnar import read_meta
+    from data_processing.price_store import PriceStore
+
+    started = time.perf_counter()
+    spec = spec or FeatureSpec()
+    spec.resolve_lag_columns()  # 在读取数据之前检查指标和滞后列
+    store = PriceStore(store_root)
+    output_dir = Path(output_dir)
+    full = symbols is None
+    symbols = store.symbols() if full else [s for s in dict.fromkeys(symbols) if store.has(s)]
+
+    groups: Dict[int, List[str]] = {}
+    for symbol in symbols:
+        groups.setdefault(partition_of(symbol, partitions), []).append(symbol)
+    if not full:
+        # 只更新部分股票：保留所在分区中已有的其他股票；分区数不同时分区内容对不上，只能全部重建
+        existing = {path: read_meta(path) for path in output_dir.glob("part-*")} if output_dir.exists() else {}
+        layouts = {meta.get("partitions", partitions) for meta in existing.values() if meta is not None}
+        if layouts - {partitions}:
+            raise ValueError(f"已有的特征分区按 {', '.join(map(str, sorted(layouts - {partitions})))} 个分区构建，"
+                             f"与 partitions={partitions} 不一致；改变分区数需要对全部股票重建")
+        for part, members in groups.items():
+            meta = existing.get(partition_path(output_dir, part))
+            if meta is not None:
+                members.extend(s for s in meta.get("symbols", ()) if s not in members and store.has(s))
+    groups = {part: sorted(members) for part, members in groups.items()}
+    digest = spec.digest()
+
+    pending, skipped = {}, []
+    for part, members in sorted(groups.items()):
+        h = hashlib.blake2b(f"{digest}:{partitions}".encode(), digest_size=16)
+        for symbol in members:
+            h.update(f"{symbol}={store.version(symbol)};".encode())
+        fingerprint = h.hexdigest()
+        meta = read_meta(partition_path(output_dir, part))
+        if not force and meta is not None and meta.get("fingerprint") == fingerprint:
+            skipped.append(part)
+        else:
+            pending[part] = (members, {"fingerprint": fingerprint, "partitions": partitions,
+                                       "symbols": members, "spec": asdict(spec)})
+
+    # 分区数变化或股票被移出后留下的分区（只在覆盖全部股票时清理）
+    removed = []
+    if full and output_dir.exists():
+        for path in output_dir.glob("part-*"):
+            match = re.fullmatch(r"part-(\d+)", path.name)
+            if match and int(match.group(1)) not in groups:
+                shutil.rmtree(path)
+                removed.append(int(match.group(1)))
+
+    rows = 0
+    bar = tqdm(total=len(pending), desc="特征分区", unit="区", disable=not progress)
+    if workers == 1 or len(pending) <= 1:
+        for part, (members, extra) in pending.items():
+            rows += _build_one(part, members, spec, store_root, output_dir, extra)
+            bar.update()
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_build_one, part, members, spec, store_root, output_dir, extra)
+                       for part, (members, extra) in pending.items()]
+            for future in as_completed(futures):
+                rows += future.result()
+                bar.update()
+    bar.close()
+    return BuildResult(sorted(pending), skipped, sorted(removed), rows, time.perf_counter() - started)
+
+
+# ---------------- 读取 ----------------
+
+def feature_partitions(root: Path = FEATURE_DIR) -> List[Path]:
+    """已构建的分区目录（按分区号排序）"""
+    from data_processing.columnar import read_meta
+
+    root = Path(root)
+    if not root.exists():
+        return []
+    return sorted(p for p in root.glob("part-*") if read_meta(p) is not None)
+
+
+def feature_columns(root: Path = FEATURE_DIR) -> List[str]:
+    """特征列名（不含 代码、日期）"""
+    from data_processing.columnar import read_meta
+
+    parts = feature_partitions(root)
+    if not parts:
+        return []
+    return [col for col in read_meta(parts[0])["columns"] if col not in KEY_COLUMNS]
+
+
+def read_partition(path: Path, columns: Optional[Iterable[str]] = None, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    读取一个分区的列
+    :param columns: 特征列，默认全部；结果总是包含 代码、日期
+    :param mmap: True 返回只读 memmap（零拷贝）
+    """
+    from data_processing.columnar import read_table
+
+    names = None if columns is None else [*KEY_COLUMNS, *[c for c in columns if c not in KEY_COLUMNS]]
+    return read_table(path, names, mmap=mmap)
+
+
+def load_features(symbols: Optional[Iterable[str]] = None, columns: Optional[Iterable[str]] = None,
+                  start=None, end=None, root: Path = FEATURE_DIR) -> pd.DataFrame:
+    """
+    读取特征为长表 DataFrame（列：代码、日期 + 特征），只读取相关的分区
+    :param symbols: 股票代码，默认全部
+    """
+    from data_processing.columnar import read_meta
+
+    wanted = None if symbols is None else set(symbols)
+    lo = None if start is None else np.datetime64(pd.Timestamp(start).date(), 'D')
+    hi = None if end is None else np.datetime64(pd.Timestamp(end).date(), 'D')
+    frames = []
+    for path in feature_partitions(root):
+        if wanted is not None and wanted.isdisjoint(read_meta(path).get("symbols", ())):
+            continue
+        arrays = read_partition(path, columns)
+        keep = np.ones(len(arrays['代码']), dtype=bool)
+        if wanted is not None:
+            keep &= np.isin(arrays['代码'], list(wanted))
+        if lo is not None:
+            keep &= arrays['日期'] >= lo
+        if hi is not None:
+            keep &= arrays['日期'] <= hi
+        frames.append(pd.DataFrame({name: values[keep] for name, values in arrays.items()}))
+    if not frames:
+        return pd.DataFrame(columns=[*KEY_COLUMNS, *(columns or [])])
+    df = pd.concat(frames, ignore_index=True)
+    df['日期'] = df['日期'].astype('datetime64[ns]')
+    return df
+
+
+# ---------------- 命令行 ----------------
+
+def _parse_ints(text: str) -> Tuple[int, ...]:
+    return tuple(int(x) for x in text.split(",") if x.strip())
+
+
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    input_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
-    output_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    # -----------------------------------------
+    symbols: Optional[str] = typer.Option(None, help="股票代码，逗号分隔，或 @文件；默认行情库中的全部股票"),
+    indicator: List[str] = typer.Option([], help="指标，如 MACD 或 \"Keltner(multiplier=1.5)\"，可重复；默认全部常用指标"),
+    returns: str = typer.Option("1,5,20", help="收益率周期，逗号分隔"),
+    lags: str = typer.Option("1,2,3,5", help="滞后阶数，逗号分隔"),
+    lag_columns: Optional[str] = typer.Option(None, help="需要滞后的列，逗号分隔；默认 ret_1,Hist,ADX 中所选指标实际输出的列"),
+    targets: str = typer.Option("5", help="未来收益率（标签）周期，逗号分隔"),
+    dtype: str = typer.Option("float32", help="特征存储类型 float32 / float64"),
+    partitions: int = typer.Option(64, help="分区数"),
+    workers: int = typer.Option(1, help="进程数"),
+    force: bool = typer.Option(False, help="全部重算"),
+    store_root: Path = typer.Option(PRICE_STORE_DIR, help="本地行情库目录"),
+    output_dir: Path = typer.Option(FEATURE_DIR, help="特征输出目录"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Generating features from dataset...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Features generation complete.")
-    # -----------------------------------------
+    from utils.cli import parse_indicator, parse_symbols
+
+    config.setup()
+    try:
+        spec = FeatureSpec(returns=_parse_ints(returns), lags=_parse_ints(lags),
+                           lag_columns=None if lag_columns is None else
+                           tuple(c.strip() for c in lag_columns.split(",") if c.strip()),
+                           targets=_parse_ints(targets), dtype=dtype)
+        if indicator:
+            spec.indicators = [parse_indicator(text) for text in indicator]
+        logger.info(f"滞后列：{', '.join(spec.resolve_lag_columns()) or '无'}")
+    except (KeyError, ValueError, TypeError, typer.BadParameter) as e:
+        logger.error(str(e).strip("'\""))
+        raise typer.Exit(code=2)
+
+    logger.info("Generating features from price store...")
+    try:
+        result = build_features(parse_symbols(symbols) if symbols else None, spec, store_root, output_dir,
+                                partitions, workers, force)
+    except (KeyError, ValueError) as e:
+        logger.error(str(e).strip("'\""))
+        raise typer.Exit(code=2)
+    logger.success(f"Features generation complete：重算 {len(result.built)} 个分区（{result.rows:,} 行），"
+                   f"跳过 {len(result.skipped)} 个未变化的分区，删除 {len(result.removed)} 个，"
+                   f"用时 {result.elapsed:.1f}s，输出：{output_dir}")
 
 
 if __name__ == "__main__":
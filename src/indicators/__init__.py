@@ -1,5 +1,3 @@
 # __init__.py
 # from .technical import TechnicalIndicator
-from .register import register_all_indicators, INDICATOR_REGISTRY
-
-register_all_indicators()  # 自动注册所有指标
+from .register import register_all_indicators, INDICATOR_REGISTRY  # 指标模块在首次访问时才导入
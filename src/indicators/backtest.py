@@ -0,0 +1,305 @@
+# src/indicators/backtest.py
+"""
+向量化多股票回测
+
+    result = backtest(panel, entry=["MACD crosses_above Signal"], exit=["MACD crosses_below Signal"],
+                      grid={"MACD": {"fast_period": [8, 12], "slow_period": [21, 26]}})
+    result.portfolio          # 每组参数的等权组合绩效
+    result.stats              # 每组参数 × 每只股票的绩效
+
+进出场条件与 scanner 使用相同的声明式语法。全部计算都在压紧布局（见 Panel.pack）上完成：
+每列是一只股票自己的连续K线，停牌日不占行，"上一根K线" 就是上一行。所有参数组合共用一个
+PrimitiveContext，每个原语只算一次；每组参数的信号、仓位、收益都是 (K线 × 股票) 的数组运算，没有逐K线循环。
+
+成交模型（只做多，满仓 0/1）：
+- 收盘时根据信号确定目标仓位，下一根K线开盘成交。当天买入的股票最早在下一个交易日开盘卖出，满足 T+1
+- 开盘即涨停（开盘价相对昨收涨幅达到涨跌停幅度）时不能买入，开盘即跌停时不能卖出，订单顺延到下一根K线
+- 收益：隔夜段按昨日仓位、日内段按当日仓位计算；换手时扣除佣金、滑点，卖出另扣印花税
+"""
+from dataclasses import dataclass, field
+import itertools
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from config import PRICE_STORE_DIR
+from .pipeline import IndicatorPipeline
+from .primitives import PrimitiveContext
+from .scanner import COMPARATORS, Condition, compare, indicators_for, resolve_operand
+
+TRADING_DAYS = 252
+LIMIT_TOLERANCE = 0.002  # 前复权价格不再是整分，判断涨跌停时留出的误差
+
+
+def price_limit(symbol: str) -> float:
+    """涨跌停幅度：创业板/科创板 20%，北交所 30%，其余 10%（ST 股无法从代码判断，按 10%）"""
+    if symbol.startswith(('300', '301', '688', '689')):
+        return 0.2
+    if symbol.startswith(('4', '8', '92')):
+        return 0.3
+    return 0.1
+
+
+@dataclass
+class CostModel:
+    commission: float = 0.0003     # 双向佣金
+    stamp_duty: float = 0.0005     # 卖出印花税
+    slippage: float = 0.0          # 双向滑点（按成交额比例）
+    price_limits: bool = True      # 是否模拟开盘涨跌停无法成交
+
+
+def expand_params(grid: Optional[Dict[str, Dict[str, Iterable[Any]]]]) -> List[Dict[str, Dict[str, Any]]]:
+    """{指标名: {参数名: 候选值}} -> 参数组合列表 [{指标名: {参数名: 值}}, ...]"""
+    if not grid:
+        return [{}]
+    keys = [(name, param) for name, params in grid.items() for param in params]
+    combos = []
+    for values in itertools.product(*(list(grid[name][param]) for name, param in keys)):
+        combo: Dict[str, Dict[str, Any]] = {}
+        for (name, param), value in zip(keys, values):
+            combo.setdefault(name, {})[param] = value
+        combos.append(combo)
+    return combos
+
+
+def combo_label(combo: Dict[str, Dict[str, Any]]) -> str:
+    """参数组合标签，如 MACD.fast_period=8,MACD.slow_period=21；空组合为 default"""
+    parts = [f"{name}.{param}={value}" for name, params in combo.items() for param, value in params.items()]
+    return ",".join(parts) or "default"
+
+
+# ---------------- 数组运算 ----------------
+
+def _shift(values: np.ndarray, fill) -> np.ndarray:
+    """沿K线方向下移一行"""
+    out = np.empty_like(values)
+    out[0] = fill
+    out[1:] = values[:-1]
+    return out
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """沿K线方向前向填充 NaN"""
+    rows = np.arange(len(values))[:, None]
+    idx = np.maximum.accumulate(np.where(np.isnan(values), 0, rows), axis=0)
+    return values[idx, np.arange(values.shape[1])]
+
+
+def signal(conditions: List[Condition], lookup) -> np.ndarray:
+    """所有条件同时满足的K线（压紧布局的布尔数组）；lookup(token) 返回操作数对应的数组或数字"""
+    result = None
+    for condition in conditions:
+        left, right = lookup(condition.left), lookup(condition.right)
+        if condition.op in COMPARATORS:
+            hit = compare(condition.op, left, right)
+        else:
+            prev_l = _shift(left, np.nan) if isinstance(left, np.ndarray) else left
+            prev_r = _shift(right, np.nan) if isinstance(right, np.ndarray) else right
+            hit = compare(condition.op, left, right, prev_l, prev_r)
+        result = hit if result is None else result & hit
+    return result
+
+
+@dataclass
+class Market:
+    """与参数无关的行情数组（压紧布局），每次回测只算一次"""
+    valid: np.ndarray                   # 有效K线
+    overnight: np.ndarray               # 开盘 / 昨收 - 1
+    intraday: np.ndarray                # 收盘 / 开盘 - 1
+    limit_up: Optional[np.ndarray]      # 开盘即涨停
+    limit_down: Optional[np.ndarray]    # 开盘即跌停
+
+    @classmethod
+    def from_packed(cls, data: Dict[str, np.ndarray], valid: np.ndarray,
+                    limits: Optional[np.ndarray]) -> 'Market':
+        """:param limits: 每只股票的涨跌停幅度，None 表示不模拟涨跌停"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            gap = data['开盘'] / _shift(data['收盘'], np.nan) - 1
+            intraday = np.nan_to_num(data['收盘'] / data['开盘'] - 1)
+            limit_up = None if limits is None else gap >= limits - LIMIT_TOLERANCE
+            limit_down = None if limits is None else gap <= -limits + LIMIT_TOLERANCE
+        return cls(valid, np.nan_to_num(gap), intraday, limit_up, limit_down)
+
+
+def positions(entry: np.ndarray, exit: Optional[np.ndarray], market: Market) -> np.ndarray:
+    """
+    由信号得到每根K线开盘成交后的持仓（0/1）
+    :param exit: None 时条件满足期间持有；否则进场信号开仓、离场信号平仓（同一根K线两者都有时平仓）
+    """
+    if exit is None:
+        target = entry.astype(float)
+    else:
+        target = np.nan_to_num(_ffill(np.where(exit, 0.0, np.where(entry, 1.0, np.nan))))
+    desired = _shift(target, 0.0)  # 前一根K线收盘确定，本根K线开盘成交
+    if market.limit_up is not None:
+        desired[market.limit_up & (desired > 0)] = np.nan       # 涨停买不进，保持原仓位
+        desired[market.limit_down & (desired == 0)] = np.nan    # 跌停卖不出，保持原仓位
+        desired[0] = 0.0
+        desired = _ffill(desired)
+    desired[~market.valid] = 0.0
+    return desired
+
+
+def strategy_returns(pos: np.ndarray, market: Market, costs: CostModel) -> np.ndarray:
+    """每根K线的策略收益（已扣费用），无效位置为 NaN"""
+    prev_pos = _shift(pos, 0.0)
+    trade = pos - prev_pos
+    cost = np.abs(trade) * (costs.commission + costs.slippage) + np.maximum(-trade, 0) * costs.stamp_duty
+    ret = (1 + prev_pos * market.overnight) * (1 + pos * market.intraday) - 1 - cost
+    ret[~market.valid] = np.nan
+    return ret
+
+
+def performance(ret: np.ndarray, pos: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    按列计算绩效（ret 中的 NaN 视为没有K线）
+    :return: 指标名 -> 每列一个值
+    """
+    valid = ~np.isnan(ret)
+    n = valid.sum(axis=0)
+    r = np.where(valid, ret, 0.0)
+    log_equity = np.cumsum(np.log1p(r), axis=0)
+    total = np.expm1(log_equity[-1]) if len(r) else np.zeros(r.shape[1])
+    drawdown = np.exp(log_equity - np.maximum.accumulate(log_equity, axis=0)) - 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = r.sum(axis=0) / n
+        std = np.sqrt(((r - mean) ** 2 * valid).sum(axis=0) / (n - 1))
+        stats = {
+            'bars': n,
+            'total_return': total,
+            'annual_return': (1 + total) ** (TRADING_DAYS / n) - 1,
+            'volatility': std * np.sqrt(TRADING_DAYS),
+            'sharpe': mean / std * np.sqrt(TRADING_DAYS),
+            'max_drawdown': drawdown.min(axis=0) if len(r) else np.zeros(r.shape[1]),
+        }
+        if pos is not None:
+            # 只在有效K线之间计算仓位变化：无效位置（停牌、压紧布局末尾的补位）不算成交
+            trade = np.nan_to_num(np.diff(np.where(valid, pos, np.nan), axis=0, prepend=0.0))
+            stats['trades'] = (trade > 0).sum(axis=0)
+            stats['turnover'] = np.abs(trade).sum(axis=0) / n
+            stats['exposure'] = (pos * valid).sum(axis=0) / n
+    return stats
+
+
+# ---------------- 对外接口 ----------------
+
+@dataclass
+class BacktestResult:
+    stats: pd.DataFrame                     # 每组参数 × 每只股票
+    portfolio: pd.DataFrame                 # 每组参数的等权组合
+    returns: pd.DataFrame                   # 等权组合日收益（日期 × 参数组合）
+    coverage: pd.Series                     # 每天有K线的股票数
+    symbol_days: int = 0
+    combos: List[Dict[str, Dict[str, Any]]] = field(default_factory=list)
+
+
+def backtest(panel, entry: Iterable[Union[str, Condition]], exit: Optional[Iterable[Union[str, Condition]]] = None,
+             grid: Optional[Dict[str, Dict[str, Iterable[Any]]]] = None,
+             costs: Optional[CostModel] = None) -> BacktestResult:
+    """
+    在面板上回测一组进出场条件的所有参数组合
+    :param panel: indicators.panel.Panel（日期 × 股票）
+    :param entry: 进场条件，全部满足时进场
+    :param exit: 离场条件，全部满足时离场；None 表示进场条件不再满足时离场
+    :param grid: {指标名: {参数名: 候选值列表}}，未列出的指标使用默认参数
+    """
+    costs = costs or CostModel()
+    entry = [c if isinstance(c, Condition) else Condition.parse(c) for c in entry]
+    exit = None if exit is None else [c if isinstance(c, Condition) else Condition.parse(c) for c in exit]
+    if not entry:
+        raise ValueError("至少需要一个进场条件")
+    conditions = entry + (exit or [])
+
+    data = panel.pack()
+    counts = panel.mask.sum(axis=0)
+    valid = np.arange(panel.shape[0])[:, None] < counts[None, :]
+    limits = np.array([price_limit(s) for s in panel.symbols]) if costs.price_limits else None
+    market = Market.from_packed(data, valid, limits)
+    coverage = panel.mask.sum(axis=1).astype(float)
+    coverage[coverage == 0] = np.nan
+    ctx = PrimitiveContext(data)  # 所有参数组合共享原语
+
+    combos = expand_params(grid)
+    stats_parts, portfolio_returns = [], {}
+    for combo in combos:
+        indicators = indicators_for(conditions, combo)
+        pipeline = IndicatorPipeline([(name, combo.get(name, {})) for name in indicators])
+        outputs = pipeline.run_packed(data, ctx)
+
+        def lookup(token):
+            operand = resolve_operand(token, indicators)
+            if isinstance(operand, float):
+                return operand
+            label, column = operand
+            return data[column] if label is None else outputs[label][column]
+
+        pos = positions(signal(entry, lookup), signal(exit, lookup) if exit else None, market)
+        ret = strategy_returns(pos, market, costs)
+
+        label = combo_label(combo)
+        part = pd.DataFrame(performance(ret, pos))
+        part.insert(0, 'symbol', panel.symbols)
+        part.insert(0, 'params', label)
+        stats_parts.append(part)
+
+        unpacked = panel.unpack(ret)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            portfolio_returns[label] = np.nansum(unpacked, axis=1) / coverage  # 当天有K线的股票等权
+
+    stats = pd.concat(stats_parts, ignore_index=True)
+    returns = pd.DataFrame(portfolio_returns, index=panel.dates)
+    return BacktestResult(stats, summarize_portfolio(returns, stats), returns,
+                          pd.Series(coverage, index=panel.dates), int(counts.sum()) * len(combos), combos)
+
+
+def summarize_portfolio(returns: pd.DataFrame, stats: pd.DataFrame) -> pd.DataFrame:
+    """每组参数的等权组合绩效，按夏普比率降序"""
+    rows = []
+    for label in returns.columns:
+        daily = returns[label].to_numpy(dtype=float)
+        row = {name: values[0] for name, values in performance(daily[:, None]).items()}
+        part = stats[stats['params'] == label]
+        weights = part['bars'] / max(part['bars'].sum(), 1)
+        row['trades'] = int(part['trades'].sum())
+        row['turnover'] = float((part['turnover'] * weights).sum())
+        row['exposure'] = float((part['exposure'] * weights).sum())
+        rows.append({'params': label, **row})
+    return pd.DataFrame(rows).sort_values('sharpe', ascending=False, na_position='last').reset_index(drop=True)
+
+
+def backtest_store(symbols: Optional[Iterable[str]], entry, exit=None, grid=None,
+                   costs: Optional[CostModel] = None, store_root=PRICE_STORE_DIR,
+                   start=None, end=None, chunk_size: int = 500, progress: bool = True) -> BacktestResult:
+    """
+    在本地行情库上按块回测（每块 chunk_size 只股票构建一个面板，内存占用与块大小成正比），
+    各块的组合日收益按当天有K线的股票数加权合并
+    :param symbols: 股票代码，None 表示行情库中的全部股票
+    """
+    from data_processing.price_store import PriceStore
+    from .panel import Panel
+
+    store = PriceStore(store_root)
+    symbols = store.symbols() if symbols is None else list(dict.fromkeys(symbols))
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    if progress:
+        from tqdm import tqdm
+        chunks = tqdm(chunks, desc="回测", unit="块")
+
+    parts = []
+    for chunk in chunks:
+        panel = Panel.from_store(store, chunk, start, end)
+        if panel.shape[1]:
+            parts.append(backtest(panel, entry, exit, grid, costs))
+    if not parts:
+        raise ValueError("行情库中没有可回测的数据")
+    if len(parts) == 1:
+        return parts[0]
+
+    coverage = pd.concat([p.coverage for p in parts], axis=1).fillna(0)
+    weighted = sum(p.returns.mul(p.coverage, axis=0).reindex(coverage.index).fillna(0) for p in parts)
+    total = coverage.sum(axis=1)
+    returns = weighted.div(total.where(total > 0), axis=0)
+    stats = pd.concat([p.stats for p in parts], ignore_index=True)
+    return BacktestResult(stats, summarize_portfolio(returns, stats), returns, total,
+                          sum(p.symbol_days for p in parts), parts[0].combos)
@@ -0,0 +1,230 @@
+# src/indicators/cache.py
+"""
+指标结果缓存：内存 LRU + 磁盘两级
+
+缓存键 = 输入数据指纹 + 指标类 + 参数。只对指标实际用到的行情字段和索引计算指纹，
+因此无关列变化不会导致失效。命中时直接把缓存的输出列拼回输入数据，不再执行任何滚动计算。
+
+磁盘层每个结果一个 .npz 文件（按列存储），总大小超过上限时按最近使用时间淘汰。
+
+内存层和命中统计由内部锁保护，计算在锁外进行，多个线程可以同时计算不同的指标
+（同一个键同时未命中时各自计算一次，结果相同，后写入的覆盖先写入的）。
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import INTERIM_DATA_DIR
+from profiling import stage
+from .primitives import PrimitiveContext, topological_order
+from .technical import TechnicalIndicator, assemble_outputs
+
+CACHE_VERSION = 3  # 指标实现有不兼容修改时递增，使旧的磁盘缓存失效
+DEFAULT_CACHE_DIR = INTERIM_DATA_DIR / "indicator_cache"
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _hash_values(h, values) -> None:
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'biufcmM':
+        h.update(arr.dtype.str.encode())
+        h.update(np.ascontiguousarray(arr).tobytes())
+    else:
+        h.update(pd.util.hash_pandas_object(pd.Index(arr), index=False).to_numpy().tobytes())
+
+
+def input_columns(indicator: TechnicalIndicator, df: pd.DataFrame):
+    """指标实际读取的行情字段；未声明原语依赖的指标视为读取全部列"""
+    fields = [key[1] for key in topological_order(indicator.primitives()) if key[0] == 'field']
+    if not fields:
+        return list(df.columns)
+    return [col for col in dict.fromkeys(fields) if col in df.columns]
+
+
+def fingerprint(df: pd.DataFrame, columns=None) -> str:
+    """数据指纹（索引 + 指定列的内容）"""
+    h = hashlib.blake2b(digest_size=16)
+    _hash_values(h, df.index)
+    for col in (df.columns if columns is None else columns):
+        h.update(str(col).encode())
+        _hash_values(h, df[col].to_numpy())
+    return h.hexdigest()
+
+
+def indicator_params(indicator: TechnicalIndicator) -> Dict:
+    """指标参数（实例的公开属性）"""
+    return {k: v for k, v in vars(indicator).items() if not k.startswith('_')}
+
+
+class IndicatorCache:
+    def __init__(self, max_items: int = 256, disk_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+                 max_disk_bytes: int = 1 << 30):
+        """
+        :param max_items: 内存 LRU 最多保存的结果数
+        :param disk_dir: 磁盘缓存目录，None 表示只用内存
+        :param max_disk_bytes: 磁盘缓存总大小上限（字节）
+        """
+        self.max_items = max_items
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self.stats = CacheStats()
+        self._lock = threading.Lock()   # 保护内存层和命中统计
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, indicator: TechnicalIndicator, df: pd.DataFrame) -> str:
+        cls = type(indicator)
+        payload = json.dumps({
+            "version": CACHE_VERSION,
+            "indicator": f"{cls.__module__}.{cls.__qualname__}",
+            "params": indicator_params(indicator),
+            "data": fingerprint(df, input_columns(indicator, df)),
+        }, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    # ---------------- 内存层 ----------------
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        outputs = self._memory.get(key)
+        if outputs is not None:
+            self._memory.move_to_end(key)
+        return outputs
+
+    def _memory_put(self, key: str, outputs: Dict[str, np.ndarray]) -> None:
+        self._memory[key] = outputs
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    # ---------------- 磁盘层 ----------------
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.npz"
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                outputs = {name: data[name] for name in data.files}
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        os.utime(path)  # 更新最近使用时间，供淘汰使用
+        return outputs
+
+    def _disk_put(self, key: str, outputs: Dict[str, np.ndarray]) -> None:
+        if self.disk_dir is None:
+            return
+        # 临时文件名唯一：同一个键可能被多个线程同时写入，各自写完再原子替换
+        with tempfile.NamedTemporaryFile(dir=self.disk_dir, prefix=f"{key}.", suffix=".tmp", delete=False) as f:
+            np.savez(f, **outputs)
+        os.replace(f.name, self._disk_path(key))
+        self._evict_disk()
+
+    def _disk_files(self):
+        """磁盘层已完成写入的结果文件（不含正在写入的 .tmp 文件）"""
+        for path in self.disk_dir.glob("*.npz"):
+            try:
+                yield path.stat(), path
+            except FileNotFoundError:   # 已被其他线程或进程淘汰
+                continue
+
+    def _evict_disk(self) -> None:
+        files = list(self._disk_files())
+        total = sum(st.st_size for st, _ in files)
+        for st, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= st.st_size
+
+    # ---------------- 对外接口 ----------------
+
+    def get_outputs(self, indicator: TechnicalIndicator, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """返回指标的输出列（列名 -> 数组），依次查内存、磁盘，都未命中才计算"""
+        key = self.key(indicator, df)
+        with self._lock:
+            outputs = self._memory_get(key)
+            if outputs is not None:
+                self.stats.memory_hits += 1
+                return outputs
+
+        outputs = self._disk_get(key)
+        if outputs is not None:
+            with self._lock:
+                self.stats.disk_hits += 1
+                self._memory_put(key, outputs)
+            return outputs
+
+        with self._lock:
+            self.stats.misses += 1
+        with stage(f"calculate:{indicator.INDICATOR_NAME}", rows=len(df)):
+            try:
+                outputs = {name: np.asarray(values) for name, values in
+                           indicator.compute(PrimitiveContext.from_frame(df)).items()}
+            except NotImplementedError:
+                result = indicator.calculate(df.copy())
+                outputs = {
+                    name: result[name].to_numpy()
+                    for name in result.columns.difference(df.columns, sort=False)
+                }
+        for values in outputs.values():
+            values.flags.writeable = False  # 缓存中的数组被多个结果共享，禁止原地修改
+        with self._lock:
+            self._memory_put(key, outputs)
+        self._disk_put(key, outputs)
+        return outputs
+
+    def calculate(self, indicator: TechnicalIndicator, df: pd.DataFrame, output: str = 'frame',
+                  inplace: bool = False, dtype=None):
+        """
+        带缓存的 indicator.calculate(df, output, inplace, dtype)，默认返回新的 DataFrame，不修改传入的 df
+        output='arrays' 时直接返回缓存中的只读数组（不复制）
+        """
+        outputs = self.get_outputs(indicator, df)
+        return assemble_outputs(df, outputs, output, inplace, dtype, copy=output != 'arrays')
+
+    def clear(self, disk: bool = False) -> None:
+        """清空内存层，disk=True 时同时清空磁盘层"""
+        with self._lock:
+            self._memory.clear()
+        if disk and self.disk_dir is not None:
+            for _, path in self._disk_files():
+                path.unlink(missing_ok=True)
+
+
+_default_cache: Optional[IndicatorCache] = None
+
+
+def get_default_cache() -> IndicatorCache:
+    """进程内共享的默认缓存"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndicatorCache()
+    return _default_cache
@@ -1,20 +1,76 @@
 # src/indicators/indicator_adx.py
 import pandas as pd
 from .technical import TechnicalIndicator  # 导入基类
+from . import primitives as P
+from .streaming import NAN, EWMState
 
 
 class ADX(TechnicalIndicator):
+    """平均趋向指数：+DI/-DI 与 DX 的 Wilder 平滑"""
     INDICATOR_NAME = "ADX"
-    
+    SUPPORTS_PANEL = True
+    OUTPUT_COLUMNS = ('ADX', '+DI', '-DI')
+
     def __init__(self, window=14):
         self.window = window
-    
-    def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
-        # ADX具体实现
-        delta = df['收盘'].diff()
-        gain = delta.clip(lower=0).rolling(self.window).mean()
-        loss = -delta.clip(upper=0).rolling(self.window).mean()
-        rs = gain / loss
-        adx = 100 - (100 / (1 + rs))
-        df['ADX'] = adx.round(2)
-        return df
+
+    def _keys(self):
+        return {
+            '+DI': P.directional_index('+', self.window),
+            '-DI': P.directional_index('-', self.window),
+            'ADX': P.wilder(P.dx(self.window), self.window),
+        }
+
+    def primitives(self):
+        return list(self._keys().values())
+
+    def warmup_bars(self):
+        # Wilder 平滑的初值影响按 (1 - 1/window)^n 衰减，10 倍周期后约为 e^-10；ADX 是两层平滑，取 20 倍
+        return 20 * self.window
+
+    def compute(self, ctx):
+        keys = self._keys()
+        return {'ADX': ctx[keys['ADX']], '+DI': ctx[keys['+DI']], '-DI': ctx[keys['-DI']]}
+
+    def init_state(self, history: pd.DataFrame):
+        """用历史K线初始化四个 Wilder 平滑状态"""
+        ctx = P.PrimitiveContext.from_frame(history)
+        outputs = self.compute(ctx)
+        alpha = 1.0 / self.window
+        self._plus = EWMState(alpha=alpha)
+        self._minus = EWMState(alpha=alpha)
+        self._tr = EWMState(alpha=alpha)
+        self._adx = EWMState(alpha=alpha)
+        if len(history):
+            self._plus.seed(ctx[P.wilder(P.directional_movement('+'), self.window)].iloc[-1])
+            self._minus.seed(ctx[P.wilder(P.directional_movement('-'), self.window)].iloc[-1])
+            self._tr.seed(ctx[P.wilder(P.true_range(), self.window)].iloc[-1])
+            self._adx.seed(outputs['ADX'].iloc[-1])
+        last = history.iloc[-1] if len(history) else {}
+        self._prev = tuple(float(last[c]) if len(history) else NAN for c in ('最高', '最低', '收盘'))
+        self._out = {name: float(values.iloc[-1]) if len(history) else NAN
+                     for name, values in outputs.items()}
+        return self._out
+
+    def update(self, bar):
+        """输入一根新K线，O(1) 更新"""
+        high, low, close = float(bar['最高']), float(bar['最低']), float(bar['收盘'])
+        prev_high, prev_low, prev_close = self._prev
+        self._prev = (high, low, close)
+
+        up, down = high - prev_high, prev_low - low
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+        tr = high - low
+        if prev_close == prev_close:
+            tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+
+        atr = self._tr.update(tr)
+        plus_di = 100 * self._plus.update(plus_dm) / atr if atr else NAN
+        minus_di = 100 * self._minus.update(minus_dm) / atr if atr else NAN
+        dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di) if plus_di + minus_di else NAN
+        out = self._out
+        out['ADX'] = self._adx.update(dx)
+        out['+DI'] = plus_di
+        out['-DI'] = minus_di
+        return out
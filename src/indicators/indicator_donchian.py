@@ -0,0 +1,51 @@
+# src/indicators/indicator_donchian.py
+import pandas as pd
+from .technical import TechnicalIndicator
+from . import primitives as P
+from .streaming import NAN, RollingExtreme
+
+
+class DonchianChannel(TechnicalIndicator):
+    """唐奇安通道：最近 window 根K线的最高价 / 最低价及其中线"""
+    INDICATOR_NAME = "Donchian"
+    SUPPORTS_PANEL = True
+    OUTPUT_COLUMNS = ('唐奇安上轨', '唐奇安中轨', '唐奇安下轨')
+
+    def __init__(self, window=20):
+        self.window = window
+
+    def _keys(self):
+        return P.rolling_max('最高', self.window), P.rolling_min('最低', self.window)
+
+    def primitives(self):
+        return list(self._keys())
+
+    def warmup_bars(self):
+        return self.window  # 滚动窗口，结果精确
+
+    def compute(self, ctx):
+        upper_key, lower_key = self._keys()
+        upper, lower = ctx[upper_key], ctx[lower_key]
+        return {'唐奇安上轨': upper, '唐奇安中轨': (upper + lower) / 2, '唐奇安下轨': lower}
+
+    def init_state(self, history: pd.DataFrame):
+        """用最近 window 根K线初始化单调队列"""
+        outputs = self.compute(P.PrimitiveContext.from_frame(history))
+        self._high = RollingExtreme(self.window, mode='max')
+        self._low = RollingExtreme(self.window, mode='min')
+        self._high.seed(history['最高'].iloc[-self.window:].tolist())
+        self._low.seed(history['最低'].iloc[-self.window:].tolist())
+        self._out = {name: float(values.iloc[-1]) if len(history) else NAN
+                     for name, values in outputs.items()}
+        return self._out
+
+    def update(self, bar):
+        """输入一根新K线，均摊 O(1) 更新"""
+        self._high.push(float(bar['最高']))
+        self._low.push(float(bar['最低']))
+        upper, lower = self._high.value(), self._low.value()
+        out = self._out
+        out['唐奇安上轨'] = upper
+        out['唐奇安中轨'] = (upper + lower) / 2
+        out['唐奇安下轨'] = lower
+        return out
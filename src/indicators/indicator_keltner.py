@@ -0,0 +1,63 @@
+# src/indicators/indicator_keltner.py
+import pandas as pd
+from .technical import TechnicalIndicator
+from . import primitives as P
+from .streaming import NAN, EWMState
+
+
+class KeltnerChannel(TechnicalIndicator):
+    """肯特纳通道：收盘价 EMA 为中轨，上下轨为中轨 ± multiplier 倍 ATR（Wilder 平滑）"""
+    INDICATOR_NAME = "Keltner"
+    SUPPORTS_PANEL = True
+    OUTPUT_COLUMNS = ('肯特纳上轨', '肯特纳中轨', '肯特纳下轨')
+
+    def __init__(self, window=20, atr_window=10, multiplier=2.0):
+        self.window = window
+        self.atr_window = atr_window
+        self.multiplier = multiplier
+
+    def _keys(self):
+        return P.ema('收盘', self.window), P.wilder(P.true_range(), self.atr_window)
+
+    def primitives(self):
+        return list(self._keys())
+
+    def warmup_bars(self):
+        # EMA 与 Wilder 平滑的初值影响衰减到约 e^-10 所需的K线数
+        return max(5 * (self.window + 1), 10 * self.atr_window)
+
+    def compute(self, ctx):
+        middle_key, atr_key = self._keys()
+        middle, width = ctx[middle_key], self.multiplier * ctx[atr_key]
+        return {'肯特纳上轨': middle + width, '肯特纳中轨': middle, '肯特纳下轨': middle - width}
+
+    def init_state(self, history: pd.DataFrame):
+        """用历史K线初始化 EMA 和 ATR 状态"""
+        ctx = P.PrimitiveContext.from_frame(history)
+        outputs = self.compute(ctx)
+        middle_key, atr_key = self._keys()
+        self._middle = EWMState(self.window)
+        self._atr = EWMState(alpha=1.0 / self.atr_window)
+        if len(history):
+            self._middle.seed(ctx[middle_key].iloc[-1])
+            self._atr.seed(ctx[atr_key].iloc[-1])
+        self._prev_close = float(history['收盘'].iloc[-1]) if len(history) else NAN
+        self._out = {name: float(values.iloc[-1]) if len(history) else NAN
+                     for name, values in outputs.items()}
+        return self._out
+
+    def update(self, bar):
+        """输入一根新K线，O(1) 更新"""
+        close, high, low = float(bar['收盘']), float(bar['最高']), float(bar['最低'])
+        prev_close = self._prev_close
+        self._prev_close = close
+        tr = high - low
+        if prev_close == prev_close:
+            tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+        middle = self._middle.update(close)
+        width = self.multiplier * self._atr.update(tr)
+        out = self._out
+        out['肯特纳上轨'] = middle + width
+        out['肯特纳中轨'] = middle
+        out['肯特纳下轨'] = middle - width
+        return out
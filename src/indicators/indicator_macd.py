@@ -1,32 +1,59 @@
 from .technical import TechnicalIndicator
+from . import primitives as P
+from .streaming import NAN, EWMState
 import pandas as pd
 
 class MACD(TechnicalIndicator):
     INDICATOR_NAME = "MACD"
-    
+    SUPPORTS_PANEL = True
+    OUTPUT_COLUMNS = ('MACD', 'Signal', 'Hist')
+
     def __init__(self, fast_period=12, slow_period=26, signal_period=9):
         self.fast_period = fast_period
         self.slow_period = slow_period
         self.signal_period = signal_period
+
+    def _keys(self):
+        # MACD线 = EMA(快) - EMA(慢)，信号线 = EMA(MACD线)
+        macd = P.sub(P.ema('收盘', self.fast_period), P.ema('收盘', self.slow_period))
+        return macd, P.ema(macd, self.signal_period)
+
+    def primitives(self):
+        return list(self._keys())
+
+    def warmup_bars(self):
+        # EMA 初值的影响按 (1 - 2/(span+1))^n 衰减，5 倍周期后约为 e^-10
+        return 5 * (self.slow_period + self.signal_period)
+
+    def compute(self, ctx):
+        """基于共享原语计算MACD"""
+        macd_key, signal_key = self._keys()
+        macd, signal = ctx[macd_key], ctx[signal_key]
+        return {'MACD': macd, 'Signal': signal, 'Hist': macd - signal}
     
-    def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
-        """计算MACD指标"""
-        close = df['收盘']
-        
-        # 计算EMA
-        ema_fast = close.ewm(span=self.fast_period, adjust=False).mean()
-        ema_slow = close.ewm(span=self.slow_period, adjust=False).mean()
-        
-        # 计算MACD线和信号线
-        macd = ema_fast - ema_slow
-        signal = macd.ewm(span=self.signal_period, adjust=False).mean()
-        
-        # 计算MACD柱状图
-        hist = macd - signal
-        
-        # 保存结果
-        df['MACD'] = macd
-        df['Signal'] = signal
-        df['Hist'] = hist
-        
-        return df
+    def init_state(self, history: pd.DataFrame):
+        """用历史K线初始化 EMA 状态"""
+        ctx = P.PrimitiveContext.from_frame(history)
+        outputs = self.compute(ctx)
+        macd_key, signal_key = self._keys()
+        self._fast = EWMState(self.fast_period)
+        self._slow = EWMState(self.slow_period)
+        self._signal = EWMState(self.signal_period)
+        if len(history):
+            self._fast.seed(ctx[P.ema('收盘', self.fast_period)].iloc[-1])
+            self._slow.seed(ctx[P.ema('收盘', self.slow_period)].iloc[-1])
+            self._signal.seed(ctx[signal_key].iloc[-1])
+        self._out = {name: float(values.iloc[-1]) if len(history) else NAN
+                     for name, values in outputs.items()}
+        return self._out
+
+    def update(self, bar):
+        """输入一根新K线，O(1) 更新MACD"""
+        close = float(bar['收盘'])
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        out = self._out
+        out['MACD'] = macd
+        out['Signal'] = signal
+        out['Hist'] = macd - signal
+        return out
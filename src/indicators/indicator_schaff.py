@@ -1,60 +1,108 @@
 # src/indicators/indicator_schaff.py
-from .technical import TechnicalBase
 from .technical import TechnicalIndicator  # 确保继承正确
+from . import primitives as P
+from .streaming import NAN, RollingStats
 import pandas as pd
 
 class SchaffChannel(TechnicalIndicator):
     INDICATOR_NAME = "薛斯通道"  # 必须属性
+    SUPPORTS_PANEL = True
+    OUTPUT_COLUMNS = ('静态支撑带', '静态压力带', '动态趋势上轨', '动态趋势下轨')
 
     def __init__(self, N=50, M=10, window=5):
         self.N = N 
         self.M = M
         self.window = window
 
-    def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
-        """薛斯通道计算"""
-        df = df.copy()
-        
-        # 计算 AA（加权均价）
-        weight_avg_series = TechnicalBase.weighted_price(df)
-
-        
-        df['AA'] = weight_avg_series.rolling(window=self.window,min_periods=1).mean()                                # df['AA'] 是 pandas.Series
-        df['AA'].bfill(inplace=True)                # 避免 NaN 影响
-        # print(df['AA'].head(10))
-        
-        # 计算 CC（波动率）
-        df['CC'] = TechnicalBase.volatility(df, window=20).squeeze()        # df['CC'] 是 pandas.Series        
-        """ 
-        .squeeze() 是 Pandas 的方法，用于去除维度为 1 的轴（行或列）。它适用于 DataFrame 和 Series：
-        如果 .squeeze() 作用于 DataFrame，且 DataFrame 只有一列或一行，它会转换为 Series。
-        如果 .squeeze() 作用于 Series，它不会有任何效果（不会出错）。
-        print(df['CC'].head(10))
-        """
-
-
-        # 计算 DD（动态移动均线）   df['DD'] 是 pandas.Series
-        df['DD'] = TechnicalBase.dynamic_ma(df['AA'], alpha_series=df['CC'])
-
-
-        # 计算ATR（Average True Range）作为通道宽度基数
-        df['ATR'] = TechnicalBase.average_true_range(df, self.window)
-        
-        # 计算静态通道
-        # 使用布林带原理计算静态通道，更准确地反映价格波动范围
-        rolling_window = 20  # 滚动窗口大小
-        rolling_mean = df['AA'].rolling(window=rolling_window, min_periods=1).mean()
-        rolling_std = df['AA'].rolling(window=rolling_window, min_periods=1).std()
-        
-        # 设置静态通道为均线上下一定倍数的标准差
-        df['静态支撑带'] = rolling_mean - self.N / 100 * rolling_std
-        df['静态压力带'] = rolling_mean + self.N / 100 * rolling_std
-        
+    def _keys(self):
+        rolling_window = 20  # 静态通道滚动窗口大小
+        # AA（加权均价的滚动均值），bfill 避免 NaN 影响
+        aa = P.bfill(P.sma(P.wap(), self.window, 1))
+        return {
+            'AA': aa,
+            'CC': P.volatility(20),                                # 波动率
+            'DD': P.dynamic_ma(aa, P.volatility(20)),              # 动态移动均线
+            'ATR': P.sma(P.true_range(), self.window, 1),          # 通道宽度基数
+            'mean': P.sma(aa, rolling_window, 1),
+            'std': P.rolling_std(aa, rolling_window, 1),
+        }
+
+    def primitives(self):
+        return list(self._keys().values())
+
+    def warmup_bars(self):
+        # DD 是以波动率 CC 为 alpha 的递推均线，初值影响按 ∏(1 - CC) 衰减；
+        # A 股日线 CC 通常在 0.01~0.05，500 根后的影响可以忽略
+        return 500
+
+    def compute(self, ctx):
+        """薛斯通道计算（AA/CC/DD/ATR 是中间结果，只依赖 window，N、M 只缩放通道宽度）"""
+        keys = self._keys()
+        rolling_mean, rolling_std = ctx[keys['mean']], ctx[keys['std']]
+        dd, atr = ctx[keys['DD']], ctx[keys['ATR']]
+
+        # 使用布林带原理计算静态通道：均线上下一定倍数的标准差
         # 使用ATR作为动态通道宽度
-        channel_width = self.M * df['ATR']
-        df['动态趋势上轨'] = df['DD'] + channel_width
-        df['动态趋势下轨'] = df['DD'] - channel_width
-        
-        # 确保返回仅包含所需的 4 列
-        # return df[['静态支撑带', '静态压力带', '动态趋势上轨', '动态趋势下轨']]
-        return df
+        channel_width = self.M * atr
+        return {
+            '静态支撑带': rolling_mean - self.N / 100 * rolling_std,
+            '静态压力带': rolling_mean + self.N / 100 * rolling_std,
+            '动态趋势上轨': dd + channel_width,
+            '动态趋势下轨': dd - channel_width,
+        }
+
+    def init_state(self, history: pd.DataFrame):
+        """用历史K线初始化滚动窗口和动态均线状态"""
+        keys = self._keys()
+        ctx = P.PrimitiveContext.from_frame(history)
+        outputs = self.compute(ctx)
+
+        self._wap = RollingStats(self.window, 1)
+        self._close = RollingStats(20, 1)
+        self._tr = RollingStats(self.window, 1)
+        self._aa = RollingStats(20, 1)
+        self._wap.seed(ctx[P.wap()].iloc[-self.window:].tolist())
+        self._close.seed(history['收盘'].iloc[-20:].tolist())
+        self._tr.seed(ctx[P.true_range()].iloc[-self.window:].tolist())
+        self._aa.seed(ctx[keys['AA']].iloc[-20:].tolist())
+        self._dd = float(ctx[keys['DD']].iloc[-1]) if len(history) else NAN
+        self._prev_close = float(history['收盘'].iloc[-1]) if len(history) else NAN
+        self._out = {name: float(values.iloc[-1]) if len(history) else NAN
+                     for name, values in outputs.items()}
+        return self._out
+
+    def update(self, bar):
+        """输入一根新K线，O(1) 更新薛斯通道"""
+        close, high, low = float(bar['收盘']), float(bar['最高']), float(bar['最低'])
+
+        wap = (2 * close + high + low) / 4
+        self._wap.push(wap)
+        aa = self._wap.mean()
+
+        self._close.push(close)
+        ma = self._close.mean()
+        cc = abs(wap - ma) / ma
+        if cc != cc:
+            cc = 0.0
+
+        dd = aa if self._dd != self._dd else cc * aa + (1 - cc) * self._dd
+        self._dd = dd
+
+        prev_close = self._prev_close
+        self._prev_close = close
+        tr = high - low
+        if prev_close == prev_close:
+            tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+        self._tr.push(tr)
+        atr = self._tr.mean()
+
+        self._aa.push(aa)
+        rolling_mean, rolling_std = self._aa.mean(), self._aa.std()
+
+        channel_width = self.M * atr
+        out = self._out
+        out['静态支撑带'] = rolling_mean - self.N / 100 * rolling_std
+        out['静态压力带'] = rolling_mean + self.N / 100 * rolling_std
+        out['动态趋势上轨'] = dd + channel_width
+        out['动态趋势下轨'] = dd - channel_width
+        return out
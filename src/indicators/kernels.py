@@ -0,0 +1,483 @@
+# src/indicators/kernels.py
+"""
+数组内核：单次遍历、O(n) 的时间序列计算，输入为 1-D（单只股票）或 2-D（日期 × 股票）数组，沿第 0 轴计算
+
+- recursive_filter：时变 alpha 的一阶递推 y[i] = alpha[i] * x[i] + (1 - alpha[i]) * y[i-1]，
+  所有后端都按与原 dynamic_ma 循环完全相同的运算顺序计算，因此结果逐位一致
+- rolling：滚动 sum / mean / std（运行和 + Welford 方差）和 min / max（单调队列），
+  NaN 不计入窗口，窗口内有效值少于 min_periods 时为 NaN，与 pandas rolling 一致
+- ewm：固定 alpha 的指数加权均值，与 pandas ewm(alpha, adjust=False).mean() 逐位一致；
+  wilder 即 alpha = 1/period 的 Wilder 平滑
+- true_range：真实波幅
+
+后端：numba（已安装时默认）逐元素单次遍历；numpy（唯一的非 JIT 后端）对 2-D 输入沿时间循环、对股票向量化
+（单只股票在 Python float 上循环），与 numba 的运算顺序相同；numpy 的滚动极值用分块前缀/后缀极值
+（van Herk/Gil-Werman，同样 O(n)）。numba 是可选依赖：pip install -e ".[jit]"，
+未安装时递推类内核（ewm / wilder / 滚动 sum、mean、std）逐日在解释器中循环，长序列上明显更慢。
+"""
+from typing import Callable, Dict, List, Optional
+import importlib.util
+import math
+import os
+
+import numpy as np
+
+KERNEL_BACKENDS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {}
+_default_backend: Optional[str] = None
+
+
+def register_backend(name: str):
+    """注册递推内核后端的装饰器"""
+    def decorator(func):
+        KERNEL_BACKENDS[name] = func
+        return func
+    return decorator
+
+
+def _recursive_filter_1d(values: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    """单只股票：在 Python float 上循环（比逐元素索引 ndarray 或逐步调用 ufunc 快一个数量级）"""
+    x = values.tolist()
+    a = alpha.tolist()
+    out = [0.0] * len(x)
+    if not x:
+        return np.empty(0, dtype=float)
+    prev = out[0] = x[0]
+    for i in range(1, len(x)):
+        prev = out[i] = a[i] * x[i] + (1 - a[i]) * prev
+    return np.array(out, dtype=float)
+
+
+@register_backend("numpy")
+def _recursive_filter_numpy(values: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    """NumPy 实现：沿时间轴循环，每一步对所有股票（列）向量化计算；单只股票走 _recursive_filter_1d"""
+    if values.ndim == 1:
+        return _recursive_filter_1d(values, alpha)
+    result = np.empty_like(values)
+    if len(values) == 0:
+        return result
+    beta = 1 - alpha
+    result[0] = values[0]
+    for i in range(1, len(values)):
+        np.multiply(alpha[i], values[i], out=result[i])
+        result[i] += beta[i] * result[i - 1]
+    return result
+
+
+_jit_kernel = None
+
+
+def _get_jit_kernel():
+    """首次使用时才导入 numba 并编译（导入 numba 本身约需 1 秒）"""
+    global _jit_kernel
+    if _jit_kernel is None:
+        import numba
+
+        @numba.njit(cache=True)
+        def _recursive_filter_jit(values, alpha):  # pragma: no cover - 需要 numba
+            result = np.empty_like(values)
+            n = values.shape[0]
+            if n == 0:
+                return result
+            result[0] = values[0]
+            for i in range(1, n):
+                result[i] = alpha[i] * values[i] + (1 - alpha[i]) * result[i - 1]
+            return result
+
+        _jit_kernel = _recursive_filter_jit
+    return _jit_kernel
+
+
+if importlib.util.find_spec("numba") is not None:  # 可选 JIT 后端，只检查是否安装，不在导入时加载
+    @register_backend("numba")
+    def _recursive_filter_numba(values: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+        """numba JIT 实现（未开启 fastmath，保证与 Python 循环逐位一致）"""
+        return _get_jit_kernel()(values, alpha)
+
+
+def get_backend() -> str:
+    """当前默认后端：环境变量 STOCK_KERNEL_BACKEND > set_backend() > numba > numpy"""
+    name = os.getenv("STOCK_KERNEL_BACKEND") or _default_backend
+    if name:
+        return name
+    return "numba" if "numba" in KERNEL_BACKENDS else "numpy"
+
+
+def set_backend(name: Optional[str]) -> None:
+    """设置默认后端，传入 None 恢复自动选择"""
+    global _default_backend
+    if name is not None and name not in KERNEL_BACKENDS:
+        raise ValueError(f"未知的内核后端: {name}，可选：{list(KERNEL_BACKENDS)}")
+    _default_backend = name
+
+
+def recursive_filter(values, alpha, backend: Optional[str] = None) -> np.ndarray:
+    """
+    时变 alpha 一阶递推滤波
+    :param values: 1-D 或 2-D（日期 × 股票）数组
+    :param alpha: 与 values 同形状的数组，或可广播到 values 的标量 / 1-D 数组
+    :param backend: 指定后端，默认见 get_backend()
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim not in (1, 2):
+        raise ValueError(f"只支持 1-D 或 2-D 数组，实际维度：{values.ndim}")
+    alpha = np.asarray(alpha, dtype=float)
+    if alpha.ndim == 1 and values.ndim == 2 and len(alpha) == len(values):
+        alpha = alpha[:, None]  # 每个日期一个 alpha，对所有股票通用
+    alpha = np.ascontiguousarray(np.broadcast_to(alpha, values.shape))
+    name = backend or get_backend()
+    if name not in KERNEL_BACKENDS:
+        raise ValueError(f"未知的内核后端: {name}，可选：{list(KERNEL_BACKENDS)}")
+    return KERNEL_BACKENDS[name](np.ascontiguousarray(values), alpha)
+
+
+# ---------------- 滚动窗口 / 指数平滑 ----------------
+
+ROLLING_OPS = ('sum', 'mean', 'std', 'min', 'max')
+NAN = float('nan')
+_jit_rolling = {}
+
+
+def _as_2d(values) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    if values.ndim not in (1, 2):
+        raise ValueError(f"只支持 1-D 或 2-D 数组，实际维度：{values.ndim}")
+    return np.ascontiguousarray(values.reshape(len(values), -1))
+
+
+def _use_jit(backend: Optional[str]) -> bool:
+    name = backend or get_backend()
+    if name not in KERNEL_BACKENDS:
+        raise ValueError(f"未知的内核后端: {name}，可选：{list(KERNEL_BACKENDS)}")
+    return name == "numba"
+
+
+def _get_jit_rolling(name: str):
+    """首次使用时编译滚动/平滑内核（与 _get_jit_kernel 相同，numba 延迟导入）"""
+    if not _jit_rolling:
+        import numba
+
+        @numba.njit(cache=True)
+        def moments(values, window, min_periods, op):  # pragma: no cover - 需要 numba
+            # op: 0 sum, 1 mean, 2 std；运行和用 Kahan 补偿，方差用 Welford，先移出旧值再加入新值。
+            # 外层沿时间、内层沿股票，按内存顺序访问 C 连续的 (日期 × 股票) 数组
+            n, m = values.shape
+            out = np.empty((n, m))
+            nobs = np.zeros(m, dtype=np.int64)
+            same = np.zeros(m, dtype=np.int64)
+            total = np.zeros(m)
+            comp = np.zeros(m)
+            mean = np.zeros(m)
+            ssq = np.zeros(m)
+            prev = np.full(m, np.nan)
+            for i in range(n):
+                for j in range(m):
+                    if i >= window:
+                        x = values[i - window, j]
+                        if x == x:
+                            nobs[j] -= 1
+                            y = -x - comp[j]
+                            t = total[j] + y
+                            comp[j] = (t - total[j]) - y
+                            total[j] = t
+                            if nobs[j]:
+                                delta = x - mean[j]
+                                mean[j] -= delta / nobs[j]
+                                ssq[j] -= delta * (x - mean[j])
+                            else:
+                                total[j] = comp[j] = mean[j] = ssq[j] = 0.0
+                    x = values[i, j]
+                    if x == x:
+                        nobs[j] += 1
+                        y = x - comp[j]
+                        t = total[j] + y
+                        comp[j] = (t - total[j]) - y
+                        total[j] = t
+                        delta = x - mean[j]
+                        mean[j] += delta / nobs[j]
+                        ssq[j] += delta * (x - mean[j])
+                        same[j] = same[j] + 1 if x == prev[j] else 1
+                        prev[j] = x
+                    k = nobs[j]
+                    if k < min_periods or (op != 0 and k == 0) or (op == 2 and k < 2):
+                        out[i, j] = np.nan
+                    elif op == 0:
+                        out[i, j] = total[j]
+                    elif op == 1:
+                        out[i, j] = prev[j] if same[j] >= k else total[j] / k
+                    else:
+                        out[i, j] = 0.0 if same[j] >= k else np.sqrt(max(ssq[j], 0.0) / (k - 1))
+            return out
+
+        @numba.njit(cache=True)
+        def extreme(values, window, min_periods, is_max):  # pragma: no cover - 需要 numba
+            # 单调队列：队列中下标递增、值单调，队首就是窗口内的极值，每个下标最多进出一次。
+            # 逐只股票处理，先把该列复制为连续数组，出入队时的随机访问都落在这一列内
+            n, m = values.shape
+            out = np.empty((n, m))
+            column = np.empty(n)
+            queue = np.empty(n, dtype=np.int64)
+            for j in range(m):
+                column[:] = values[:, j]
+                head = 0
+                tail = 0
+                nobs = 0
+                for i in range(n):
+                    if i >= window and column[i - window] == column[i - window]:
+                        nobs -= 1
+                    if tail > head and queue[head] <= i - window:
+                        head += 1
+                    x = column[i]
+                    if x == x:
+                        nobs += 1
+                        if is_max:
+                            while tail > head and column[queue[tail - 1]] <= x:
+                                tail -= 1
+                        else:
+                            while tail > head and column[queue[tail - 1]] >= x:
+                                tail -= 1
+                        queue[tail] = i
+                        tail += 1
+                    out[i, j] = column[queue[head]] if nobs >= min_periods and tail > head else np.nan
+            return out
+
+        @numba.njit(cache=True)
+        def ewm(values, alpha):  # pragma: no cover - 需要 numba
+            # 与 pandas ewm(adjust=False, ignore_na=False) 相同的运算顺序（含 alpha=0.5 的特例，见 _ewm_1d）
+            n, m = values.shape
+            out = np.empty((n, m))
+            weighted = np.full(m, np.nan)
+            old_wt = np.ones(m)
+            for i in range(n):
+                for j in range(m):
+                    x = values[i, j]
+                    w = weighted[j]
+                    if w == w:
+                        old_wt[j] *= 1.0 - alpha
+                        if x == x:
+                            if w != x:
+                                new_wt = 1.0 - old_wt[j] if alpha == 0.5 else alpha
+                                weighted[j] = (old_wt[j] * w + new_wt * x) / (old_wt[j] + new_wt)
+                            old_wt[j] = 1.0
+                    elif x == x:
+                        weighted[j] = x
+                    out[i, j] = weighted[j]
+            return out
+
+        _jit_rolling.update(moments=moments, extreme=extreme, ewm=ewm)
+    return _jit_rolling[name]
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """长度为 window 的滑动窗口和（前缀和相减）"""
+    csum = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=csum[1:])
+    out = csum[1:].copy()
+    out[window:] -= csum[1:-window]
+    return out
+
+
+def _moments_1d(values: List[float], window: int, min_periods: int, op: int) -> List[float]:
+    """单只股票：在 Python float 上循环，运算顺序与 numba 内核相同"""
+    out = [NAN] * len(values)
+    nobs, total, comp, mean, ssq, same, prev = 0, 0.0, 0.0, 0.0, 0.0, 0, NAN
+    for i, x in enumerate(values):
+        if i >= window:
+            old = values[i - window]
+            if old == old:
+                nobs -= 1
+                y = -old - comp
+                t = total + y
+                comp = (t - total) - y
+                total = t
+                if nobs:
+                    delta = old - mean
+                    mean -= delta / nobs
+                    ssq -= delta * (old - mean)
+                else:
+                    total = comp = mean = ssq = 0.0
+        if x == x:
+            nobs += 1
+            y = x - comp
+            t = total + y
+            comp = (t - total) - y
+            total = t
+            delta = x - mean
+            mean += delta / nobs
+            ssq += delta * (x - mean)
+            same = same + 1 if x == prev else 1
+            prev = x
+        if nobs < min_periods or (op != 0 and nobs == 0) or (op == 2 and nobs < 2):
+            continue
+        if op == 0:
+            out[i] = total
+        elif op == 1:
+            out[i] = prev if same >= nobs else total / nobs
+        else:
+            out[i] = 0.0 if same >= nobs else math.sqrt(max(ssq, 0.0) / (nobs - 1))
+    return out
+
+
+def _moments_numpy(values: np.ndarray, window: int, min_periods: int, op: int) -> np.ndarray:
+    """沿时间循环、对股票向量化，运算顺序与 numba 内核相同"""
+    m = values.shape[1]
+    out = np.empty_like(values)
+    nobs = np.zeros(m)
+    total, comp, mean, ssq = np.zeros(m), np.zeros(m), np.zeros(m), np.zeros(m)
+    same, prev = np.zeros(m), np.full(m, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i, x in enumerate(values):
+            if i >= window:
+                old = values[i - window]
+                hit = ~np.isnan(old)
+                nobs -= hit
+                y = np.where(hit, -old - comp, 0.0)
+                t = total + y
+                comp = np.where(hit, (t - total) - y, comp)
+                total = t
+                delta = old - mean
+                new_mean = mean - delta / nobs
+                keep = hit & (nobs > 0)
+                ssq = np.where(keep, ssq - delta * (old - new_mean), ssq)
+                mean = np.where(keep, new_mean, mean)
+                reset = hit & (nobs == 0)
+                for state in (total, comp, mean, ssq):
+                    state[reset] = 0.0
+            hit = ~np.isnan(x)
+            nobs += hit
+            y = np.where(hit, x - comp, 0.0)
+            t = total + y
+            comp = np.where(hit, (t - total) - y, comp)
+            total = t
+            delta = x - mean
+            new_mean = mean + delta / nobs
+            ssq = np.where(hit, ssq + delta * (x - new_mean), ssq)
+            mean = np.where(hit, new_mean, mean)
+            same = np.where(hit, np.where(x == prev, same + 1, 1), same)
+            prev = np.where(hit, x, prev)
+            if op == 0:
+                row = total.copy()
+            elif op == 1:
+                row = np.where(same >= nobs, prev, total / nobs)
+            else:
+                row = np.where(same >= nobs, 0.0, np.sqrt(np.maximum(ssq, 0.0) / (nobs - 1)))
+                row[nobs < 2] = np.nan
+            row[(nobs < min_periods) | ((nobs == 0) & (op != 0))] = np.nan
+            out[i] = row
+    return out
+
+
+def _rolling_extreme_numpy(values: np.ndarray, window: int, min_periods: int, op: str) -> np.ndarray:
+    """按 window 分块，窗口极值 = 前一块的后缀极值与本块的前缀极值中的较大（小）者，NaN 被忽略"""
+    reduce = np.fmax if op == 'max' else np.fmin
+    n, m = values.shape
+    blocks = -(-n // window)
+    padded = np.full((blocks * window, m), np.nan)
+    padded[:n] = values
+    padded = padded.reshape(blocks, window, m)
+    prefix = reduce.accumulate(padded, axis=1).reshape(-1, m)[:n]
+    suffix = reduce.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, m)
+    out = prefix.copy()
+    if n >= window:
+        out[window - 1:] = reduce(suffix[:n - window + 1], prefix[window - 1:])
+    nobs = _window_sums((~np.isnan(values)).astype(float), window)
+    out[nobs < max(min_periods, 1)] = np.nan
+    return out
+
+
+def rolling(values, window: int, op: str, min_periods: Optional[int] = None,
+            backend: Optional[str] = None) -> np.ndarray:
+    """
+    滚动窗口统计
+    :param values: 1-D 或 2-D（日期 × 股票）数组
+    :param op: ROLLING_OPS 之一；std 为样本标准差（ddof=1）
+    :param min_periods: 窗口内至少需要的有效值个数，默认 window
+    """
+    if op not in ROLLING_OPS:
+        raise ValueError(f"未知的滚动统计: {op}，可选：{ROLLING_OPS}")
+    if window <= 0:
+        raise ValueError("窗口期必须为正整数")
+    min_periods = window if min_periods is None else min_periods
+    arr = _as_2d(values)
+    if _use_jit(backend):
+        if op in ('min', 'max'):
+            out = _get_jit_rolling('extreme')(arr, window, max(min_periods, 1), op == 'max')
+        else:
+            out = _get_jit_rolling('moments')(arr, window, min_periods, ROLLING_OPS.index(op))
+    elif op in ('min', 'max'):
+        out = _rolling_extreme_numpy(arr, window, min_periods, op)
+    elif arr.shape[1] == 1:
+        out = np.array(_moments_1d(arr[:, 0].tolist(), window, min_periods, ROLLING_OPS.index(op)))[:, None]
+    else:
+        out = _moments_numpy(arr, window, min_periods, ROLLING_OPS.index(op))
+    return out.reshape(np.shape(values))
+
+
+def _ewm_numpy(values: np.ndarray, alpha: float) -> np.ndarray:
+    """沿时间循环、对股票向量化，运算顺序与 numba 内核相同"""
+    out = np.empty_like(values)
+    weighted = np.full(values.shape[1], np.nan)
+    old_wt = np.ones(values.shape[1])
+    for i, x in enumerate(values):
+        started = ~np.isnan(weighted)
+        observed = ~np.isnan(x)
+        old_wt = np.where(started, old_wt * (1.0 - alpha), old_wt)
+        update = started & observed & (weighted != x)
+        new_wt = 1.0 - old_wt if alpha == 0.5 else alpha
+        with np.errstate(invalid='ignore'):
+            blended = (old_wt * weighted + new_wt * x) / (old_wt + new_wt)
+        weighted = np.where(update, blended, np.where(~started & observed, x, weighted))
+        old_wt = np.where(started & observed, 1.0, old_wt)
+        out[i] = weighted
+    return out
+
+
+def _ewm_1d(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    单只股票：在 Python float 上循环（同 _recursive_filter_1d）
+    pandas 在 alpha=0.5（com=1）且 adjust=False 时把新值权重取为 1 - old_wt（为不等间隔的 times 准备的分支），
+    只在 NaN 缺口之后与一般公式不同；这里照搬，保证含缺口的序列也与 pandas 一致
+    """
+    out = values.tolist()
+    weighted, old_wt = NAN, 1.0
+    for i, x in enumerate(out):
+        if weighted == weighted:
+            old_wt *= 1.0 - alpha
+            if x == x:
+                if weighted != x:
+                    new_wt = 1.0 - old_wt if alpha == 0.5 else alpha
+                    weighted = (old_wt * weighted + new_wt * x) / (old_wt + new_wt)
+                old_wt = 1.0
+        elif x == x:
+            weighted = x
+        out[i] = weighted
+    return np.array(out, dtype=float)
+
+
+def ewm(values, alpha: float, backend: Optional[str] = None) -> np.ndarray:
+    """固定 alpha 的指数加权均值（adjust=False），首个有效值之前为 NaN"""
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha 必须在 (0, 1] 区间内")
+    arr = _as_2d(values)
+    if _use_jit(backend):
+        out = _get_jit_rolling('ewm')(arr, float(alpha))
+    elif arr.shape[1] == 1:
+        out = _ewm_1d(arr[:, 0], alpha)[:, None]
+    else:
+        out = _ewm_numpy(arr, alpha)
+    return out.reshape(np.shape(values))
+
+
+def wilder(values, period: int, backend: Optional[str] = None) -> np.ndarray:
+    """Wilder 平滑：alpha = 1/period 的指数加权均值（RSI、ATR、ADX 使用的平滑方式）"""
+    if period <= 0:
+        raise ValueError("周期必须为正整数")
+    return ewm(values, 1.0 / period, backend)
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """真实波幅 max(最高-最低, |最高-昨收|, |最低-昨收|)，首根K线为 最高-最低"""
+    high, low, close = (np.asarray(v, dtype=float) for v in (high, low, close))
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
@@ -0,0 +1,126 @@
+# src/indicators/panel.py
+"""
+面板数据（日期 × 股票）
+
+各股票的K线按日期并集对齐成 2-D 数组，停牌日和上市前的日期为 NaN，由 mask 标记。
+批量计算时先把每列的有效K线"压紧"到顶部（pack），这样每一列就等价于该股票自己的
+连续K线序列，滚动窗口、EMA 初值等语义与逐只股票调用 calculate 完全一致；
+算完再按原位置展开（unpack），无效位置填 NaN。
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 面板中的价格字段（与行情数据的中文列名一致）
+PANEL_FIELDS = ['开盘', '收盘', '最高', '最低', '成交量']
+
+
+@dataclass
+class Panel:
+    dates: pd.DatetimeIndex
+    symbols: List[str]
+    data: Dict[str, np.ndarray]          # 字段名 -> (日期 × 股票) float64 数组
+    mask: Optional[np.ndarray] = None    # True 表示该日该股票有有效K线
+    _order: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+    _flat_order: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        # 不修改调用方的字典和数组：无效位置需要改写为 NaN 时先复制
+        shape = (len(self.dates), len(self.symbols))
+        data = {}
+        for name, values in self.data.items():
+            values = np.asarray(values, dtype=float)
+            if values.shape != shape:
+                raise ValueError(f"字段 {name} 的形状 {values.shape} 与面板 {shape} 不一致")
+            data[name] = values
+        self.data = data
+        if self.mask is None:
+            self.mask = ~np.isnan(self.data['收盘'])
+        self.mask = np.asarray(self.mask, dtype=bool)
+        # 保证无效位置一定是 NaN
+        invalid = ~self.mask
+        for name, values in self.data.items():
+            if not np.isnan(values[invalid]).all():
+                values = self.data[name] = values.copy()
+                values[invalid] = np.nan
+
+    @property
+    def shape(self):
+        return self.mask.shape
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame],
+                    fields: Iterable[str] = PANEL_FIELDS) -> 'Panel':
+        """由 {股票代码: 以日期为索引的行情 DataFrame} 构建面板（日期取并集）"""
+        frames = {symbol: df for symbol, df in frames.items() if len(df)}
+        fields = list(fields)
+        if not frames:
+            return cls(pd.DatetimeIndex([], name='日期'), [], {f: np.empty((0, 0)) for f in fields})
+        dates = pd.DatetimeIndex(
+            sorted(set().union(*(pd.to_datetime(df.index) for df in frames.values()))), name='日期')
+        symbols = list(frames)
+        data = {f: np.full((len(dates), len(symbols)), np.nan) for f in fields}
+        for j, df in enumerate(frames.values()):
+            rows = dates.get_indexer(pd.to_datetime(df.index))
+            for f in fields:
+                if f in df.columns:
+                    data[f][rows, j] = df[f].to_numpy(dtype=float)
+        return cls(dates, symbols, data)
+
+    @classmethod
+    def from_store(cls, store, symbols: Iterable[str], start=None, end=None) -> 'Panel':
+        """从本地行情库 PriceStore 构建面板（直接读列数组，不经过逐只股票的 DataFrame），库中不存在的股票会被跳过"""
+        arrays = {}
+        for symbol in symbols:
+            if store.has(symbol):
+                columns = store.read_arrays(symbol, start, end, PANEL_FIELDS)
+                if len(columns['日期']):
+                    arrays[symbol] = columns
+        if not arrays:
+            return cls(pd.DatetimeIndex([], name='日期'), [], {f: np.empty((0, 0)) for f in PANEL_FIELDS})
+        days = np.unique(np.concatenate([columns['日期'] for columns in arrays.values()]))
+        data = {f: np.full((len(days), len(arrays)), np.nan) for f in PANEL_FIELDS}
+        for j, columns in enumerate(arrays.values()):
+            rows = np.searchsorted(days, columns['日期'])
+            for f in PANEL_FIELDS:
+                data[f][rows, j] = columns[f]
+        dates = pd.DatetimeIndex(days.astype('datetime64[ns]'), name='日期')
+        return cls(dates, list(arrays), data)
+
+    def _pack_order(self) -> np.ndarray:
+        # 每列稳定排序：有效K线按原顺序排在前面
+        if self._order is None:
+            self._order = np.argsort(~self.mask, axis=0, kind='stable')
+        return self._order
+
+    def _flat_pack_order(self) -> np.ndarray:
+        # 压紧后第 (k, j) 个元素在原数组展平后的位置；展平下标的取数比 take_along_axis 快数倍
+        if self._flat_order is None:
+            order = self._pack_order()
+            self._flat_order = (order * order.shape[1] + np.arange(order.shape[1])).ravel()
+        return self._flat_order
+
+    def pack(self, fields: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """把每列的有效K线压紧到顶部，尾部为 NaN"""
+        flat = self._flat_pack_order()
+        names = self.data if fields is None else fields
+        return {name: np.ascontiguousarray(self.data[name]).ravel()[flat].reshape(self.shape) for name in names}
+
+    def unpack(self, packed: np.ndarray) -> np.ndarray:
+        """pack 的逆操作，无效位置填 NaN"""
+        out = np.empty(self.shape, dtype=float)
+        out.ravel()[self._flat_pack_order()] = np.asarray(packed, dtype=float).ravel()
+        out[~self.mask] = np.nan
+        return out
+
+    def column_frame(self, j: int) -> pd.DataFrame:
+        """取出第 j 只股票的有效K线（以日期为索引的 DataFrame）"""
+        valid = self.mask[:, j]
+        return pd.DataFrame({name: values[valid, j] for name, values in self.data.items()},
+                            index=self.dates[valid])
+
+    def to_frame(self, values: np.ndarray) -> pd.DataFrame:
+        """把 (日期 × 股票) 数组包装成 DataFrame"""
+        return pd.DataFrame(values, index=self.dates, columns=self.symbols)
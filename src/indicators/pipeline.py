@@ -0,0 +1,132 @@
+# src/indicators/pipeline.py
+"""
+指标流水线：一次计算多个（指标, 参数）请求，共享中间结果
+
+    pipeline = IndicatorPipeline([("MACD", {}), ("薛斯通道", {"N": 40}), ("ADX", {})])
+    pipeline.plan()            # 去重后的原语依赖图（按计算顺序）
+    frame = pipeline.run_frame(df)
+
+各指标通过 primitives() 声明依赖的原语，流水线先按依赖顺序把所有原语各算一次，
+再由各指标的 compute 从同一个 PrimitiveContext 取值组装输出。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from profiling import stage
+from .primitives import Key, PrimitiveContext, topological_order
+from .register import get_registry
+from .technical import TechnicalIndicator
+
+IndicatorSpec = Union[str, type, TechnicalIndicator]
+
+
+def build_indicator(spec: IndicatorSpec, params: Dict[str, Any] = None) -> TechnicalIndicator:
+    """由指标名、指标类或实例得到指标实例"""
+    params = params or {}
+    if isinstance(spec, TechnicalIndicator):
+        if params:
+            raise ValueError("传入指标实例时不能再指定参数")
+        return spec
+    if isinstance(spec, str):
+        registry = get_registry()
+        if spec not in registry:
+            raise KeyError(f"指标 '{spec}' 不存在，支持指标：{', '.join(registry.keys())}")
+        spec = registry[spec]
+    return spec.create(**params)
+
+
+def request_label(indicator: TechnicalIndicator, params: Dict[str, Any]) -> str:
+    """请求标签，如 MACD 或 薛斯通道(N=40,M=10)"""
+    if not params:
+        return indicator.INDICATOR_NAME
+    args = ",".join(f"{k}={v}" for k, v in params.items())
+    return f"{indicator.INDICATOR_NAME}({args})"
+
+
+class IndicatorPipeline:
+    def __init__(self, requests: Iterable[Tuple[IndicatorSpec, Dict[str, Any]]]):
+        """
+        :param requests: [(指标名/指标类/实例, 参数字典), ...]
+        """
+        self.indicators: Dict[str, TechnicalIndicator] = {}
+        for spec, params in requests:
+            indicator = build_indicator(spec, params)
+            label = request_label(indicator, params or {})
+            if label in self.indicators:
+                continue  # 完全相同的请求只保留一次
+            self.indicators[label] = indicator
+
+    def plan(self) -> List[Key]:
+        """所有请求依赖的原语，去重并按依赖顺序排列"""
+        keys = []
+        for indicator in self.indicators.values():
+            keys.extend(indicator.primitives())
+        return topological_order(keys)
+
+    def warmup_bars(self) -> Optional[int]:
+        """所有请求中最长的预热K线数，任一请求需要全部历史时为 None"""
+        bars = [indicator.warmup_bars() for indicator in self.indicators.values()]
+        if not bars or any(b is None for b in bars):
+            return None
+        return max(bars)
+
+    def _run(self, ctx: PrimitiveContext, fallback) -> Tuple[Dict[str, Dict[str, Any]], set]:
+        """返回 (各请求的输出, 走了 fallback 的请求标签)"""
+        for key in self.plan():
+            ctx[key]
+        rows = int(np.size(next(iter(ctx.data.values())))) if ctx.data else 0  # 面板为 K线数 × 股票数
+        results, fallback_labels = {}, set()
+        for label, indicator in self.indicators.items():
+            with stage(f"calculate:{indicator.INDICATOR_NAME}", rows=rows):
+                try:
+                    results[label] = indicator.compute(ctx)
+                except NotImplementedError:
+                    # 未接入原语的指标单独计算
+                    results[label] = fallback(indicator)
+                    fallback_labels.add(label)
+        return results, fallback_labels
+
+    def run(self, df: pd.DataFrame) -> Dict[str, Dict[str, pd.Series]]:
+        """单只股票：返回 {请求标签: {输出列名: Series}}"""
+        def fallback(indicator):
+            out = indicator.calculate(df.copy())
+            return {name: out[name] for name in out.columns.difference(df.columns, sort=False)}
+
+        return self._run(PrimitiveContext.from_frame(df), fallback)[0]
+
+    def run_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """单只股票：返回在 df 基础上追加所有输出列的新 DataFrame，列名冲突时加上请求标签前缀"""
+        results = self.run(df)
+        counts: Dict[str, int] = {}
+        for outputs in results.values():
+            for name in outputs:
+                counts[name] = counts.get(name, 0) + 1
+        columns = {}
+        for label, outputs in results.items():
+            for name, values in outputs.items():
+                columns[name if counts[name] == 1 else f"{label}.{name}"] = values
+        return df.assign(**columns)
+
+    def run_packed(self, data: Dict[str, np.ndarray],
+                   ctx: Optional[PrimitiveContext] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        压紧布局的多只股票（见 Panel.pack，每列一只股票、有效K线在顶部）：
+        返回 {请求标签: {输出列名: 同形状数组}}；指标须实现 compute 或 calculate_packed
+        :param ctx: 基于同一份 data 的原语上下文，多组参数依次运行时传入同一个以共享原语
+        """
+        ctx = ctx if ctx is not None else PrimitiveContext(data)
+        results, _ = self._run(ctx, lambda indicator: indicator.calculate_packed(data))
+        return {label: {name: np.asarray(values, dtype=float) for name, values in outputs.items()}
+                for label, outputs in results.items()}
+
+    def run_panel(self, panel) -> Dict[str, Dict[str, np.ndarray]]:
+        """面板：返回 {请求标签: {输出列名: (日期 × 股票) 数组}}"""
+        results, fallback_labels = self._run(PrimitiveContext(panel.pack()),
+                                             lambda indicator: indicator.calculate_panel(panel))
+        for label, outputs in results.items():
+            if label not in fallback_labels:  # compute 的结果仍是压紧布局
+                results[label] = {name: panel.unpack(np.asarray(values, dtype=float))
+                                  for name, values in outputs.items()}
+        return results
@@ -0,0 +1,315 @@
+# src/indicators/primitives.py
+"""
+指标计算的公共原语（WAP、TR、EMA、滚动均值/标准差/极值、Wilder 平滑、趋向指标……）
+
+每个原语用一个元组 key 描述，例如 ema('收盘', 12) == ('ema', ('field', '收盘'), 12)。
+key 中嵌套的 key 即依赖关系，PrimitiveContext 按 key 记忆化，
+因此多个指标（或同一指标的多组参数）用到同一个原语时只计算一次。
+
+原语的值是 pandas 对象：单只股票时为 Series，面板批量计算时为 DataFrame（列为股票）。
+滚动窗口和平滑类原语都在原始数组上调用 kernels 中的单次遍历内核，面板的所有股票一次算完。
+"""
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from profiling import stage
+from . import kernels
+
+Key = Tuple[Hashable, ...]
+PRIMITIVES: Dict[str, Callable[..., Any]] = {}
+
+
+def register_primitive(name: str):
+    """注册原语计算函数的装饰器，函数参数中的 key 会先被解析为对应的值"""
+    def decorator(func):
+        PRIMITIVES[name] = func
+        return func
+    return decorator
+
+
+def is_key(value) -> bool:
+    return isinstance(value, tuple) and bool(value) and value[0] in PRIMITIVES
+
+
+def _source(src: Union[str, Key]) -> Key:
+    """字符串视为行情字段名"""
+    return field(src) if isinstance(src, str) else src
+
+
+# ---------------- key 构造 ----------------
+
+def field(name: str) -> Key:
+    return ('field', name)
+
+
+def wap() -> Key:
+    """加权平均价格 (2*收盘 + 最高 + 最低) / 4"""
+    return ('wap',)
+
+
+def true_range() -> Key:
+    return ('tr',)
+
+
+def ema(src, span: int) -> Key:
+    return ('ema', _source(src), span)
+
+
+def sma(src, window: int, min_periods: int = None) -> Key:
+    return ('sma', _source(src), window, min_periods)
+
+
+def rolling_std(src, window: int, min_periods: int = None) -> Key:
+    return ('std', _source(src), window, min_periods)
+
+
+def rolling_sum(src, window: int, min_periods: int = None) -> Key:
+    return ('sum', _source(src), window, min_periods)
+
+
+def rolling_max(src, window: int, min_periods: int = None) -> Key:
+    return ('max', _source(src), window, min_periods)
+
+
+def rolling_min(src, window: int, min_periods: int = None) -> Key:
+    return ('min', _source(src), window, min_periods)
+
+
+def wilder(src, period: int) -> Key:
+    """Wilder 平滑（alpha = 1/period 的 EMA）"""
+    return ('wilder', _source(src), period)
+
+
+def directional_movement(sign: str) -> Key:
+    """趋向变动 +DM（sign='+'）/ -DM（sign='-'）"""
+    return ('dm', sign)
+
+
+def directional_index(sign: str, window: int = 14) -> Key:
+    """+DI / -DI = 100 * Wilder(±DM) / Wilder(TR)"""
+    return ('di', wilder(directional_movement(sign), window), wilder(true_range(), window))
+
+
+def dx(window: int = 14) -> Key:
+    """DX = 100 * |+DI - -DI| / (+DI + -DI)"""
+    return ('dx', directional_index('+', window), directional_index('-', window))
+
+
+def diff(src) -> Key:
+    return ('diff', _source(src))
+
+
+def clip(src, lower=None, upper=None) -> Key:
+    return ('clip', _source(src), lower, upper)
+
+
+def sub(a, b) -> Key:
+    return ('sub', _source(a), _source(b))
+
+
+def bfill(src) -> Key:
+    return ('bfill', _source(src))
+
+
+def volatility(window: int = 20) -> Key:
+    """|WAP - MA(收盘)| / MA(收盘)，与 TechnicalBase.volatility 一致"""
+    return ('volatility', window)
+
+
+def dynamic_ma(src, alpha) -> Key:
+    return ('dma', _source(src), _source(alpha))
+
+
+def dependencies(key: Key) -> List[Key]:
+    """key 的直接依赖（包括原语内部隐含使用的其他原语）"""
+    deps = [arg for arg in key[1:] if is_key(arg)]
+    deps.extend(_IMPLICIT_DEPS.get(key[0], lambda k: [])(key))
+    return deps
+
+
+def topological_order(keys) -> List[Key]:
+    """按依赖顺序展开并去重"""
+    order: List[Key] = []
+    seen = set()
+
+    def visit(key):
+        if key in seen:
+            return
+        seen.add(key)
+        for dep in dependencies(key):
+            visit(dep)
+        order.append(key)
+
+    for key in keys:
+        visit(key)
+    return order
+
+
+# ---------------- 原语实现 ----------------
+
+@register_primitive('field')
+def _field(ctx, name):
+    return ctx.data[name]
+
+
+@register_primitive('wap')
+def _wap(ctx):
+    close, high, low = ctx[field('收盘')], ctx[field('最高')], ctx[field('最低')]
+    return (2 * close + high + low) / 4
+
+
+def _like(src, values: np.ndarray, name=None):
+    """把内核输出的数组包装成与 src 相同的 pandas 类型"""
+    if isinstance(src, pd.DataFrame):
+        return pd.DataFrame(values, index=src.index, columns=src.columns, copy=False)
+    return pd.Series(values, index=src.index, name=name, copy=False)
+
+
+def _values(src) -> np.ndarray:
+    return src.to_numpy(dtype=float)
+
+
+@register_primitive('tr')
+def _true_range(ctx):
+    high, low, close = ctx[field('最高')], ctx[field('最低')], ctx[field('收盘')]
+    return _like(close, kernels.true_range(_values(high), _values(low), _values(close)), 'TR')
+
+
+@register_primitive('ema')
+def _ema(ctx, src, span):
+    return _like(src, kernels.ewm(_values(src), 2.0 / (span + 1.0)))
+
+
+@register_primitive('wilder')
+def _wilder(ctx, src, period):
+    return _like(src, kernels.wilder(_values(src), period))
+
+
+@register_primitive('sma')
+def _sma(ctx, src, window, min_periods):
+    return _like(src, kernels.rolling(_values(src), window, 'mean', min_periods))
+
+
+@register_primitive('std')
+def _rolling_std(ctx, src, window, min_periods):
+    return _like(src, kernels.rolling(_values(src), window, 'std', min_periods))
+
+
+@register_primitive('sum')
+def _rolling_sum(ctx, src, window, min_periods):
+    return _like(src, kernels.rolling(_values(src), window, 'sum', min_periods))
+
+
+@register_primitive('max')
+def _rolling_max(ctx, src, window, min_periods):
+    return _like(src, kernels.rolling(_values(src), window, 'max', min_periods))
+
+
+@register_primitive('min')
+def _rolling_min(ctx, src, window, min_periods):
+    return _like(src, kernels.rolling(_values(src), window, 'min', min_periods))
+
+
+@register_primitive('dm')
+def _directional_movement(ctx, sign):
+    high, low = ctx[field('最高')], ctx[field('最低')]
+    up = _values(high.diff())
+    down = -_values(low.diff())
+    move, other = (up, down) if sign == '+' else (down, up)
+    # 只有本方向的变动更大且为正时才计入，首根K线为 0；缺失K线保持 NaN
+    dm = np.where((move > other) & (move > 0), move, 0.0)
+    dm[np.isnan(_values(high)) | np.isnan(_values(low))] = np.nan
+    return _like(high, dm)
+
+
+@register_primitive('di')
+def _directional_index(ctx, dm, tr):
+    return 100 * dm / tr
+
+
+@register_primitive('dx')
+def _dx(ctx, plus_di, minus_di):
+    return 100 * (plus_di - minus_di).abs() / (plus_di + minus_di)
+
+
+@register_primitive('diff')
+def _diff(ctx, src):
+    return src.diff()
+
+
+@register_primitive('clip')
+def _clip(ctx, src, lower, upper):
+    return src.clip(lower=lower, upper=upper)
+
+
+@register_primitive('sub')
+def _sub(ctx, a, b):
+    return a - b
+
+
+@register_primitive('bfill')
+def _bfill(ctx, src):
+    return src.bfill()
+
+
+@register_primitive('volatility')
+def _volatility(ctx, window):
+    ma = ctx[sma('收盘', window, 1)]
+    return ((ctx[wap()] - ma).abs() / ma).fillna(0)
+
+
+@register_primitive('dma')
+def _dynamic_ma(ctx, src, alpha):
+    return _like(src, kernels.recursive_filter(_values(src), _values(alpha)), 'DMA')
+
+
+# 原语函数内部通过 ctx[...] 用到的依赖，供 plan 使用
+_IMPLICIT_DEPS = {
+    'wap': lambda k: [field('收盘'), field('最高'), field('最低')],
+    'tr': lambda k: [field('最高'), field('最低'), field('收盘')],
+    'dm': lambda k: [field('最高'), field('最低')],
+    'volatility': lambda k: [wap(), sma('收盘', k[1], 1)],
+}
+
+
+class PrimitiveContext(Mapping):
+    """
+    按 key 记忆化的原语值
+    :param data: 字段名 -> Series（单只股票）或 DataFrame / 2-D 数组（面板，每列一只股票）
+    """
+
+    def __init__(self, data: Mapping[str, Any]):
+        self.data = {
+            name: pd.DataFrame(values, copy=False) if isinstance(values, np.ndarray) and values.ndim == 2
+            else values
+            for name, values in data.items()
+        }
+        self._cache: Dict[Key, Any] = {}
+        self.computed: List[Key] = []  # 实际计算过的原语（按计算顺序）
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'PrimitiveContext':
+        return cls({col: df[col] for col in df.columns})
+
+    def __getitem__(self, key: Key):
+        if key in self._cache:
+            return self._cache[key]
+        if not is_key(key):
+            raise KeyError(f"未知的原语: {key!r}")
+        args = [self[arg] if is_key(arg) else arg for arg in key[1:]]
+        with stage(f"primitive:{key[0]}"):  # 依赖的原语已在上一行算好，这里只计本原语
+            value = PRIMITIVES[key[0]](self, *args)
+        self._cache[key] = value
+        self.computed.append(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._cache
+
+    def __iter__(self) -> Iterator[Key]:
+        return iter(self._cache)
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -1,81 +1,103 @@
 # register.py
+"""
+指标注册表
+
+指标名与所在模块、类名写在静态清单 INDICATOR_MANIFEST 中，导入 indicators 包时不会加载任何指标模块；
+某个指标第一次被访问（INDICATOR_REGISTRY[name]）时才导入对应模块。
+列出指标名、判断指标是否存在都只读清单，不触发导入。
+"""
+from collections.abc import MutableMapping
 from importlib import import_module
-from pathlib import Path
-import sys
-
-
-# 这里的__all__变量是一个约定，用于定义模块的公共接口。
-# 当使用from module import *语句时，只有在__all__中列出的名称会被导入。
-
-# __all__ = ["SchaffChannel", "ADX", "TechnicalBase"]
-
-# # 添加项目根目录到Python路径（关键步骤）
-# project_root = Path(__file__).parent.parent.resolve()  # 上两级目录（到stock_analyzer根目录）
-# if str(project_root) not in sys.path:
-#     sys.path.insert(0, str(project_root))
-
-# # print("INDICATOR_REGISTRY路径配置调试:", sys.path)  # 调试语句
-
-# INDICATOR_REGISTRY = {}
-# def register_indicator(module_name):
-#     """使用绝对导入路径"""
-#     module_path = f"indicators.{module_name}"  # 绝对路径（相对于项目根目录）
-#     try:
-#         module = import_module(module_path)
-#         # 通过 importlib 实现运行时反射加载，相比静态导入的优势：
-#         # 延迟加载（只有在注册时才加载模块）
-#         # 支持热插拔（新增指标无需重启服务）
-#         # 错误隔离（单个模块加载失败不影响整体流程）
-        
-#     except ImportError as e:
-#         print(f"模块加载失败: {module_path} ({str(e)})", file=sys.stderr)
-#         return
-    
-#     for cls_name in dir(module):    
-#     # 遍历模块中的所有类 
-#     # dir()在Python中用于列出一个对象的所有属性和方法。
-#     # 当传入一个模块对象时，它会返回列表包含:模块中所有定义的名称，比如函数、类、变量等。
-#         cls = getattr(module, cls_name)             # 获取类对象
-#         if hasattr(cls, 'INDICATOR_NAME'):          # 检查类是否有INDICATOR_NAME属性
-#             INDICATOR_REGISTRY[cls.INDICATOR_NAME] = cls
-#             print(f"注册指标: {cls.INDICATOR_NAME}")
-
-# # 自动发现所有指标模块（确保文件名与模块名一致）
-# indicator_files = ["indicator_schaff", "technical", "indicator_ADX"]
-# for file in indicator_files:
-#     register_indicator(file)
-
-INDICATOR_REGISTRY = {}
+from typing import Dict, Iterator
+
+# 指标名 -> "模块名:类名"（模块相对于 indicators 包）
+INDICATOR_MANIFEST: Dict[str, str] = {
+    "薛斯通道": "indicator_schaff:SchaffChannel",
+    "ADX": "indicator_ADX:ADX",
+    "MACD": "indicator_macd:MACD",
+    "Donchian": "indicator_donchian:DonchianChannel",
+    "Keltner": "indicator_keltner:KeltnerChannel",
+}
+
+
+class IndicatorRegistry(MutableMapping):
+    """指标名 -> 指标类，按需导入"""
+
+    def __init__(self, manifest: Dict[str, str]):
+        self._manifest = dict(manifest)
+        self._classes: Dict[str, type] = {}
+
+    def _load(self, name: str) -> type:
+        module_name, cls_name = self._manifest[name].split(":")
+        module_path = f"{__package__}.{module_name}"
+        try:
+            module = import_module(module_path)
+        except ImportError as e:
+            from loguru import logger
+
+            # 错误隔离：单个模块加载失败不影响其他指标
+            logger.warning(f"模块加载失败: {module_path} ({e})")
+            raise KeyError(name) from e
+        cls = getattr(module, cls_name)
+        self._classes[name] = cls
+        return cls
+
+    def __getitem__(self, name: str) -> type:
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+        if name not in self._manifest:
+            raise KeyError(name)
+        return self._load(name)
+
+    def __setitem__(self, name: str, cls: type) -> None:
+        self._classes[name] = cls
+
+    def __delitem__(self, name: str) -> None:
+        found = self._classes.pop(name, None) is not None
+        found = self._manifest.pop(name, None) is not None or found
+        if not found:
+            raise KeyError(name)
+
+    def __contains__(self, name) -> bool:
+        return name in self._classes or name in self._manifest
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(dict.fromkeys([*self._manifest, *self._classes]))
+
+    def __len__(self) -> int:
+        return len(set(self._manifest) | set(self._classes))
+
+    def loaded(self) -> Dict[str, type]:
+        """已经导入的指标"""
+        return dict(self._classes)
+
+
+INDICATOR_REGISTRY = IndicatorRegistry(INDICATOR_MANIFEST)
 
 def register_indicator(module_name):
-    """动态注册技术指标"""
-    module_path = f"indicators.{module_name}"  
+    """立即导入模块，并注册其中所有带 INDICATOR_NAME 的指标类（用于清单之外的自定义指标模块）"""
+    module_path = f"{__package__}.{module_name}"
     try:
         module = import_module(module_path)
-        # 通过 importlib 实现运行时反射加载，相比静态导入的优势：
-        # 延迟加载（只有在注册时才加载模块）
-        # 支持热插拔（新增指标无需重启服务）
-        # 错误隔离（单个模块加载失败不影响整体流程）
     except ImportError as e:
-        print(f"模块加载失败: {module_path} ({str(e)})", file=sys.stderr)
+        from loguru import logger
+
+        logger.warning(f"模块加载失败: {module_path} ({e})")
         return
-    
-    for cls_name in dir(module):    
-    # 遍历模块中的所有类 
-    # dir()在Python中用于列出一个对象的所有属性和方法。
-    # 当传入一个模块对象时，它会返回列表包含:模块中所有定义的名称，比如函数、类、变量等。
-        cls = getattr(module, cls_name)             # 获取类对象
-        if hasattr(cls, 'INDICATOR_NAME') and cls.INDICATOR_NAME:  # 检查类是否有INDICATOR_NAME属性且不为空
+
+    for cls_name in dir(module):
+        cls = getattr(module, cls_name)
+        if isinstance(cls, type) and getattr(cls, 'INDICATOR_NAME', None):
             INDICATOR_REGISTRY[cls.INDICATOR_NAME] = cls
-            print(f"注册指标: {cls.INDICATOR_NAME}")
-        elif hasattr(cls, 'INDICATOR_NAME'):
-            print(f"警告: 发现未命名的指标类 {cls.__name__}")
 
 def register_all_indicators():
-    """自动发现所有指标模块"""
-    indicator_files = ["indicator_schaff", "indicator_ADX", "indicator_macd"]
-    for file in indicator_files:
-        register_indicator(file)
+    """立即导入清单中的所有指标（一般不需要调用，访问时会自动导入）"""
+    for name in list(INDICATOR_MANIFEST):
+        try:
+            INDICATOR_REGISTRY[name]
+        except KeyError:
+            pass
 
 
 def get_registry():
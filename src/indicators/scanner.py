@@ -0,0 +1,292 @@
+# src/indicators/scanner.py
+"""
+全市场信号扫描
+
+    result = scan_market(["MACD crosses_above Signal", "收盘 > 动态趋势上轨"])
+    result.top(20)
+
+条件是声明式的字符串 "左 运算符 右"，多个条件同时满足才算命中：
+- 运算符：> >= < <=，以及 crosses_above / crosses_below（别名 上穿 / 下穿，比较最后两根K线）
+- 操作数：行情字段（开盘/收盘/最高/最低/成交量）、指标输出列（如 Signal、动态趋势上轨，
+  同名列属于多个指标时写成 指标名.列名，如 MACD.MACD）或数字
+
+股票按块分给工作进程，每块只读取各指标 warmup_bars() 所需的最近K线，在压紧布局上一次算完整块，
+只在最后两根K线上判断条件，内存占用与块大小成正比。
+命中结果按 rank_by 指定的列排序（默认第一个条件的相对差值 (左 - 右) / |右|）。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import PRICE_STORE_DIR
+from .panel import PANEL_FIELDS
+from .pipeline import IndicatorPipeline, build_indicator, request_label
+from .register import get_registry
+
+COMPARATORS = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}
+CROSSES = {'crosses_above': 'crosses_above', 'crosses_below': 'crosses_below',
+           '上穿': 'crosses_above', '下穿': 'crosses_below'}
+_CONDITION_RE = re.compile(r'^\s*(\S+)\s+(>=|<=|>|<|crosses_above|crosses_below|上穿|下穿)\s+(\S+)\s*$')
+
+Operand = Union[float, Tuple[Optional[str], str]]   # 数字，或 (请求标签, 列名)，行情字段的请求标签为 None
+Request = Tuple[str, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class Condition:
+    left: str
+    op: str
+    right: str
+
+    @classmethod
+    def parse(cls, text: str) -> 'Condition':
+        """解析 "左 运算符 右"（运算符两侧需要空格）"""
+        match = _CONDITION_RE.match(text)
+        if not match:
+            raise ValueError(f"无法解析条件 '{text}'，格式为 '左 运算符 右'，"
+                             f"运算符：{', '.join([*COMPARATORS, *CROSSES])}")
+        left, op, right = match.groups()
+        return cls(left, CROSSES.get(op, op), right)
+
+    def __str__(self) -> str:
+        return f"{self.left} {self.op} {self.right}"
+
+
+def compare(op: str, cur_l: np.ndarray, cur_r: np.ndarray,
+            prev_l: Optional[np.ndarray] = None, prev_r: Optional[np.ndarray] = None) -> np.ndarray:
+    """按运算符比较两组数组（上穿/下穿需要上一根K线的值），NaN 参与的比较为 False"""
+    with np.errstate(invalid='ignore'):
+        if op in COMPARATORS:
+            return COMPARATORS[op](cur_l, cur_r)
+        if op == 'crosses_above':
+            return (prev_l <= prev_r) & (cur_l > cur_r)
+        return (prev_l >= prev_r) & (cur_l < cur_r)
+
+
+def _number(token: str) -> Optional[float]:
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def resolve_operand(token: str, indicators: Dict[str, Any]) -> Operand:
+    """
+    把操作数解析为数字、行情字段或某个请求的输出列
+    :param indicators: 请求名（指标名）-> (请求标签, 指标实例)
+    """
+    number = _number(token)
+    if number is not None:
+        return number
+    if token in PANEL_FIELDS:
+        return (None, token)
+    if '.' in token:
+        name, column = token.split('.', 1)
+        if name not in indicators:
+            raise KeyError(f"条件中的指标 '{name}' 未参与扫描，可选：{', '.join(indicators)}")
+        label, indicator = indicators[name]
+        if column not in indicator.OUTPUT_COLUMNS:
+            raise KeyError(f"{name} 没有输出列 '{column}'，可选：{', '.join(indicator.OUTPUT_COLUMNS)}")
+        return (label, column)
+    owners = [label for label, indicator in indicators.values() if token in indicator.OUTPUT_COLUMNS]
+    if not owners:
+        raise KeyError(f"未知的操作数 '{token}'：不是行情字段，也不是任何指标的输出列")
+    if len(owners) > 1:
+        raise KeyError(f"列 '{token}' 属于多个指标 {owners}，请写成 指标名.{token}")
+    return (owners[0], token)
+
+
+def indicators_for(conditions: Iterable[Condition], params: Optional[Dict[str, Dict[str, Any]]] = None,
+                   rank_by: Optional[str] = None) -> Dict[str, Any]:
+    """条件（和排序列）用到的指标：指标名 -> (请求标签, 指标实例)"""
+    params = params or {}
+    registry = get_registry()
+    tokens = [t for c in conditions for t in (c.left, c.right)] + ([rank_by] if rank_by else [])
+    names = []
+    for token in tokens:
+        if _number(token) is not None or token in PANEL_FIELDS:
+            continue
+        if '.' in token:
+            names.append(token.split('.', 1)[0])
+        else:
+            names.extend(name for name in registry if token in registry[name].OUTPUT_COLUMNS)
+    unknown = [name for name in params if name not in names]
+    if unknown:
+        raise KeyError(f"参数中的指标 {unknown} 没有出现在条件中")
+    result = {}
+    for name in dict.fromkeys(names):
+        indicator = build_indicator(name, params.get(name))
+        result[name] = (request_label(indicator, params.get(name) or {}), indicator)
+    return result
+
+
+# ---------------- 工作进程 ----------------
+
+def _read_chunk(store, symbols: List[str], date, window: Optional[int]):
+    """读取一块股票最近 window 根K线，返回 (压紧布局的字段数组, 每列K线数, 每列最后日期, 有数据的代码)"""
+    tails = []
+    for symbol in symbols:
+        arrays = store.read_arrays(symbol, end=date, columns=PANEL_FIELDS, tail=window)
+        if len(arrays['日期']):
+            tails.append((symbol, arrays))
+    rows = max((len(a['日期']) for _, a in tails), default=0)
+    data = {f: np.full((rows, len(tails)), np.nan) for f in PANEL_FIELDS}
+    counts = np.empty(len(tails), dtype=np.int64)
+    last_dates = np.empty(len(tails), dtype='datetime64[D]')
+    for j, (_, arrays) in enumerate(tails):
+        n = counts[j] = len(arrays['日期'])
+        last_dates[j] = arrays['日期'][-1]
+        for f in PANEL_FIELDS:
+            data[f][:n, j] = arrays[f]
+    return data, counts, last_dates, [symbol for symbol, _ in tails]
+
+
+def _scan_chunk(task) -> Tuple[pd.DataFrame, np.ndarray]:
+    """扫描一块股票（在工作进程中执行），返回 (命中的行, 各股票最后一根K线的日期)"""
+    from data_processing.price_store import PriceStore
+
+    symbols, requests, conditions, rank_by, store_root, date, window = task
+    data, counts, last_dates, symbols = _read_chunk(PriceStore(store_root), symbols, date, window)
+    if not symbols:
+        return pd.DataFrame(), last_dates
+
+    pipeline = IndicatorPipeline(requests)
+    outputs = pipeline.run_packed(data)
+    # requests 中的指标名各不相同，与 pipeline.indicators 一一对应
+    indicators = {name: (label, pipeline.indicators[label]) for label, (name, _) in
+                  zip(pipeline.indicators, requests)}
+    cols = np.arange(len(symbols))
+    last, prev = counts - 1, counts - 2
+
+    def values(operand: Operand, rows: np.ndarray) -> np.ndarray:
+        if isinstance(operand, float):
+            return np.full(len(rows), operand)
+        label, column = operand
+        array = data[column] if label is None else outputs[label][column]
+        out = array[np.maximum(rows, 0), cols]
+        out[rows < 0] = np.nan
+        return out
+
+    matched = np.ones(len(symbols), dtype=bool)
+    columns: Dict[str, np.ndarray] = {}
+    score = None
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for condition in conditions:
+            left = resolve_operand(condition.left, indicators)
+            right = resolve_operand(condition.right, indicators)
+            cur_l, cur_r = values(left, last), values(right, last)
+            for token, operand, cur in ((condition.left, left, cur_l), (condition.right, right, cur_r)):
+                if not isinstance(operand, float):
+                    columns[token] = cur
+            if condition.op in COMPARATORS:
+                matched &= compare(condition.op, cur_l, cur_r)
+            else:
+                matched &= compare(condition.op, cur_l, cur_r, values(left, prev), values(right, prev))
+            if score is None:
+                score = (cur_l - cur_r) / np.where(cur_r == 0, 1.0, np.abs(cur_r))
+        if rank_by is not None:
+            score = values(resolve_operand(rank_by, indicators), last)
+            columns.setdefault(rank_by, score)
+
+    table = {'代码': np.array(symbols, dtype=object), '日期': last_dates, '收盘': values((None, '收盘'), last)}
+    table.update(columns)
+    table['score'] = score
+    return pd.DataFrame(table)[matched], last_dates
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ---------------- 对外接口 ----------------
+
+@dataclass
+class ScanResult:
+    matches: pd.DataFrame       # 全部命中，已按 score 排序
+    date: Optional[pd.Timestamp]
+    scanned: int                # 在扫描日有K线的股票数
+    stale: int                  # 扫描日没有K线（停牌、退市）而被跳过的股票数
+    elapsed: float
+    conditions: List[Condition] = field(default_factory=list)
+
+    def top(self, k: int) -> pd.DataFrame:
+        return self.matches.head(k)
+
+
+def scan_market(conditions: Iterable[Union[str, Condition]], symbols: Optional[Iterable[str]] = None,
+                params: Optional[Dict[str, Dict[str, Any]]] = None, date=None,
+                rank_by: Optional[str] = None, ascending: bool = False,
+                store_root=PRICE_STORE_DIR, chunk_size: int = 256,
+                max_workers: Optional[int] = None, progress: bool = True) -> ScanResult:
+    """
+    在本地行情库上扫描全市场
+    :param conditions: 条件字符串或 Condition，全部满足才算命中
+    :param symbols: 股票代码，默认行情库中的全部股票
+    :param params: 指标名 -> 参数字典，未给出的指标使用默认参数
+    :param date: 扫描日（含），默认行情库中最新的交易日；最后一根K线不在该日的股票被跳过
+    :param rank_by: 排序用的操作数（如 Hist、成交量），默认第一个条件的相对差值
+    :param chunk_size: 每块的股票数，决定单个进程的内存占用
+    :param max_workers: 进程数，1 表示在当前进程计算
+    """
+    from data_processing.price_store import PriceStore
+
+    t0 = time.perf_counter()
+    conditions = [c if isinstance(c, Condition) else Condition.parse(c) for c in conditions]
+    if not conditions:
+        raise ValueError("至少需要一个条件")
+    indicators = indicators_for(conditions, params, rank_by)
+    for condition in conditions:  # 在分发任务前检查所有操作数
+        resolve_operand(condition.left, indicators)
+        resolve_operand(condition.right, indicators)
+    if rank_by is not None:
+        resolve_operand(rank_by, indicators)
+
+    requests = [(name, dict((params or {}).get(name) or {})) for name in indicators]
+    pipeline = IndicatorPipeline(requests)
+    warmup = pipeline.warmup_bars() if requests else 0
+    window = None if warmup is None else warmup + 2  # 上穿/下穿需要最后两根K线
+
+    symbols = PriceStore(store_root).symbols() if symbols is None else list(dict.fromkeys(symbols))
+    tasks = [(chunk, requests, conditions, rank_by, str(store_root), date, window)
+             for chunk in _chunks(symbols, chunk_size)]
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks) or 1))
+    if max_workers == 1:
+        parts = map(_scan_chunk, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        parts = executor.map(_scan_chunk, tasks)
+    if progress:
+        from tqdm import tqdm
+        parts = tqdm(parts, total=len(tasks), desc="扫描", unit="块")
+    frames, last_dates = [], []
+    try:
+        for frame, dates in parts:
+            frames.append(frame)
+            last_dates.append(dates)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # 扫描日：指定日期，或所有股票最后一根K线中最新的日期
+    last_dates = np.concatenate(last_dates) if last_dates else np.empty(0, dtype='datetime64[D]')
+    if date is not None:
+        scan_date = pd.Timestamp(date).normalize()
+    else:
+        scan_date = pd.Timestamp(last_dates.max()) if len(last_dates) else None
+    scanned = int((last_dates == np.datetime64(scan_date, 'D')).sum()) if scan_date is not None else 0
+
+    frames = [frame for frame in frames if len(frame)]
+    matches = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['代码', '日期', 'score'])
+    matches['日期'] = pd.to_datetime(matches['日期'])
+    matches = matches[matches['日期'] == scan_date]
+    matches = matches.sort_values('score', ascending=ascending, na_position='last', kind='stable')
+    return ScanResult(matches.reset_index(drop=True), scan_date, scanned, len(symbols) - scanned,
+                      time.perf_counter() - t0, conditions)
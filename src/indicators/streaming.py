@@ -0,0 +1,152 @@
+# src/indicators/streaming.py
+"""
+增量（流式）计算用的状态对象，每根新K线 O(1) 更新
+
+- EWMState：与 pandas ewm(adjust=False).mean() 逐位一致的指数加权均值
+- RollingStats：定长环形缓冲区 + 运行和（Kahan 补偿）/ Welford 方差，
+  对应 rolling(window, min_periods).mean() / .std()，与批量结果在浮点误差范围内一致
+- RollingExtreme：单调队列，对应 rolling(window, min_periods).max() / .min()，结果完全一致
+"""
+from collections import deque
+import math
+from typing import Iterable, Optional
+
+NAN = float('nan')
+
+
+class EWMState:
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None):
+        if alpha is None:
+            if span is None or span < 1:
+                raise ValueError("span 必须 >= 1")
+            alpha = 2.0 / (span + 1.0)
+        self.alpha = alpha
+        self.value = NAN
+        self._old_wt = 1.0  # 连续缺失值期间旧值权重继续衰减
+
+    def seed(self, value: float) -> None:
+        """用批量计算得到的最后一个值初始化"""
+        self.value = float(value)
+        self._old_wt = 1.0
+
+    def update(self, x: float) -> float:
+        # 与 pandas 的 ewm 实现保持相同的运算顺序（adjust=False, ignore_na=False，含 alpha=0.5 的特例，见 kernels._ewm_1d）
+        weighted = self.value
+        if weighted != weighted:
+            self.value = x
+        else:
+            self._old_wt *= 1.0 - self.alpha
+            if x == x:
+                if weighted != x:
+                    old_wt = self._old_wt
+                    new_wt = 1.0 - old_wt if self.alpha == 0.5 else self.alpha
+                    self.value = (old_wt * weighted + new_wt * x) / (old_wt + new_wt)
+                self._old_wt = 1.0
+        return self.value
+
+
+class RollingStats:
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        if window <= 0:
+            raise ValueError("窗口期必须为正整数")
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self._buf = [NAN] * window  # 预分配的环形缓冲区
+        self._pos = 0
+        self._nobs = 0
+        self._sum = 0.0
+        self._comp = 0.0            # Kahan 补偿项
+        self._mean = 0.0            # Welford 均值
+        self._ssq = 0.0             # Welford 离差平方和
+
+    def seed(self, values: Iterable[float]) -> None:
+        """用最近 window 个历史值初始化（多余的会被挤出）"""
+        for x in values:
+            self.push(x)
+
+    def _add(self, x: float) -> None:
+        self._nobs += 1
+        y = x - self._comp
+        t = self._sum + y
+        self._comp = (t - self._sum) - y
+        self._sum = t
+        delta = x - self._mean
+        self._mean += delta / self._nobs
+        self._ssq += delta * (x - self._mean)
+
+    def _remove(self, x: float) -> None:
+        self._nobs -= 1
+        y = -x - self._comp
+        t = self._sum + y
+        self._comp = (t - self._sum) - y
+        self._sum = t
+        if self._nobs:
+            delta = x - self._mean
+            self._mean -= delta / self._nobs
+            self._ssq -= delta * (x - self._mean)
+        else:
+            self._mean = self._ssq = self._sum = self._comp = 0.0
+
+    def push(self, x: float) -> None:
+        old = self._buf[self._pos]
+        if old == old:
+            self._remove(old)
+        self._buf[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        if x == x:
+            self._add(x)
+
+    def mean(self) -> float:
+        if self._nobs < self.min_periods or self._nobs == 0:
+            return NAN
+        return self._sum / self._nobs
+
+    def std(self) -> float:
+        if self._nobs < max(self.min_periods, 2):
+            return NAN
+        return math.sqrt(max(self._ssq, 0.0) / (self._nobs - 1))
+
+
+class RollingExtreme:
+    def __init__(self, window: int, min_periods: Optional[int] = None, mode: str = 'max'):
+        if window <= 0:
+            raise ValueError("窗口期必须为正整数")
+        if mode not in ('max', 'min'):
+            raise ValueError("mode 只能是 'max' 或 'min'")
+        self.window = window
+        self.min_periods = max(window if min_periods is None else min_periods, 1)
+        self._is_max = mode == 'max'
+        self._queue = deque()         # (序号, 值)，序号递增、值单调，队首为窗口内极值
+        self._valid = deque()         # 窗口内各位置是否为有效值
+        self._nobs = 0
+        self._count = 0
+
+    def seed(self, values: Iterable[float]) -> None:
+        """用最近 window 个历史值初始化"""
+        for x in values:
+            self.push(x)
+
+    def push(self, x: float) -> None:
+        i = self._count
+        self._count += 1
+        if len(self._valid) == self.window:
+            self._nobs -= self._valid.popleft()
+        if self._queue and self._queue[0][0] <= i - self.window:
+            self._queue.popleft()
+        valid = x == x
+        self._valid.append(valid)
+        if valid:
+            self._nobs += 1
+            queue = self._queue
+            if self._is_max:
+                while queue and queue[-1][1] <= x:
+                    queue.pop()
+            else:
+                while queue and queue[-1][1] >= x:
+                    queue.pop()
+            queue.append((i, x))
+
+    def value(self) -> float:
+        if self._nobs < self.min_periods or not self._queue:
+            return NAN
+        return self._queue[0][1]
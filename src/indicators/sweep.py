@@ -0,0 +1,106 @@
+# src/indicators/sweep.py
+"""
+指标参数扫描
+
+    table = parameter_sweep("MACD", {"fast_period": [8, 12], "slow_period": [21, 26]}, frames)
+
+同一只股票的所有参数组合共用一个 PrimitiveContext：
+每个不同跨度的 EMA 只算一次；薛斯通道的 N、M 只缩放通道宽度，AA/DD/ATR 等基础序列按 window 只算一次。
+剩余工作按（股票, 参数组合分块）分发到进程池，结果合并为一张长表。
+"""
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import build_indicator
+from .primitives import PrimitiveContext
+
+Reducer = Callable[[Dict[str, pd.Series]], Dict[str, float]]
+
+
+def expand_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """参数网格 -> 参数组合列表"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(grid[n]) for n in names))]
+
+
+def _sharing_key(indicator_name: str, params: Dict[str, Any]):
+    # 依赖原语相同的组合排在一起，分块后尽量落在同一个进程里
+    return tuple(sorted(map(repr, build_indicator(indicator_name, params).primitives())))
+
+
+def _chunk(items: List[Any], n_chunks: int) -> List[List[Any]]:
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size = -(-len(items) // n_chunks)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def sweep_frame(indicator_name: str, combos: List[Dict[str, Any]], df: pd.DataFrame,
+                symbol: str = "", reducer: Optional[Reducer] = None) -> pd.DataFrame:
+    """
+    对单只股票计算多组参数，共享原语
+    :param reducer: 把一组参数的输出汇总为若干标量；None 时返回完整时间序列
+    """
+    ctx = PrimitiveContext.from_frame(df)
+    if reducer is not None:
+        rows = [
+            {'symbol': symbol, **params,
+             **reducer(build_indicator(indicator_name, params).compute(ctx))}
+            for params in combos
+        ]
+        return pd.DataFrame(rows)
+
+    # 逐列拼接 numpy 数组，避免为每组参数构造一个小 DataFrame
+    columns: Dict[str, List[Any]] = {}
+    for params in combos:
+        outputs = build_indicator(indicator_name, params).compute(ctx)
+        for name, values in outputs.items():
+            columns.setdefault(name, []).append(np.asarray(values))
+    if not combos:
+        return pd.DataFrame()
+    n = len(df)
+    table = {'symbol': np.full(n * len(combos), symbol, dtype=object)}
+    for name in combos[0]:
+        table[name] = np.repeat([params[name] for params in combos], n)
+    table[df.index.name or 'index'] = np.tile(df.index.to_numpy(), len(combos))
+    table.update({name: np.concatenate(parts) for name, parts in columns.items()})
+    return pd.DataFrame(table)
+
+
+def _run_task(task: Tuple[str, List[Dict[str, Any]], pd.DataFrame, str, Optional[Reducer]]):
+    return sweep_frame(*task)
+
+
+def parameter_sweep(indicator_name: str, grid: Dict[str, Iterable[Any]],
+                    frames: Dict[str, pd.DataFrame], reducer: Optional[Reducer] = None,
+                    max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    参数扫描
+    :param indicator_name: 注册表中的指标名
+    :param grid: 参数名 -> 候选值列表
+    :param frames: 股票代码 -> 行情 DataFrame（可用 PriceStore.read_many 获得）
+    :param reducer: 见 sweep_frame，必须是可被 pickle 的顶层函数
+    :param max_workers: 进程数，1 表示在当前进程计算
+    :return: 长表，列为 symbol、各参数、（日期、）各输出
+    """
+    combos = sorted(expand_grid(grid), key=lambda p: _sharing_key(indicator_name, p))
+    max_workers = max_workers or os.cpu_count() or 1
+    # 股票数少于进程数时，把参数组合也切块以占满进程池
+    n_chunks = max(1, max_workers // max(1, len(frames)))
+    tasks = [
+        (indicator_name, chunk, df, symbol, reducer)
+        for symbol, df in frames.items()
+        for chunk in _chunk(combos, n_chunks)
+    ]
+
+    if max_workers == 1 or len(tasks) <= 1:
+        parts = [_run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parts = list(executor.map(_run_task, tasks))
+    parts = [part for part in parts if len(part)]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
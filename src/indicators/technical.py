@@ -1,8 +1,40 @@
 # src/indicators/technical.py
-from abc import ABC, abstractmethod # 导入抽象基类工具
+from abc import ABC  # 导入抽象基类工具
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 import pandas as pd
 import numpy as np
 from .register import get_registry  # 导入注册表函数
+from . import kernels  # 单次遍历的数组内核
+from .primitives import Key, PrimitiveContext  # 共享原语
+
+OUTPUT_MODES = ('frame', 'columns', 'arrays')
+
+
+def assemble_outputs(df: pd.DataFrame, outputs: Mapping[str, Any], output: str = 'frame',
+                     inplace: bool = False, dtype=None, copy: bool = False):
+    """
+    按输出契约组装指标结果
+    :param output: 'frame' 输入数据 + 输出列；'columns' 只含输出列的 DataFrame（索引同 df）；
+                   'arrays' 输出列名 -> ndarray（不复制时可能是只读视图）
+    :param inplace: 仅 output='frame' 时有效，把输出列直接写入 df 并返回 df
+    :param dtype: 输出数组的类型，如 np.float32；None 保持 float64
+    :param copy: 强制复制数组（outputs 中的数组为共享只读数组时使用）
+    """
+    if output not in OUTPUT_MODES:
+        raise ValueError(f"未知的输出方式: {output}，可选：{OUTPUT_MODES}")
+    if inplace and output != 'frame':
+        raise ValueError("inplace 只能与 output='frame' 一起使用")
+    convert = np.array if copy else np.asarray
+    arrays = {name: convert(values, dtype=dtype or float) for name, values in outputs.items()}
+    if output == 'arrays':
+        return arrays
+    if output == 'columns':
+        return pd.DataFrame(arrays, index=df.index, copy=False)
+    # 浅复制只复制列索引，不复制输入数据；新增的列不会出现在调用方的 df 中
+    result = df if inplace else df.copy(deep=False)
+    for name, values in arrays.items():
+        result[name] = values
+    return result
 
 
 
@@ -20,10 +52,86 @@ class TechnicalIndicator(ABC):  # 定义技术指标抽象基类
         """通过类名和参数动态创建实例"""
         return cls(**kwargs)  # 实例化时传递所有关键字参数
     
-    @abstractmethod  # 抽象方法装饰器
-    def calculate(self, df: pd.DataFrame) -> pd.DataFrame:  # 核心计算方法
-        """子类必须实现的指标计算逻辑"""
-        pass
+    OUTPUT_COLUMNS: Tuple[str, ...] = ()  # 指标的输出列（不含中间结果）
+
+    def calculate(self, df: pd.DataFrame, output: str = 'frame', inplace: bool = False,
+                  dtype=None) -> Union[pd.DataFrame, Dict[str, np.ndarray]]:
+        """
+        指标计算，默认由 compute 完成；未接入原语的指标重写此方法
+        :param output: 'frame' 返回 df + 输出列；'columns' 只返回输出列；'arrays' 返回 列名 -> ndarray
+        :param inplace: 把输出列写入传入的 df（默认返回新对象，不修改 df，也不复制 df 的数据）
+        :param dtype: 输出类型，如 np.float32（计算仍用 float64，只转换结果）
+        """
+        outputs = self.compute(PrimitiveContext.from_frame(df))
+        return assemble_outputs(df, outputs, output, inplace, dtype)
+
+    def primitives(self) -> List[Key]:
+        """指标依赖的原语 key（见 primitives.py），供 IndicatorPipeline 规划去重"""
+        return []
+
+    def warmup_bars(self) -> Optional[int]:
+        """
+        只关心最后几根K线时需要的历史K线数：用最近这么多根K线计算，最后一根的值与用全部历史计算
+        一致（滚动窗口）或误差可以忽略（递推类指标）。None 表示需要全部历史
+        """
+        return None
+
+    def compute(self, ctx: PrimitiveContext) -> Dict[str, Any]:
+        """
+        基于共享原语计算指标（可选实现）
+        :param ctx: 原语上下文，同一上下文中的原语只计算一次
+        :return: 输出列名 -> Series（单只股票）或 DataFrame（面板）
+        """
+        raise NotImplementedError(f"{type(self).__name__} 未实现基于原语的计算")
+
+    def init_state(self, history: pd.DataFrame) -> Dict[str, float]:
+        """
+        增量计算：用历史K线初始化状态（可选实现），返回最后一根K线的指标值
+        之后每根新K线调用 update，结果与对全部K线调用 calculate 一致
+        """
+        raise NotImplementedError(f"{type(self).__name__} 未实现增量计算")
+
+    def update(self, bar) -> Dict[str, float]:
+        """
+        增量计算：输入一根新K线（含 收盘/最高/最低 等字段的映射），O(1) 更新状态并返回最新指标值
+        返回的字典在每次 update 时复用，需要保留时请自行复制
+        """
+        raise NotImplementedError(f"{type(self).__name__} 未实现增量计算")
+
+    SUPPORTS_PANEL = False  # 实现了 compute 或 calculate_packed 后置为 True，即可参与面板批量计算
+
+    def calculate_packed(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        面板批量计算，默认由 compute 完成
+        :param data: 字段名 -> (K线序号 × 股票) 数组，每列的有效K线已压紧到顶部，尾部为 NaN
+        :return: 输出列名 -> 同形状数组
+        """
+        outputs = self.compute(PrimitiveContext(data))
+        return {name: np.asarray(values, dtype=float) for name, values in outputs.items()}
+
+    def calculate_panel(self, panel) -> Dict[str, np.ndarray]:
+        """
+        对整个面板（日期 × 股票）计算指标，返回 输出列名 -> (日期 × 股票) 数组。
+        停牌日、上市前的日期通过 panel.mask 跳过，结果在这些位置为 NaN。
+        未实现 calculate_packed 的指标逐只股票回退到 calculate。
+        """
+        if self.SUPPORTS_PANEL:
+            outputs = self.calculate_packed(panel.pack())
+            return {name: panel.unpack(values) for name, values in outputs.items()}
+
+        results: Dict[str, np.ndarray] = {}
+        for j in range(len(panel.symbols)):
+            if not panel.mask[:, j].any():
+                continue
+            df = panel.column_frame(j)
+            input_columns = df.columns.copy()  # 部分指标会直接写入传入的 df
+            out = self.calculate(df)
+            valid = panel.mask[:, j]
+            for name in out.columns.difference(input_columns, sort=False):
+                if name not in results:
+                    results[name] = np.full(panel.shape, np.nan)
+                results[name][valid, j] = out[name].to_numpy(dtype=float)
+        return results
 
 
 
@@ -57,7 +165,7 @@ class TechnicalBase(ABC):
         #     window = len(df)
             
         wap = cls.weighted_price(df)
-        ma = df['收盘'].rolling(window=window, min_periods=1).mean()
+        ma = cls.rolling_mean(df['收盘'], window, min_periods=1)
         result = (wap - ma).abs() / ma
         # result = (wap - ma).abs() / ma.rolling(window=window, min_periods=1).std()      #  # 使用滚动标准差计算波动率
         # 处理NaN值（避免影响后续计算）
@@ -72,37 +180,86 @@ class TechnicalBase(ABC):
         # return pd.Series(volatility, index=df.index, name='标准化波动率')   
     
     @staticmethod
-    def dynamic_ma(series: pd.Series, alpha_series: pd.Series) -> pd.Series:
-        """计算动态移动平均（DMA）"""
+    def dynamic_ma(series, alpha_series, backend: str = None):
+        """
+        计算动态移动平均（DMA）
+        series / alpha_series 可以是 Series（单只股票）、DataFrame 或 2-D ndarray（日期 × 股票），
+        返回与 series 相同类型的结果。递推由 kernels.recursive_filter 完成，可通过 backend 指定后端。
+        """
         # 输入验证
-        if not isinstance(series, pd.Series) or not isinstance(alpha_series, pd.Series):
-            raise TypeError("series 和 alpha_series 必须是 pandas Series")
+        valid_types = (pd.Series, pd.DataFrame, np.ndarray)
+        if not isinstance(series, valid_types) or not isinstance(alpha_series, valid_types):
+            raise TypeError("series 和 alpha_series 必须是 pandas Series/DataFrame 或 numpy 数组")
         if len(series) != len(alpha_series):
             raise ValueError(f"series 和 alpha_series 长度不一致：{len(series)} vs {len(alpha_series)}")
-            
-        # 使用NumPy向量化计算（比循环快100倍）
-        values = series.astype(float).values
-        alpha = alpha_series.astype(float).values
-        
-        result = np.full_like(values, np.nan)
-        result[0] = values[0]
-        
-        for i in range(1, len(values)):
-            result[i] = alpha[i] * values[i] + (1 - alpha[i]) * result[i-1]
-        return pd.Series(result, index=series.index, name='DMA')
+
+        values = np.asarray(series, dtype=float)
+        alpha = np.asarray(alpha_series, dtype=float)
+        result = kernels.recursive_filter(values, alpha, backend=backend)
+
+        if isinstance(series, pd.Series):
+            return pd.Series(result, index=series.index, name='DMA')
+        if isinstance(series, pd.DataFrame):
+            return pd.DataFrame(result, index=series.index, columns=series.columns)
+        return result
+
+    @staticmethod
+    def _like(series, values: np.ndarray, name=None):
+        """内核输出的数组包装成与输入相同的类型（Series / DataFrame / ndarray）"""
+        if isinstance(series, pd.Series):
+            return pd.Series(values, index=series.index, name=name or series.name)
+        if isinstance(series, pd.DataFrame):
+            return pd.DataFrame(values, index=series.index, columns=series.columns)
+        return values
+
+    @classmethod
+    def _rolling(cls, series, window: int, op: str, min_periods: int = None, backend: str = None):
+        values = kernels.rolling(np.asarray(series, dtype=float), window, op, min_periods, backend)
+        return cls._like(series, values)
+
+    # 以下滚动/平滑方法都接受 Series、DataFrame 或 1-D/2-D ndarray（日期 × 股票），返回相同类型；
+    # 单次遍历，耗时与窗口长度无关。min_periods 默认等于 window，NaN 不计入窗口
+
+    @classmethod
+    def rolling_sum(cls, series, window: int, min_periods: int = None, backend: str = None):
+        """滚动求和"""
+        return cls._rolling(series, window, 'sum', min_periods, backend)
+
+    @classmethod
+    def rolling_mean(cls, series, window: int, min_periods: int = None, backend: str = None):
+        """滚动均值"""
+        return cls._rolling(series, window, 'mean', min_periods, backend)
+
+    @classmethod
+    def rolling_std(cls, series, window: int, min_periods: int = None, backend: str = None):
+        """滚动样本标准差（ddof=1）"""
+        return cls._rolling(series, window, 'std', min_periods, backend)
+
+    @classmethod
+    def rolling_max(cls, series, window: int, min_periods: int = None, backend: str = None):
+        """滚动最大值（单调队列）"""
+        return cls._rolling(series, window, 'max', min_periods, backend)
+
+    @classmethod
+    def rolling_min(cls, series, window: int, min_periods: int = None, backend: str = None):
+        """滚动最小值（单调队列）"""
+        return cls._rolling(series, window, 'min', min_periods, backend)
+
+    @classmethod
+    def wilder_smooth(cls, series, period: int = 14, backend: str = None):
+        """Wilder 平滑：alpha = 1/period 的 EMA，与 ewm(alpha=1/period, adjust=False).mean() 一致"""
+        return cls._like(series, kernels.wilder(np.asarray(series, dtype=float), period, backend))
 
     @staticmethod
     def get_true_range(df: pd.DataFrame) -> pd.Series:
         """计算真实波幅（TR）"""
-        high_low = df['最高'] - df['最低']
-        high_close = (df['最高'] - df['收盘'].shift(1)).abs()
-        low_close = (df['最低'] - df['收盘'].shift(1)).abs()
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        tr = kernels.true_range(df['最高'].to_numpy(dtype=float), df['最低'].to_numpy(dtype=float),
+                                df['收盘'].to_numpy(dtype=float))
         return pd.Series(tr, index=df.index, name='TR')
 
     @staticmethod
     def average_true_range(df: pd.DataFrame, window: int = 14) -> pd.Series:
         """计算平均真实波幅（ATR）"""
         tr = TechnicalBase.get_true_range(df)
-        atr = tr.rolling(window=window, min_periods=1).mean()
+        atr = TechnicalBase.rolling_mean(tr, window, min_periods=1)
         return pd.Series(atr, index=df.index, name='ATR')
@@ -1,83 +1,69 @@
 import sys
 from pathlib import Path
-from datetime import datetime, timedelta
-import pandas as pd
-import akshare as ak
-from matplotlib import pyplot as plt
-from indicators import register_all_indicators, INDICATOR_REGISTRY
-from visualization.Plot_Schaffchannel import plot_xuess_channel
-from visualization.polt_adx import plot_adx
-from visualization.plot_macd import plot_macd
+import config
+from indicators import INDICATOR_REGISTRY
+from indicators.cache import get_default_cache
 from data_processing.data_downloader import StockDataDownloader, get_stock_type, clean_filename
+from data_processing.loader import load_ohlcv
+from data_processing.symbol_catalog import get_catalog
+from profiling import profiled_run, symbol_scope
+from utils.dates import HISTORY_START, check_data_update_needed, get_latest_trading_day
+# akshare 只在真正下载时由数据源导入，matplotlib 和绘图模块在可视化时才导入
 
 # 添加项目根目录到 Python 路径
 project_root = Path(__file__).parent.parent.resolve()
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-def get_latest_trading_day() -> str:
-    """获取最近一个交易日"""
-    today = datetime.now()
-    if today.weekday() >= 5:  # 周末
-        return (today - timedelta(days=today.weekday()-4)).strftime('%Y%m%d')
-    return today.strftime('%Y%m%d')
-
-def check_data_update_needed(filepath: Path) -> bool:
-    """检查数据是否需要更新"""
-    if not filepath.exists():
-        return True
-    
-    df = pd.read_csv(filepath)
-    last_date = pd.to_datetime(df['日期'].iloc[-1])
-    latest_trading_day = pd.to_datetime(get_latest_trading_day())
-    
-    return last_date < latest_trading_day
-
-def load_and_preprocess(filepath: Path):
-    """数据加载与预处理"""
+def load_and_preprocess(filepath: Path, price_dtype: str = 'float64'):
+    """数据加载与预处理：只读行情列，日期解析为 DatetimeIndex（见 data_processing.loader）"""
     try:
-        df = pd.read_csv(filepath, encoding='utf-8')
+        return load_ohlcv(filepath, price_dtype=price_dtype)
     except FileNotFoundError:
         raise FileNotFoundError(f"文件 {filepath} 不存在")
 
-    # 日期有效性检查
-    date_mask = df['日期'].isna()
-    if date_mask.any():
-        print(f"发现 {date_mask.sum()} 行无效日期，示例：\n{df[date_mask].head()}")
-        df = df[~date_mask]
+def main(profile: bool = False):
+    """
+    交互式分析单只股票；各阶段计时在结束时输出到日志并写入 reports/profiles/main.json
+    :param profile: 同时用 cProfile 记录整个运行（命令行参数 --profile）
+    """
+    config.setup()
+    with profiled_run("main", profile):
+        run_interactive()
 
-    return df.set_index('日期')
-
-def main():
+def run_interactive():
     # 用户输入股票代码
     stock_code = input("请输入股票代码(如:300100): ").strip()
+    stock_name = get_catalog().name(stock_code, default="")  # 本地目录查询，过期时批量刷新
+    if stock_name:
+        print(f"股票：{stock_code} {stock_name}")
     
     # 数据下载与更新
-    start_date = "20240101"
+    start_date = HISTORY_START
     end_date = get_latest_trading_day()
     downloader = StockDataDownloader(stock_code, start_date, end_date)
     
     # 检查并更新数据
-    # 获取股票名称用于生成文件名
-    stock_info = ak.stock_individual_info_em(symbol=stock_code)
-    stock_name = stock_info[stock_info['item'] == '股票简称']['value'].values[0]
-    cleaned_name = clean_filename(stock_name)
-    data_file = downloader.data_dir / f"{stock_code}_{cleaned_name}_his_{end_date}.csv"
-    if not data_file.exists():
+    store = downloader.store
+    last_date = store.last_date(stock_code)
+    if last_date is None:
         print(f"数据未找到，开始下载...")
-    elif check_data_update_needed(data_file):
-        print(f"数据需要更新，最后交易日：{pd.read_csv(data_file)['日期'].iloc[-1]}")
+    elif check_data_update_needed(last_date):
+        print(f"数据需要更新，最后交易日：{last_date:%Y-%m-%d}")
     else:
         print(f"数据已是最新，无需更新")
-    
-    # 下载或更新数据
-    downloader.download_data()
+
+    # 下载或更新数据（只请求缺失的K线）
+    if check_data_update_needed(last_date):
+        downloader.download_data()
 
     # 指标选择
     print("\n请选择指标：")
     print("1 - 薛斯通道")
     print("2 - ADX")
     print("3 - MACD")
+    print("4 - 唐奇安通道")
+    print("5 - 肯特纳通道")
     indicator_choice = input("请输入指标编号: ").strip()
 
     if indicator_choice == "1":
@@ -94,12 +80,22 @@ def main():
         slow = int(input("输入慢线周期(默认26): ") or 26)
         signal = int(input("输入信号线周期(默认9): ") or 9)
         params = {"fast_period": fast, "slow_period": slow, "signal_period": signal}
+    elif indicator_choice == "4":
+        indicator_name = "Donchian"
+        window = int(input("输入通道周期(默认20): ") or 20)
+        params = {"window": window}
+    elif indicator_choice == "5":
+        indicator_name = "Keltner"
+        window = int(input("输入均线周期(默认20): ") or 20)
+        atr_window = int(input("输入ATR周期(默认10): ") or 10)
+        multiplier = float(input("输入ATR倍数(默认2.0): ") or 2.0)
+        params = {"window": window, "atr_window": atr_window, "multiplier": multiplier}
     else:
-        print("无效的选择，请输入1、2或3")
+        print("无效的选择，请输入1-5")
         return
 
     # 加载数据
-    df = load_and_preprocess(data_file)
+    df = store.read_frame(stock_code)
 
     # 指标计算
     if indicator_name not in INDICATOR_REGISTRY:
@@ -109,15 +105,25 @@ def main():
 
     IndicatorClass = INDICATOR_REGISTRY[indicator_name]
     indicator_instance = IndicatorClass.create(**params)
-    df = indicator_instance.calculate(df)
+    with symbol_scope(stock_code):
+        df = get_default_cache().calculate(indicator_instance, df)  # 相同数据和参数直接命中缓存
 
     # 可视化
     if indicator_choice == "1":
+        from visualization.Plot_Schaffchannel import plot_xuess_channel
         plot_xuess_channel(df, stock_code)
     elif indicator_choice == "2":
+        from visualization.polt_adx import plot_adx
         plot_adx(df, stock_code)
     elif indicator_choice == "3":
+        from visualization.plot_macd import plot_macd
         plot_macd(df, stock_code)
+    elif indicator_choice == "4":
+        from visualization.plot_channel import plot_donchian_channel
+        plot_donchian_channel(df, stock_code)
+    elif indicator_choice == "5":
+        from visualization.plot_channel import plot_keltner_channel
+        plot_keltner_channel(df, stock_code)
 
 if __name__ == "__main__":
-    main()
+    main(profile="--profile" in sys.argv[1:])
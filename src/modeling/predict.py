@@ -1,29 +1,444 @@
+"""
+模型推理：收盘后对全市场批量打分，盘中以本地 HTTP 服务回答单只股票的查询
+
+    python -m modeling.predict score                         # 最新交易日全市场打分
+    python -m modeling.predict score --date 20240621 --top 50
+    python -m modeling.predict score --all-dates             # 全部历史行（回看用）
+    python -m modeling.predict serve --port 8765             # 常驻服务
+
+服务接口（JSON）：
+    GET  /predict?symbols=000001,600000[&date=20240621]
+    POST /predict  {"symbols": ["000001"], "date": "20240621"} 或 {"rows": [[特征...], ...]}
+    GET  /stats    延迟分位数、吞吐量、批次数
+    GET  /health   模型信息
+
+模型（train.py 生成的 MODELS_DIR/model.joblib）只加载一次常驻内存；特征按分区以 mmap 方式读取，
+拼成矩阵后按批向量化预测。服务端把同一时间窗口内到达的请求合并成一批再调用模型（micro-batching），
+减少单次请求的模型调用开销。
+"""
+from concurrent.futures import Future
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
 from pathlib import Path
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 
 from loguru import logger
+import numpy as np
+import pandas as pd
 from tqdm import tqdm
 import typer
 
-from stock_analyzer.config import MODELS_DIR, PROCESSED_DATA_DIR
+import config
+from config import PROCESSED_DATA_DIR
+from features import FEATURE_DIR, feature_partitions, read_partition
+from modeling.train import MODEL_PATH
+from profiling import LatencyStats
 
+PREDICTIONS_PATH = PROCESSED_DATA_DIR / "predictions.csv"
 app = typer.Typer()
 
 
+# ---------------- 模型 ----------------
+
+@dataclass
+class Predictor:
+    model: object
+    features: List[str]
+    target: str
+    path: Path
+    info: dict
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """X 的列顺序与 self.features 一致"""
+        if X.shape[0] == 0:
+            return np.empty(0)
+        return np.asarray(self.model.predict(X), dtype=float)
+
+
+_PREDICTORS: Dict[Tuple[str, int], Predictor] = {}
+
+
+def load_predictor(model_path: Path = MODEL_PATH) -> Predictor:
+    """加载模型（按路径与修改时间缓存，同一进程内重复调用不会重新加载）"""
+    import joblib
+
+    model_path = Path(model_path)
+    key = (str(model_path.resolve()), model_path.stat().st_mtime_ns)
+    if key not in _PREDICTORS:
+        bundle = joblib.load(model_path)
+        result = bundle.get("result")
+        info = {"params": bundle.get("params", {}),
+                "train_dates": list(result["train_dates"]) if result else None}
+        _PREDICTORS[key] = Predictor(bundle["model"], list(bundle["features"]), bundle["target"], model_path, info)
+    return _PREDICTORS[key]
+
+
+# ---------------- 批量打分 ----------------
+
+def _stack(arrays: Dict[str, np.ndarray], features: List[str], rows) -> np.ndarray:
+    """按特征顺序取出选中行，拼成 float32 矩阵"""
+    X = np.empty((len(rows), len(features)), dtype=np.float32)
+    for k, name in enumerate(features):
+        X[:, k] = arrays[name][rows]
+    return X
+
+
+def score_features(predictor: Predictor, root: Path = FEATURE_DIR, date=None, all_dates: bool = False,
+                   symbols: Optional[Iterable[str]] = None, batch_rows: int = 262_144,
+                   stats: Optional[LatencyStats] = None, progress: bool = True) -> pd.DataFrame:
+    """
+    对特征分区批量打分
+    :param date: 只对该交易日打分，默认全部分区中的最新交易日；all_dates=True 时对全部行打分
+    :param batch_rows: 每次调用模型的行数（跨分区合并，决定内存占用）
+    :param stats: 记录每批的耗时
+    :return: 列为 代码、日期、score 的 DataFrame，按 score 降序
+    """
+    parts = feature_partitions(root)
+    if not parts:
+        raise FileNotFoundError(f"{root} 中没有特征分区，请先运行 features.py")
+    if date is None and not all_dates:
+        date = max(np.max(read_partition(p, [])['日期']) for p in parts)
+    target_date = None if all_dates else np.datetime64(pd.Timestamp(date).date(), 'D')
+    wanted = None if symbols is None else np.asarray(sorted(set(symbols)))
+
+    codes, dates, scores = [], [], []
+    pending: List[np.ndarray] = []
+    pending_rows = 0
+
+    def flush():
+        nonlocal pending, pending_rows
+        if not pending:
+            return
+        X = np.concatenate(pending) if len(pending) > 1 else pending[0]
+        started = time.perf_counter()
+        scores.append(predictor.predict(X))
+        if stats is not None:
+            stats.record(time.perf_counter() - started, len(X))
+        pending, pending_rows = [], 0
+
+    for part in tqdm(parts, desc="打分", unit="分区", disable=not progress):
+        arrays = read_partition(part, predictor.features)
+        mask = np.ones(len(arrays['代码']), dtype=bool) if target_date is None else arrays['日期'] == target_date
+        if wanted is not None:
+            mask &= np.isin(arrays['代码'], wanted)
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            continue
+        codes.append(np.asarray(arrays['代码'][rows]))
+        dates.append(np.asarray(arrays['日期'][rows]))
+        for lo in range(0, len(rows), batch_rows):
+            chunk = rows[lo:lo + batch_rows]
+            pending.append(_stack(arrays, predictor.features, chunk))
+            pending_rows += len(chunk)
+            if pending_rows >= batch_rows:
+                flush()
+    flush()
+
+    if not codes:
+        return pd.DataFrame({'代码': pd.Series(dtype=str), '日期': pd.Series(dtype='datetime64[s]'),
+                             'score': pd.Series(dtype=float)})
+    result = pd.DataFrame({'代码': np.concatenate(codes), '日期': np.concatenate(dates),
+                           'score': np.concatenate(scores)})
+    return result.sort_values(['日期', 'score'], ascending=[True, False], ignore_index=True)
+
+
+# ---------------- 特征查询 ----------------
+
+class FeatureIndex:
+    """常驻内存的最新特征行（每只股票一行），其它日期按需从对应分区读取"""
+
+    def __init__(self, root: Path, features: List[str]):
+        from data_processing.columnar import read_meta
+
+        self.root = Path(root)
+        self.features = features
+        self.partition: Dict[str, Path] = {}
+        codes, dates, blocks = [], [], []
+        for part in feature_partitions(self.root):
+            for symbol in read_meta(part).get("symbols", []):
+                self.partition[symbol] = part
+            arrays = read_partition(part, features)
+            code = np.asarray(arrays['代码'])
+            if not len(code):
+                continue
+            last = np.flatnonzero(np.append(code[1:] != code[:-1], True))   # 分区按代码、日期排序
+            codes.append(code[last])
+            dates.append(np.asarray(arrays['日期'][last]))
+            blocks.append(_stack(arrays, features, last))
+        self.codes = np.concatenate(codes) if codes else np.empty(0, dtype=str)
+        self.dates = np.concatenate(dates) if dates else np.empty(0, dtype='datetime64[D]')
+        self.latest = np.concatenate(blocks) if blocks else np.empty((0, len(features)), dtype=np.float32)
+        self.row = {code: i for i, code in enumerate(self.codes)}
+
+    def lookup(self, symbols: List[str], date=None) -> Tuple[List[str], List[str], np.ndarray, List[str]]:
+        """返回 (代码, 日期, 特征矩阵, 缺失的代码)"""
+        found, found_dates, rows, missing = [], [], [], []
+        if date is None:
+            for symbol in symbols:
+                i = self.row.get(symbol)
+                if i is None:
+                    missing.append(symbol)
+                    continue
+                found.append(symbol)
+                found_dates.append(str(self.dates[i]))
+                rows.append(self.latest[i])
+            X = np.vstack(rows) if rows else np.empty((0, len(self.features)), dtype=np.float32)
+            return found, found_dates, X, missing
+
+        day = np.datetime64(pd.Timestamp(date).date(), 'D')
+        for symbol in symbols:
+            part = self.partition.get(symbol)
+            if part is None:
+                missing.append(symbol)
+                continue
+            arrays = read_partition(part, self.features)
+            code = arrays['代码']
+            lo, hi = np.searchsorted(code, symbol, 'left'), np.searchsorted(code, symbol, 'right')
+            hit = lo + np.flatnonzero(arrays['日期'][lo:hi] == day)
+            if not len(hit):
+                missing.append(symbol)
+                continue
+            found.append(symbol)
+            found_dates.append(str(day))
+            rows.append(_stack(arrays, self.features, hit[:1])[0])
+        X = np.vstack(rows) if rows else np.empty((0, len(self.features)), dtype=np.float32)
+        return found, found_dates, X, missing
+
+
+# ---------------- 微批处理 ----------------
+
+class MicroBatcher:
+    """
+    把并发到达的请求合并成一批再调用模型：第一个请求到达后最多等待 max_wait 秒，
+    或累计到 max_batch 行即提交
+    """
+
+    def __init__(self, predictor: Predictor, max_batch: int = 4096, max_wait: float = 0.002):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = LatencyStats()          # 每批模型调用的耗时
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, X: np.ndarray) -> Future:
+        future: Future = Future()
+        self._queue.put((X, future))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, rows = [item], len(item[0])
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            self._run(batch, rows)
+            if stop:
+                return
+
+    def _run(self, batch: List[Tuple[np.ndarray, Future]], rows: int) -> None:
+        started = time.perf_counter()
+        try:
+            scores = self.predictor.predict(np.concatenate([X for X, _ in batch]))
+        except Exception as e:  # 模型异常返回给每个请求，不终止批处理线程
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.stats.record(time.perf_counter() - started, rows)
+        offset = 0
+        for X, future in batch:
+            future.set_result(scores[offset:offset + len(X)])
+            offset += len(X)
+
+
+# ---------------- HTTP 服务 ----------------
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, predictor: Predictor, index: FeatureIndex, batcher: MicroBatcher,
+                 timeout: float = 10.0):
+        super().__init__(address, PredictionHandler)
+        self.predictor = predictor
+        self.index = index
+        self.batcher = batcher
+        self.request_timeout = timeout
+        self.stats = LatencyStats()          # 每个 /predict 请求的端到端耗时
+
+    def predict(self, symbols: Optional[List[str]] = None, date=None, rows=None) -> dict:
+        started = time.perf_counter()
+        missing: List[str] = []
+        if rows is not None:
+            X = np.asarray(rows, dtype=np.float32).reshape(-1, len(self.predictor.features))
+            found, dates = None, None
+        else:
+            found, dates, X, missing = self.index.lookup(symbols or [], date)
+        scores = self.batcher.submit(X).result(self.request_timeout) if len(X) else np.empty(0)
+        elapsed = time.perf_counter() - started
+        self.stats.record(elapsed, len(X))
+        if found is None:
+            predictions = [{"score": float(s)} for s in scores]
+        else:
+            predictions = [{"symbol": c, "date": d, "score": float(s)} for c, d, s in zip(found, dates, scores)]
+        return {"predictions": predictions, "missing": missing, "latency_ms": elapsed * 1000}
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    server: PredictionServer
+
+    def log_message(self, format, *args):   # 默认写 stderr，改为 loguru
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, path: str, payload: dict) -> None:
+        try:
+            if path == "/predict":
+                symbols = payload.get("symbols")
+                if isinstance(symbols, str):
+                    symbols = [s.strip() for s in symbols.split(",") if s.strip()]
+                if not symbols and payload.get("rows") is None:
+                    return self._send(400, {"error": "需要 symbols 或 rows"})
+                self._send(200, self.server.predict(symbols, payload.get("date"), payload.get("rows")))
+            elif path == "/stats":
+                self._send(200, {"requests": self.server.stats.summary(),
+                                 "batches": self.server.batcher.stats.summary()})
+            elif path == "/health":
+                p = self.server.predictor
+                self._send(200, {"model": str(p.path), "target": p.target, "features": p.features,
+                                 "symbols": len(self.server.index.codes), **p.info})
+            else:
+                self._send(404, {"error": f"未知的路径: {path}"})
+        except (ValueError, TypeError) as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception(e)
+            self._send(500, {"error": str(e)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self._handle(url.path, {k: v[-1] for k, v in parse_qs(url.query).items()})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send(400, {"error": f"请求体不是合法的 JSON: {e}"})
+        self._handle(urlparse(self.path).path, payload)
+
+
+# ---------------- 命令行 ----------------
+
 @app.command()
-def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    features_path: Path = PROCESSED_DATA_DIR / "test_features.csv",
-    model_path: Path = MODELS_DIR / "model.pkl",
-    predictions_path: Path = PROCESSED_DATA_DIR / "test_predictions.csv",
-    # -----------------------------------------
+def score(
+    model_path: Path = typer.Option(MODEL_PATH, help="模型路径（train.py 的输出）"),
+    feature_dir: Path = typer.Option(FEATURE_DIR, help="特征分区目录"),
+    date: Optional[str] = typer.Option(None, help="打分日期 YYYYMMDD，默认最新交易日"),
+    all_dates: bool = typer.Option(False, help="对全部历史行打分"),
+    symbols: Optional[str] = typer.Option(None, help="股票代码，逗号分隔，或 @文件；默认全部"),
+    batch_rows: int = typer.Option(262_144, help="每次调用模型的行数"),
+    top: int = typer.Option(20, help="日志中显示得分最高的前 N 只"),
+    output: Path = typer.Option(PREDICTIONS_PATH, help="结果 CSV"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Performing inference for model...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Inference complete.")
-    # -----------------------------------------
+    from utils.cli import parse_symbols
+
+    config.setup()
+    started = time.perf_counter()
+    try:
+        predictor = load_predictor(model_path)
+    except FileNotFoundError:
+        logger.error(f"模型不存在：{model_path}，请先运行 python -m modeling.train")
+        raise typer.Exit(code=2)
+    logger.info(f"模型已加载（{len(predictor.features)} 个特征，标签 {predictor.target}），"
+                f"用时 {time.perf_counter() - started:.2f}s")
+
+    stats = LatencyStats()
+    try:
+        result = score_features(predictor, feature_dir, date, all_dates,
+                                parse_symbols(symbols) if symbols else None, batch_rows, stats)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        logger.error(str(e).strip("'\""))
+        raise typer.Exit(code=2)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    result.to_csv(output, index=False, encoding="utf-8-sig")
+    if len(result) and top:
+        latest = result[result['日期'] == result['日期'].max()]
+        logger.info("\n" + latest.head(top).to_string(index=False, float_format=lambda v: f"{v:.5f}"))
+    logger.success(f"Inference complete：{len(result):,} 行，总用时 {time.perf_counter() - started:.2f}s；"
+                   f"模型调用 {stats.format()}；结果：{output}")
+
+
+@app.command()
+def serve(
+    model_path: Path = typer.Option(MODEL_PATH, help="模型路径（train.py 的输出）"),
+    feature_dir: Path = typer.Option(FEATURE_DIR, help="特征分区目录"),
+    host: str = typer.Option("127.0.0.1", help="监听地址"),
+    port: int = typer.Option(8765, help="监听端口"),
+    max_batch: int = typer.Option(4096, help="每批最多行数"),
+    max_wait_ms: float = typer.Option(2.0, help="凑批的最长等待时间（毫秒）"),
+    report_every: float = typer.Option(60.0, help="每隔多少秒在日志中报告延迟与吞吐量，0 不报告"),
+):
+    config.setup()
+    started = time.perf_counter()
+    try:
+        predictor = load_predictor(model_path)
+    except FileNotFoundError:
+        logger.error(f"模型不存在：{model_path}，请先运行 python -m modeling.train")
+        raise typer.Exit(code=2)
+    index = FeatureIndex(feature_dir, predictor.features)
+    batcher = MicroBatcher(predictor, max_batch, max_wait_ms / 1000)
+    server = PredictionServer((host, port), predictor, index, batcher)
+    logger.info(f"模型与 {len(index.codes):,} 只股票的最新特征已加载，用时 {time.perf_counter() - started:.2f}s；"
+                f"服务地址 http://{host}:{server.server_address[1]}")
+
+    stop = threading.Event()
+    if report_every > 0:
+        def report():
+            while not stop.wait(report_every):
+                if server.stats.count:
+                    logger.info(f"请求：{server.stats.format()}")
+        threading.Thread(target=report, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        batcher.close()
+        logger.success(f"服务已停止。请求：{server.stats.format()}；模型调用：{batcher.stats.format()}")
 
 
 if __name__ == "__main__":
@@ -1,29 +1,390 @@
+"""
+滚动前推（walk-forward）训练：在 features.py 生成的特征上按时间切分多折，逐折训练、验证
+
+    python -m modeling.train                                   # 默认 HistGradientBoosting，扩展窗口
+    python -m modeling.train --model ridge --param alpha=10 --train-days 750 --workers 4
+    python -m modeling.train --features MACD,ADX,ret_1,ret_5 --target fwd_ret_5 --valid-days 120
+
+流程：
+1. 把特征分区合并成一个按日期排序的 float32 矩阵（INTERIM_DATA_DIR/training/{数据指纹}/X.npy），
+   逐分区写入 memmap，不在内存中拼接；特征分区不变时直接复用
+2. 按交易日切分：每折用验证期之前的数据训练（间隔 gap 天，避免标签与验证期重叠），验证期依次前推
+3. 各折在进程池中运行，工作进程以 mmap 方式打开同一个矩阵文件，只读取本折用到的行，不复制整份数据
+4. 每折训练好的模型以 joblib 缓存在 MODELS_DIR/walk_forward/{折指纹}.joblib（指纹 = 数据 + 模型配置 + 折区间），
+   重新运行时直接读取；最后用最近的训练窗口训练最终模型 MODELS_DIR/model.joblib
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+import os
 from pathlib import Path
+import shutil
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
 
 from loguru import logger
+import numpy as np
+import pandas as pd
 from tqdm import tqdm
 import typer
 
-from stock_analyzer.config import MODELS_DIR, PROCESSED_DATA_DIR
+import config
+from config import INTERIM_DATA_DIR, MODELS_DIR, REPORTS_DIR
+from features import FEATURE_DIR, feature_partitions, read_partition
 
+TRAINING_DATA_DIR = INTERIM_DATA_DIR / "training"
+FOLD_CACHE_DIR = MODELS_DIR / "walk_forward"
+MODEL_PATH = MODELS_DIR / "model.joblib"
+FOLD_CACHE_VERSION = 2           # 缓存格式变化时加一，旧格式的折模型不再命中（2：result 存为字典）
 app = typer.Typer()
 
 
+# ---------------- 训练矩阵 ----------------
+
+@dataclass
+class TrainingData:
+    path: Path
+    X: np.ndarray                # (行 × 特征) float32，按日期排序
+    y: np.ndarray
+    dates: np.ndarray            # datetime64[D]，非递减
+    symbols: np.ndarray
+    features: List[str]
+    target: str
+    digest: str
+
+    @classmethod
+    def open(cls, path: Path, mmap: bool = True) -> 'TrainingData':
+        """打开已构建的训练矩阵（mmap=True 时只映射文件，不读入内存）"""
+        path = Path(path)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        return cls(path, np.load(path / "X.npy", mmap_mode=mode), np.load(path / "y.npy", mmap_mode=mode),
+                   np.load(path / "dates.npy", mmap_mode=mode), np.load(path / "symbols.npy", mmap_mode=mode),
+                   meta["features"], meta["target"], meta["digest"])
+
+
+def default_features(feature_root: Path = FEATURE_DIR) -> List[str]:
+    """除标签（fwd_ret_*）外的全部特征列"""
+    from features import feature_columns
+
+    return [col for col in feature_columns(feature_root) if not col.startswith("fwd_ret_")]
+
+
+def build_training_data(features: Optional[List[str]] = None, target: str = "fwd_ret_5",
+                        feature_root: Path = FEATURE_DIR, root: Path = TRAINING_DATA_DIR) -> TrainingData:
+    """
+    由特征分区构建按日期排序的训练矩阵（去掉标签为 NaN 的行），特征分区未变化时复用已有矩阵
+    :param features: 特征列，默认除标签外的全部列
+    """
+    from data_processing.columnar import read_meta
+
+    parts = feature_partitions(feature_root)
+    if not parts:
+        raise FileNotFoundError(f"{feature_root} 中没有特征分区，请先运行 features.py")
+    features = list(features or default_features(feature_root))
+    if target in features:
+        raise ValueError(f"标签列 {target} 不能同时作为特征")
+    payload = json.dumps({"parts": [(p.name, read_meta(p).get("fingerprint")) for p in parts],
+                          "features": features, "target": target}, ensure_ascii=False)
+    digest = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    path = Path(root) / digest
+    if (path / "meta.json").exists():
+        return TrainingData.open(path)
+
+    # 第一遍只读日期和标签，确定每一行在按日期排序后的位置
+    valid_rows, dates = [], []
+    for part in parts:
+        arrays = read_partition(part, [target])
+        valid = ~np.isnan(arrays[target])
+        valid_rows.append(valid)
+        dates.append(np.asarray(arrays['日期'][valid]))
+    dates = np.concatenate(dates)
+    order = np.argsort(dates, kind="stable")
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+
+    # 第二遍逐分区写入 memmap（列优先存储，每个特征是一段连续内存）
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    X = np.lib.format.open_memmap(tmp / "X.npy", mode="w+", dtype=np.float32,
+                                  shape=(len(dates), len(features)), fortran_order=True)
+    y = np.empty(len(dates), dtype=np.float32)
+    symbols = None
+    offset = 0
+    for part, valid in zip(parts, valid_rows):
+        arrays = read_partition(part, [*features, target])
+        dest = position[offset:offset + int(valid.sum())]
+        offset += len(dest)
+        for k, name in enumerate(features):
+            X[dest, k] = arrays[name][valid]
+        y[dest] = arrays[target][valid]
+        codes = np.asarray(arrays['代码'][valid])
+        if symbols is None:
+            symbols = np.empty(len(dates), dtype=codes.dtype)
+        symbols[dest] = codes
+    X.flush()
+    del X
+    np.save(tmp / "y.npy", y)
+    np.save(tmp / "dates.npy", dates[order])
+    np.save(tmp / "symbols.npy", symbols if symbols is not None else np.empty(0, dtype=str))
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"features": features, "target": target, "digest": digest, "rows": len(dates)},
+                  f, ensure_ascii=False)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return TrainingData.open(path)
+
+
+# ---------------- 切分 ----------------
+
+@dataclass(frozen=True)
+class Fold:
+    index: int
+    train: slice                 # 训练行区间（矩阵按日期排序，每折都是连续的行）
+    valid: Optional[slice]       # 验证行区间，最终模型为 None
+    train_dates: tuple           # (首日, 末日)
+    valid_dates: Optional[tuple]
+
+
+def walk_forward_folds(dates: np.ndarray, valid_days: int = 60, step_days: Optional[int] = None,
+                       train_days: Optional[int] = None, gap_days: int = 5,
+                       min_train_days: int = 250) -> List[Fold]:
+    """
+    按交易日切分
+    :param valid_days: 每折验证期的交易日数
+    :param step_days: 相邻两折验证期起点的间隔，默认等于 valid_days
+    :param train_days: 训练窗口交易日数，None 为扩展窗口（从最早的数据开始）
+    :param gap_days: 训练期末与验证期首之间跳过的交易日数，应不小于标签的预测周期
+    :param min_train_days: 第一折至少需要的训练交易日数
+    """
+    days = np.unique(dates)
+    step = step_days or valid_days
+    rows = lambda i: int(np.searchsorted(dates, days[i])) if i < len(days) else len(dates)
+    folds = []
+    start = min_train_days + gap_days
+    while start + valid_days <= len(days):
+        train_end = start - gap_days
+        train_start = 0 if train_days is None else max(0, train_end - train_days)
+        valid_end = start + valid_days
+        folds.append(Fold(len(folds), slice(rows(train_start), rows(train_end)), slice(rows(start), rows(valid_end)),
+                          (str(days[train_start]), str(days[train_end - 1])),
+                          (str(days[start]), str(days[valid_end - 1]))))
+        start += step
+    return folds
+
+
+def final_fold(dates: np.ndarray, train_days: Optional[int] = None) -> Fold:
+    """最终模型：用最近的训练窗口（标签已完整的最后一天之前）"""
+    days = np.unique(dates)
+    train_end = len(days)
+    train_start = 0 if train_days is None else max(0, train_end - train_days)
+    lo = int(np.searchsorted(dates, days[train_start]))
+    return Fold(-1, slice(lo, len(dates)), None, (str(days[train_start]), str(days[-1])), None)
+
+
+# ---------------- 模型 ----------------
+
+def make_model(name: str, params: Optional[Dict[str, Any]] = None):
+    """
+    模型工厂
+    :param name: 'hgb'（HistGradientBoostingRegressor，原生支持缺失值）或 'ridge'（中位数填充 + 标准化 + Ridge）
+    """
+    params = dict(params or {})
+    if name == "hgb":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        params.setdefault("random_state", 0)
+        return HistGradientBoostingRegressor(**params)
+    if name == "ridge":
+        from sklearn.impute import SimpleImputer
+        from sklearn.linear_model import Ridge
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        return make_pipeline(SimpleImputer(strategy="median"), StandardScaler(), Ridge(**params))
+    raise ValueError(f"未知的模型: {name}，可选：hgb, ridge")
+
+
+def evaluate(y: np.ndarray, pred: np.ndarray, dates: np.ndarray) -> Dict[str, float]:
+    """验证指标：均方误差、相关系数、逐日截面秩相关（Rank IC）的均值与 IR、方向准确率"""
+    df = pd.DataFrame({"date": dates, "y": y, "pred": pred})
+    df["y_rank"] = df.groupby("date")["y"].rank()
+    df["pred_rank"] = df.groupby("date")["pred"].rank()
+    daily = df.groupby("date")[["y_rank", "pred_rank"]].corr().xs("y_rank", level=1)["pred_rank"].dropna()
+    return {
+        "mse": float(np.mean((y - pred) ** 2)),
+        "corr": float(np.corrcoef(y, pred)[0, 1]) if len(y) > 1 else float("nan"),
+        "rank_ic": float(daily.mean()) if len(daily) else float("nan"),
+        "ic_ir": float(daily.mean() / daily.std()) if len(daily) > 1 and daily.std() > 0 else float("nan"),
+        "hit_rate": float(np.mean(np.sign(y) == np.sign(pred))),
+    }
+
+
+@dataclass
+class FoldResult:
+    fold: int
+    train_dates: tuple
+    valid_dates: Optional[tuple]
+    n_train: int
+    n_valid: int
+    metrics: Dict[str, float] = field(default_factory=dict)
+    fit_seconds: float = 0.0
+    peak_memory: int = 0         # 本折训练 + 验证期间 tracemalloc 记录的峰值（字节）
+    cached: bool = False
+    cache_path: str = ""
+
+
+def fold_key(data: TrainingData, fold: Fold, model: str, params: Dict[str, Any]) -> str:
+    """折指纹：数据 + 模型配置 + 训练/验证区间"""
+    import sklearn
+
+    payload = json.dumps({"version": FOLD_CACHE_VERSION, "data": data.digest, "model": model, "params": params,
+                          "sklearn": sklearn.__version__, "train": fold.train_dates, "valid": fold.valid_dates,
+                          "rows": [fold.train.start, fold.train.stop]}, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def run_fold(data_path: Path, fold: Fold, model: str, params: Dict[str, Any],
+             cache_dir: Path = FOLD_CACHE_DIR, force: bool = False) -> FoldResult:
+    """训练并验证一折（可在工作进程中运行：以 mmap 方式打开矩阵，只读取本折的行）"""
+    import joblib
+
+    data = TrainingData.open(data_path)
+    cache_path = Path(cache_dir) / f"{fold_key(data, fold, model, params)}.joblib"
+    n_valid = 0 if fold.valid is None else fold.valid.stop - fold.valid.start
+    if not force and cache_path.exists():
+        result = FoldResult(**joblib.load(cache_path)["result"])
+        result.cached = True
+        return result
+
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        estimator = make_model(model, params)
+        estimator.fit(data.X[fold.train], data.y[fold.train])
+        fit_seconds = time.perf_counter() - started
+        metrics = {}
+        if fold.valid is not None:
+            y = np.asarray(data.y[fold.valid], dtype=float)
+            metrics = evaluate(y, estimator.predict(data.X[fold.valid]), np.asarray(data.dates[fold.valid]))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = FoldResult(fold.index, fold.train_dates, fold.valid_dates, fold.train.stop - fold.train.start,
+                        n_valid, metrics, fit_seconds, peak, False, str(cache_path))
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_suffix(".tmp")
+    joblib.dump({"model": estimator, "features": data.features, "target": data.target,
+                 "params": {"model": model, **params}, "result": asdict(result)}, tmp)
+    os.replace(tmp, cache_path)
+    return result
+
+
+def run_folds(data: TrainingData, folds: List[Fold], model: str, params: Dict[str, Any],
+              workers: Optional[int] = 1, cache_dir: Path = FOLD_CACHE_DIR, force: bool = False,
+              progress: bool = True) -> List[FoldResult]:
+    """
+    依次或并行运行多折，返回按折序号排列的结果
+    :param workers: 进程数，1 表示在当前进程中运行，None 为 CPU 核数
+    """
+    results = []
+    bar = tqdm(total=len(folds), desc="训练", unit="折", disable=not progress)
+    if workers == 1 or len(folds) <= 1:
+        for fold in folds:
+            results.append(run_fold(data.path, fold, model, params, cache_dir, force))
+            bar.update()
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_fold, data.path, fold, model, params, cache_dir, force) for fold in folds]
+            for future in as_completed(futures):
+                results.append(future.result())
+                bar.update()
+    bar.close()
+    return sorted(results, key=lambda r: r.fold)
+
+
+def peak_rss() -> Optional[int]:
+    """当前进程与已结束子进程中最大的常驻内存峰值（字节），不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if os.uname().sysname == "Darwin" else 1024  # macOS 以字节为单位，Linux 以 KiB 为单位
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+
+# ---------------- 命令行 ----------------
+
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
-    model_path: Path = MODELS_DIR / "model.pkl",
-    # -----------------------------------------
+    feature_dir: Path = typer.Option(FEATURE_DIR, help="特征分区目录（features.py 的输出）"),
+    features: Optional[str] = typer.Option(None, help="特征列，逗号分隔；默认除标签外的全部列"),
+    target: str = typer.Option("fwd_ret_5", help="标签列"),
+    model: str = typer.Option("hgb", help="模型：hgb / ridge"),
+    param: List[str] = typer.Option([], help="模型参数，如 max_iter=200，可重复"),
+    valid_days: int = typer.Option(60, help="每折验证期交易日数"),
+    step_days: Optional[int] = typer.Option(None, help="相邻两折的间隔交易日数，默认等于验证期"),
+    train_days: int = typer.Option(0, help="训练窗口交易日数，0 表示扩展窗口"),
+    gap_days: int = typer.Option(5, help="训练期与验证期之间跳过的交易日数（不小于标签周期）"),
+    min_train_days: int = typer.Option(250, help="第一折至少需要的训练交易日数"),
+    workers: int = typer.Option(1, help="进程数"),
+    final: bool = typer.Option(True, help="训练最终模型并保存到 model_path"),
+    force: bool = typer.Option(False, help="忽略已缓存的折模型，全部重新训练"),
+    data_dir: Path = typer.Option(TRAINING_DATA_DIR, help="训练矩阵目录（按特征分区指纹分子目录）"),
+    cache_dir: Path = typer.Option(FOLD_CACHE_DIR, help="折模型缓存目录"),
+    model_path: Path = typer.Option(MODEL_PATH, help="最终模型路径"),
+    report_path: Path = typer.Option(REPORTS_DIR / "training" / "walk_forward.csv", help="逐折结果 CSV"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Training some model...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Modeling training complete.")
-    # -----------------------------------------
+    from utils.cli import parse_params
+
+    config.setup()
+    params = parse_params(param)
+
+    started = time.perf_counter()
+    try:
+        make_model(model, params)
+        data = build_training_data([c.strip() for c in features.split(",")] if features else None,
+                                   target, feature_dir, data_dir)
+    except (FileNotFoundError, KeyError, ValueError, TypeError) as e:
+        logger.error(str(e).strip("'\""))
+        raise typer.Exit(code=2)
+    logger.info(f"训练矩阵 {data.X.shape[0]:,} 行 × {data.X.shape[1]} 个特征（{data.path}），"
+                f"准备用时 {time.perf_counter() - started:.1f}s")
+
+    folds = walk_forward_folds(np.asarray(data.dates), valid_days, step_days, train_days or None,
+                               gap_days, min_train_days)
+    if not folds:
+        logger.error(f"交易日不足：至少需要 {min_train_days + gap_days + valid_days} 个交易日")
+        raise typer.Exit(code=1)
+    results = run_folds(data, folds, model, params, workers, cache_dir, force)
+
+    table = pd.DataFrame([{
+        "fold": r.fold, "train": f"{r.train_dates[0]}~{r.train_dates[1]}", "valid": f"{r.valid_dates[0]}~{r.valid_dates[1]}",
+        "n_train": r.n_train, "n_valid": r.n_valid, **r.metrics,
+        "fit_s": r.fit_seconds, "peak_mib": r.peak_memory / 2**20, "cached": r.cached,
+    } for r in results])
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(report_path, index=False, encoding="utf-8-sig")
+    logger.info("\n" + table.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+    if final:
+        result = run_fold(data.path, final_fold(np.asarray(data.dates), train_days or None),
+                          model, params, cache_dir, force)
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(result.cache_path, model_path)
+        logger.info(f"最终模型（{result.train_dates[0]}~{result.train_dates[1]}，{result.n_train:,} 行）"
+                    f"{'取自缓存' if result.cached else f'训练用时 {result.fit_seconds:.1f}s'}：{model_path}")
+
+    rss = peak_rss()
+    logger.success(f"Modeling training complete：{len(results)} 折（{int(table['cached'].sum())} 折取自缓存），"
+                   f"平均 Rank IC {table['rank_ic'].mean():.4f}，总用时 {time.perf_counter() - started:.1f}s"
+                   + (f"，进程内存峰值 {rss / 2**20:.0f} MiB" if rss else "") + f"，逐折结果：{report_path}")
 
 
 if __name__ == "__main__":
@@ -1,28 +1,48 @@
+"""
+批量生成图表（无界面，适合定时任务）
+
+    python plots.py 300100,600276 --indicators MACD,ADX
+    python plots.py @watchlist.txt --workers 8 --force
+"""
 from pathlib import Path
+from typing import Optional
 
 from loguru import logger
-from tqdm import tqdm
 import typer
 
-from stock_analyzer.config import FIGURES_DIR, PROCESSED_DATA_DIR
+import config
+from config import FIGURES_DIR, PRICE_STORE_DIR
+from utils.cli import parse_symbols
 
 app = typer.Typer()
 
 
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    input_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
-    output_path: Path = FIGURES_DIR / "plot.png",
-    # -----------------------------------------
+    symbols: str = typer.Argument(..., help="股票代码，逗号分隔，或 @文件"),
+    indicators: str = typer.Option("薛斯通道,ADX,MACD", help="指标名，逗号分隔（使用默认参数）"),
+    start: Optional[str] = typer.Option(None, help="起始日期 YYYYMMDD"),
+    end: Optional[str] = typer.Option(None, help="结束日期 YYYYMMDD"),
+    output_dir: Path = typer.Option(FIGURES_DIR, help="输出目录"),
+    store_root: Path = typer.Option(PRICE_STORE_DIR, help="本地行情库目录"),
+    fmt: str = typer.Option("png", help="图片格式"),
+    dpi: int = typer.Option(100),
+    width_px: Optional[int] = typer.Option(None, help="目标像素宽度，超过时降采样；默认取图形宽度，0 不降采样"),
+    workers: Optional[int] = typer.Option(None, help="进程数，默认 CPU 核数"),
+    force: bool = typer.Option(False, help="忽略输入指纹，全部重绘"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Generating plot from data...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Plot generation complete.")
-    # -----------------------------------------
+    from visualization.batch import render_batch, summarize
+
+    config.setup()
+    requests = [(name.strip(), {}) for name in indicators.split(",") if name.strip()]
+    results = render_batch(parse_symbols(symbols), requests, output_dir, store_root, start, end,
+                           fmt=fmt, dpi=dpi, width_px=width_px, max_workers=workers, force=force)
+    for r in results:
+        if r.status == "failed":
+            logger.error(f"{r.symbol} {r.label}: {r.error}")
+    logger.success(f"图表输出到 {output_dir}：{summarize(results)}")
+    if any(r.status == "failed" for r in results):
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
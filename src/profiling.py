@@ -0,0 +1,262 @@
+"""
+运行计时与性能剖析
+
+    from profiling import stage, symbol_scope
+    with stage("load", symbol) as span:       # 计时一个阶段，结束前可补充行数、字节数
+        df = ...
+        span.rows, span.bytes = len(df), df.memory_usage().sum()
+
+    with profiled_run("analyze", profile=True):   # 命令行入口：结束时输出汇总、写 JSON，可选 cProfile
+        ...
+
+各模块在下载（download）、目录查询（metadata）、读取（load / load_csv）、原语（primitive:名称）、
+指标计算（calculate:指标名）、绘图（plot）和保存（save / save_chart）处记录阶段，按 阶段 × 股票 累计
+次数、耗时、行数和字节数。阶段可以嵌套（如 calculate 内部的 primitive），各自单独统计；
+每只股票的总耗时只累加最外层阶段（top_seconds），嵌套阶段的耗时不重复计入。
+
+常驻服务的请求延迟用 LatencyStats 记录（分位数与吞吐量）。
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+import numpy as np
+
+from config import REPORTS_DIR
+
+PROFILE_DIR = REPORTS_DIR / "profiles"
+_current_symbol: ContextVar[Optional[str]] = ContextVar("current_symbol", default=None)
+_stage_depth: ContextVar[int] = ContextVar("stage_depth", default=0)   # 当前嵌套的阶段层数
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    top_seconds: float = 0.0     # 作为最外层阶段（不在其他阶段内部）的耗时
+
+    def add(self, seconds: float, rows: int = 0, nbytes: int = 0, count: int = 1, top: bool = True) -> None:
+        self.count += count
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+        self.bytes += nbytes
+        if top:
+            self.top_seconds += seconds
+
+    def merge(self, other: 'StageStats') -> None:
+        self.add(other.seconds, other.rows, other.bytes, other.count, top=False)
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.top_seconds += other.top_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["mean_ms"] = self.seconds / self.count * 1000 if self.count else 0.0
+        result["rows_per_s"] = self.rows / self.seconds if self.seconds > 0 else 0.0
+        result["mb_per_s"] = self.bytes / 2**20 / self.seconds if self.seconds > 0 else 0.0
+        return result
+
+
+class Span:
+    """一次阶段计时，退出前可设置 rows / bytes"""
+    __slots__ = ("rows", "bytes")
+
+    def __init__(self, rows: int = 0, nbytes: int = 0):
+        self.rows = rows
+        self.bytes = nbytes
+
+
+class Timings:
+    """按 (阶段, 股票) 累计的计时（线程安全）；symbol 为 None 的记录只计入阶段合计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, Optional[str]], StageStats] = {}
+
+    def record(self, name: str, symbol: Optional[str], seconds: float, rows: int = 0, nbytes: int = 0,
+               top: bool = True) -> None:
+        """:param top: 是否为最外层阶段（嵌套在其他阶段内的记录不计入 top_seconds）"""
+        with self._lock:
+            stats = self._stats.get((name, symbol))
+            if stats is None:
+                stats = self._stats[(name, symbol)] = StageStats()
+            stats.add(seconds, int(rows), int(nbytes), top=top)
+
+    @contextmanager
+    def stage(self, name: str, symbol: Optional[str] = None, rows: int = 0, nbytes: int = 0) -> Iterator[Span]:
+        """
+        计时一个阶段
+        :param symbol: 股票代码，默认取 symbol_scope 设置的当前股票
+        """
+        span = Span(rows, nbytes)
+        depth = _stage_depth.get()
+        token = _stage_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            elapsed = time.perf_counter() - started
+            _stage_depth.reset(token)
+            self.record(name, symbol if symbol is not None else _current_symbol.get(),
+                        elapsed, span.rows, span.bytes, top=depth == 0)
+
+    def snapshot(self, reset: bool = False) -> Dict[Tuple[str, Optional[str]], StageStats]:
+        """当前的全部记录（reset=True 时同时清空，用于工作进程把本批记录交回主进程）"""
+        with self._lock:
+            stats = self._stats
+            if reset:
+                self._stats = {}
+            else:
+                stats = {key: StageStats(**asdict(value)) for key, value in stats.items()}
+        return stats
+
+    def merge(self, stats: Dict[Tuple[str, Optional[str]], StageStats]) -> None:
+        with self._lock:
+            for key, value in stats.items():
+                if key in self._stats:
+                    self._stats[key].merge(value)
+                else:
+                    self._stats[key] = StageStats(**asdict(value))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+
+    def summary(self) -> Dict[str, Any]:
+        """{"stages": {阶段: 合计}, "symbols": {股票: {阶段: 统计}}}"""
+        stages: Dict[str, StageStats] = {}
+        symbols: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (name, symbol), stats in sorted(self.snapshot().items(), key=lambda item: (item[0][0], item[0][1] or "")):
+            stages.setdefault(name, StageStats()).merge(stats)
+            if symbol is not None:
+                symbols.setdefault(symbol, {})[name] = stats.to_dict()
+        ordered = sorted(stages.items(), key=lambda item: -item[1].seconds)
+        return {"stages": {name: stats.to_dict() for name, stats in ordered}, "symbols": symbols}
+
+
+TIMINGS = Timings()  # 进程内共享的计时记录
+
+
+def stage(name: str, symbol: Optional[str] = None, rows: int = 0, nbytes: int = 0):
+    """在共享记录 TIMINGS 上计时一个阶段（见 Timings.stage）"""
+    return TIMINGS.stage(name, symbol, rows, nbytes)
+
+
+@contextmanager
+def symbol_scope(symbol: Optional[str]) -> Iterator[None]:
+    """在此范围内未指定股票的阶段记到 symbol 名下"""
+    token = _current_symbol.set(symbol)
+    try:
+        yield
+    finally:
+        _current_symbol.reset(token)
+
+
+def format_summary(summary: Dict[str, Any], wall_seconds: float, top_symbols: int = 5) -> str:
+    """阶段汇总表 + 耗时最多的几只股票"""
+    lines = [f"{'阶段':<24}{'次数':>8}{'耗时s':>10}{'占比':>8}{'平均ms':>10}{'最大ms':>10}{'行数':>12}{'MB':>10}"]
+    for name, s in summary["stages"].items():
+        share = s["seconds"] / wall_seconds if wall_seconds > 0 else 0.0
+        lines.append(f"{name:<24}{s['count']:>8,}{s['seconds']:>10.3f}{share:>8.1%}{s['mean_ms']:>10.2f}"
+                     f"{s['max_seconds'] * 1000:>10.1f}{s['rows']:>12,}{s['bytes'] / 2**20:>10.1f}")
+    # 只累加最外层阶段，calculate 内部的 primitive 等嵌套阶段已包含在外层的耗时中
+    totals = sorted(((sum(s["top_seconds"] for s in stages.values()), symbol)
+                     for symbol, stages in summary["symbols"].items()), reverse=True)[:top_symbols]
+    if totals:
+        lines.append("耗时最多的股票：" + "，".join(f"{symbol} {seconds:.3f}s" for seconds, symbol in totals))
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiled_run(command: str, profile: bool = False, summary_path: Optional[Path] = None,
+                 profile_path: Optional[Path] = None, top: int = 25) -> Iterator[Dict[str, Any]]:
+    """
+    包裹一次命令行运行：清空计时记录，结束时在日志中输出阶段汇总并写出 JSON
+    :param profile: 同时用 cProfile 记录整个运行（只记录当前进程）
+    :param summary_path: JSON 汇总路径，默认 PROFILE_DIR/{command}.json
+    :param profile_path: cProfile 输出路径，默认 PROFILE_DIR/{command}.prof（可用 snakeviz 等工具查看）
+    :param top: 日志中列出的最耗时函数数
+    产出的字典可由调用方补充到 JSON 的 "run" 字段中（如股票数、退出码）
+    """
+    import cProfile
+    import io
+    import pstats
+
+    summary_path = Path(summary_path or PROFILE_DIR / f"{command}.json")
+    profile_path = Path(profile_path or PROFILE_DIR / f"{command}.prof")
+    TIMINGS.reset()
+    run: Dict[str, Any] = {"command": command, "started": datetime.now().isoformat(timespec='seconds')}
+    profiler = cProfile.Profile() if profile else None
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield run
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall = time.perf_counter() - started
+        run["wall_seconds"] = wall
+        summary = TIMINGS.summary()
+        logger.info(f"阶段耗时（总用时 {wall:.2f}s）：\n{format_summary(summary, wall)}")
+
+        summary_path.parent.mkdir(parents=True, exist_ok=True)
+        if profiler is not None:
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_path)
+            buf = io.StringIO()
+            pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(top)
+            logger.info(f"cProfile（按累计耗时前 {top} 个函数，完整结果：{profile_path}）：\n{buf.getvalue().strip()}")
+            run["profile"] = str(profile_path)
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump({"run": run, **summary}, f, ensure_ascii=False, indent=2, default=str)
+        logger.info(f"计时汇总已保存：{summary_path}")
+
+
+class LatencyStats:
+    """记录最近 maxlen 次的耗时，给出分位数与吞吐量（线程安全）"""
+
+    def __init__(self, maxlen: int = 100_000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=maxlen)
+        self.started = time.perf_counter()
+        self.count = 0
+        self.rows = 0
+
+    def record(self, seconds: float, rows: int = 1) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            self.count += 1
+            self.rows += rows
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = np.fromiter(self._latencies, dtype=float)
+            count, rows = self.count, self.rows
+        elapsed = time.perf_counter() - self.started
+        result = {"count": count, "rows": rows, "elapsed_s": elapsed,
+                  "throughput_per_s": count / elapsed if elapsed > 0 else 0.0,
+                  "rows_per_s": rows / elapsed if elapsed > 0 else 0.0}
+        if len(latencies):
+            for q in (50, 90, 99):
+                result[f"p{q}_ms"] = float(np.percentile(latencies, q) * 1000)
+            result["max_ms"] = float(latencies.max() * 1000)
+        return result
+
+    def format(self) -> str:
+        s = self.summary()
+        text = f"{s['count']:,} 次，{s['rows']:,} 行，{s['throughput_per_s']:,.1f} 次/s，{s['rows_per_s']:,.0f} 行/s"
+        if "p50_ms" in s:
+            text += f"，延迟 p50 {s['p50_ms']:.2f}ms / p90 {s['p90_ms']:.2f}ms / p99 {s['p99_ms']:.2f}ms"
+        return text
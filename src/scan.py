@@ -0,0 +1,95 @@
+"""
+全市场信号扫描（基于本地行情库，适合每天收盘后运行）
+
+    python scan.py "MACD crosses_above Signal"
+    python scan.py "收盘 > 动态趋势上轨" "ADX >= 60" --top 30 --rank-by 成交量
+    python scan.py "MACD 上穿 Signal" --param MACD.fast_period=8 --date 20240628 --symbols @watchlist.txt
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+import typer
+
+import config
+from config import PRICE_STORE_DIR, REPORTS_DIR
+from utils.cli import parse_symbols, parse_value
+
+SCAN_DIR = REPORTS_DIR / "scans"
+app = typer.Typer()
+
+
+def parse_params(items: List[str]) -> Dict[str, Dict[str, Any]]:
+    """["MACD.fast_period=8", ...] -> {"MACD": {"fast_period": 8}}"""
+    params: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        name, dot, param = key.strip().partition(".")
+        if not sep or not dot:
+            raise typer.BadParameter(f"参数格式应为 指标名.参数名=值：{item}")
+        params.setdefault(name, {})[param] = parse_value(value)
+    return params
+
+
+def lookup_names(codes: List[str]) -> Dict[str, str]:
+    """从本地股票目录取简称（目录不可用时返回空字典，不逐只请求）"""
+    from data_processing.symbol_catalog import get_catalog
+
+    try:
+        catalog = get_catalog()
+        catalog.ensure_fresh()
+    except Exception as e:
+        logger.warning(f"股票目录不可用，不显示简称：{e}")
+        return {}
+    names = {}
+    for code in codes:
+        info = catalog.get(code, fetch_missing=False)
+        if info is not None:
+            names[code] = info.name
+    return names
+
+
+@app.command()
+def main(
+    conditions: List[str] = typer.Argument(..., help="条件，如 \"MACD crosses_above Signal\"，全部满足才算命中"),
+    symbols: Optional[str] = typer.Option(None, help="股票代码，逗号分隔，或 @文件；默认行情库中的全部股票"),
+    param: List[str] = typer.Option([], help="指标参数，如 MACD.fast_period=8，可重复"),
+    date: Optional[str] = typer.Option(None, help="扫描日 YYYYMMDD，默认行情库中最新的交易日"),
+    rank_by: Optional[str] = typer.Option(None, help="排序列，默认第一个条件的相对差值"),
+    ascending: bool = typer.Option(False, help="升序排列"),
+    top: int = typer.Option(50, help="输出前 k 只"),
+    chunk_size: int = typer.Option(256, help="每块的股票数"),
+    workers: Optional[int] = typer.Option(None, help="进程数，默认 CPU 核数"),
+    store_root: Path = typer.Option(PRICE_STORE_DIR, help="本地行情库目录"),
+    output: Optional[Path] = typer.Option(None, help="结果 CSV 路径，默认 reports/scans/scan_{扫描日}.csv"),
+    names: bool = typer.Option(True, help="附加股票简称（来自本地股票目录）"),
+):
+    from indicators.scanner import scan_market
+
+    config.setup()
+    try:
+        result = scan_market(conditions, parse_symbols(symbols) if symbols else None, parse_params(param),
+                             date, rank_by, ascending, store_root, chunk_size, workers)
+    except (KeyError, ValueError) as e:
+        logger.error(str(e).strip("'\""))
+        raise typer.Exit(code=2)
+
+    if result.date is None:
+        logger.error(f"行情库 {store_root} 中没有数据")
+        raise typer.Exit(code=1)
+    table = result.top(top)
+    if names and len(table):
+        table.insert(1, '名称', table['代码'].map(lookup_names(list(table['代码']))).fillna(''))
+    output = output or SCAN_DIR / f"scan_{result.date:%Y%m%d}.csv"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(output, index=False, encoding='utf-8-sig')
+
+    logger.info(f"条件：{' 且 '.join(map(str, result.conditions))}")
+    if len(table):
+        logger.info("\n" + table.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    logger.success(f"{result.date:%Y-%m-%d} 扫描 {result.scanned} 只（跳过 {result.stale} 只停牌/无数据），"
+                   f"命中 {len(result.matches)} 只，用时 {result.elapsed:.1f}s，前 {len(table)} 只已保存：{output}")
+
+
+if __name__ == "__main__":
+    app()
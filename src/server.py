@@ -0,0 +1,308 @@
+"""
+常驻分析服务：行情一次性载入内存，按需计算指标并缓存结果，行情库有新K线时自动刷新
+
+    python server.py                                  # 载入全部股票，监听 127.0.0.1:8766
+    python server.py --symbols @watchlist.txt --port 9000 --refresh-every 30
+
+接口：
+    GET  /indicator?symbol=300100&indicator=MACD&fast_period=8&start=20240101&end=20240630&format=json
+         format 为 json（默认）/ csv / png / svg；其余查询参数作为指标参数；tail=N 只返回最后 N 根，
+         prices=1 同时返回行情列，width=像素 控制图表降采样
+    POST /indicator  {"symbol": "300100", "indicator": "薛斯通道", "params": {"N": 40}, "format": "png"}
+    GET  /symbols    已载入的股票及最后日期
+    GET  /stats      延迟分位数、缓存命中、刷新次数
+    GET  /health
+
+指标总在完整历史上计算（保证预热期正确），再截取请求的日期区间。计算结果按（数据 + 指标 + 参数）缓存在内存中，
+编码好的响应按（数据版本 + 请求）缓存，重复请求直接返回。
+"""
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import typer
+
+import config
+from config import PRICE_STORE_DIR
+from profiling import LatencyStats
+from utils.cli import parse_flag, parse_symbols, parse_value
+
+FORMATS = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+RESERVED = {'symbol', 'indicator', 'params', 'start', 'end', 'format', 'tail', 'prices', 'width'}
+app = typer.Typer()
+
+
+class MarketData:
+    """内存中的行情（每只股票一个 DataFrame）及其数据版本"""
+
+    def __init__(self, store_root: Path = PRICE_STORE_DIR, symbols: Optional[List[str]] = None):
+        """
+        :param symbols: 只载入这些股票，默认行情库中的全部股票
+        """
+        from data_processing.price_store import PriceStore
+
+        self.store = PriceStore(store_root)
+        self.wanted = symbols
+        self.frames: Dict[str, Tuple[str, pd.DataFrame]] = {}   # 代码 -> (数据版本, 行情)
+        self.refreshes = 0
+        self.refresh()
+        self.refreshes = 0      # 首次载入不计入刷新次数
+
+    def get(self, symbol: str) -> Tuple[str, pd.DataFrame]:
+        entry = self.frames.get(symbol)
+        if entry is None:
+            raise KeyError(f"行情库中没有 {symbol}")
+        return entry
+
+    def refresh(self) -> List[str]:
+        """重新载入数据版本有变化的股票（新增、追加或覆盖写入），移除已删除的股票，返回有变化的代码"""
+        symbols = self.wanted if self.wanted is not None else self.store.symbols()
+        changed = []
+        for symbol in symbols:
+            version = self.store.version(symbol)
+            entry = self.frames.get(symbol)
+            if version is None or (entry is not None and entry[0] == version):
+                continue
+            # 整体替换字典项，正在处理的请求继续使用旧的 DataFrame
+            self.frames[symbol] = (version, self.store.read_frame(symbol))
+            changed.append(symbol)
+        for symbol in set(self.frames) - set(symbols):
+            del self.frames[symbol]
+            changed.append(symbol)
+        if changed:
+            self.refreshes += 1
+        return changed
+
+
+class AnalysisService:
+    """指标查询：完整历史上计算，截取区间，编码为 json / csv / 图片；编码结果按数据版本缓存"""
+
+    def __init__(self, data: MarketData, max_results: int = 4096, max_responses: int = 2048):
+        """
+        :param max_results: 内存中最多保存的指标结果数
+        :param max_responses: 内存中最多保存的已编码响应数
+        """
+        from indicators.cache import IndicatorCache
+
+        self.data = data
+        self.cache = IndicatorCache(max_items=max_results, disk_dir=None)
+        self.max_responses = max_responses
+        self._responses: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()          # 响应缓存（指标缓存有自己的锁，计算不占用这把锁）
+        self._chart_lock = threading.Lock()    # 图表模板不是线程安全的
+        self.response_hits = 0
+        self.response_misses = 0
+
+    def query(self, symbol: str, indicator: str, params: Optional[Dict[str, Any]] = None,
+              start=None, end=None, fmt: str = 'json', tail: Optional[int] = None,
+              prices: bool = False, width: Optional[int] = None) -> bytes:
+        from indicators.pipeline import build_indicator, request_label
+
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的格式: {fmt}，可选：{', '.join(FORMATS)}")
+        params = dict(params or {})
+        version, df = self.data.get(symbol)
+        key = (symbol, version, indicator, json.dumps(params, sort_keys=True, default=str),
+               start, end, fmt, tail, prices, width)
+        with self._lock:
+            body = self._responses.get(key)
+            if body is not None:
+                self._responses.move_to_end(key)
+                self.response_hits += 1
+                return body
+            self.response_misses += 1
+
+        built = build_indicator(indicator, params)
+        outputs = self.cache.get_outputs(built, df)
+        if fmt in ('png', 'svg'):
+            body = self._render(indicator, df, outputs, symbol, start, end, fmt, width)
+        else:
+            rows = df.index.slice_indexer(pd.Timestamp(start) if start else None,
+                                          pd.Timestamp(end) if end else None)
+            frame = pd.DataFrame({name: values[rows] for name, values in outputs.items()}, index=df.index[rows])
+            if prices:
+                frame = pd.concat([df.iloc[rows], frame], axis=1)
+            if tail:
+                frame = frame.iloc[-tail:]
+            body = self._encode(frame, symbol, request_label(built, params), fmt)
+
+        with self._lock:
+            self._responses[key] = body
+            while len(self._responses) > self.max_responses:
+                self._responses.popitem(last=False)
+        return body
+
+    @staticmethod
+    def _encode(frame: pd.DataFrame, symbol: str, label: str, fmt: str) -> bytes:
+        if fmt == 'csv':
+            return frame.to_csv(index_label='日期', date_format='%Y-%m-%d').encode('utf-8')
+        columns = {}
+        for name in frame.columns:
+            values = frame[name].to_numpy()
+            if values.dtype.kind == 'f':
+                values = np.where(np.isnan(values), None, values.astype(object))  # NaN -> null
+            columns[name] = values.tolist()
+        dates = np.datetime_as_string(frame.index.values, unit='D').tolist()
+        return json.dumps({"symbol": symbol, "indicator": label, "dates": dates, "columns": columns},
+                          ensure_ascii=False).encode('utf-8')
+
+    def _render(self, indicator: str, df: pd.DataFrame, outputs: Dict[str, np.ndarray], symbol: str,
+                start, end, fmt: str, width: Optional[int]) -> bytes:
+        from indicators.technical import assemble_outputs
+        from visualization.batch import CHARTS, get_template, init_worker
+
+        if indicator not in CHARTS:
+            raise ValueError(f"{indicator} 没有对应的图表，支持：{', '.join(CHARTS)}")
+        frame = assemble_outputs(df, outputs, copy=True)
+        with self._chart_lock:
+            init_worker()
+            template = get_template(indicator, width)
+            template.render(frame, symbol, pd.Timestamp(start) if start else None,
+                            pd.Timestamp(end) if end else None)
+            buf = io.BytesIO()
+            template.fig.savefig(buf, format=fmt, dpi=100)
+        return buf.getvalue()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        total = self.response_hits + self.response_misses
+        stats = self.cache.stats
+        return {"responses": len(self._responses), "response_hits": self.response_hits,
+                "response_misses": self.response_misses,
+                "response_hit_rate": self.response_hits / total if total else 0.0,
+                "results": len(self.cache._memory), "result_hits": stats.hits,
+                "result_misses": stats.misses, "result_hit_rate": stats.hit_rate}
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service: AnalysisService):
+        super().__init__(address, AnalysisHandler)
+        self.service = service
+        self.stats = LatencyStats()
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    server: AnalysisServer
+
+    def log_message(self, format, *args):   # 默认写 stderr，改为 loguru
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status: int, body: bytes, content_type: str = FORMATS['json']) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, body: dict) -> None:
+        self._send(status, json.dumps(body, ensure_ascii=False).encode('utf-8'))
+
+    def _handle(self, path: str, payload: Dict[str, Any]) -> None:
+        service = self.server.service
+        try:
+            if path == "/indicator":
+                started = time.perf_counter()
+                if not payload.get('symbol') or not payload.get('indicator'):
+                    return self._send_json(400, {"error": "需要 symbol 和 indicator"})
+                fmt = payload.get('format') or 'json'
+                tail = payload.get('tail')
+                body = service.query(str(payload['symbol']), payload['indicator'], payload.get('params'),
+                                     payload.get('start'), payload.get('end'), fmt,
+                                     int(tail) if tail else None, parse_flag(payload.get('prices')),
+                                     int(payload['width']) if payload.get('width') is not None else None)
+                self._send(200, body, FORMATS[fmt])
+                self.server.stats.record(time.perf_counter() - started)
+            elif path == "/symbols":
+                frames = service.data.frames
+                self._send_json(200, {symbol: str(df.index[-1].date()) if len(df) else None
+                                      for symbol, (_, df) in sorted(frames.items())})
+            elif path == "/stats":
+                self._send_json(200, {"requests": self.server.stats.summary(), "cache": service.cache_stats(),
+                                      "symbols": len(service.data.frames), "refreshes": service.data.refreshes})
+            elif path == "/health":
+                self._send_json(200, {"status": "ok", "symbols": len(service.data.frames)})
+            else:
+                self._send_json(404, {"error": f"未知的路径: {path}"})
+        except KeyError as e:
+            self._send_json(404, {"error": str(e).strip("'\"")})
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception(e)
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        # 其余查询参数都是指标参数
+        params = {key: parse_value(query[key]) for key in set(query) - RESERVED}
+        self._handle(url.path, {**query, "params": params})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send_json(400, {"error": f"请求体不是合法的 JSON: {e}"})
+        self._handle(urlparse(self.path).path, payload)
+
+
+@app.command()
+def main(
+    symbols: Optional[str] = typer.Option(None, help="股票代码，逗号分隔，或 @文件；默认行情库中的全部股票"),
+    host: str = typer.Option("127.0.0.1", help="监听地址"),
+    port: int = typer.Option(8766, help="监听端口"),
+    refresh_every: float = typer.Option(10.0, help="每隔多少秒检查行情库是否有新K线，0 不检查"),
+    max_results: int = typer.Option(4096, help="内存中最多保存的指标结果数"),
+    max_responses: int = typer.Option(2048, help="内存中最多保存的已编码响应数"),
+    store_root: Path = typer.Option(PRICE_STORE_DIR, help="本地行情库目录"),
+):
+    config.setup()
+    started = time.perf_counter()
+    data = MarketData(store_root, parse_symbols(symbols) if symbols else None)
+    rows = sum(len(df) for _, df in data.frames.values())
+    service = AnalysisService(data, max_results, max_responses)
+    server = AnalysisServer((host, port), service)
+    logger.info(f"已载入 {len(data.frames):,} 只股票（{rows:,} 根K线），用时 {time.perf_counter() - started:.1f}s；"
+                f"服务地址 http://{host}:{server.server_address[1]}")
+
+    stop = threading.Event()
+    if refresh_every > 0:
+        def refresh():
+            while not stop.wait(refresh_every):
+                try:
+                    changed = data.refresh()
+                except Exception as e:  # 刷新失败时继续使用内存中的数据
+                    logger.warning(f"刷新行情失败：{type(e).__name__}: {e}")
+                    continue
+                if changed:
+                    logger.info(f"行情已刷新：{len(changed)} 只股票（{', '.join(changed[:5])}"
+                                f"{' 等' if len(changed) > 5 else ''}）")
+        threading.Thread(target=refresh, name="refresh", daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        logger.success(f"服务已停止。请求：{server.stats.format()}")
+
+
+if __name__ == "__main__":
+    app()
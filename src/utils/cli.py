@@ -0,0 +1,58 @@
+# src/utils/cli.py
+"""
+命令行入口共用的参数解析
+
+    parse_symbols("300100,600276") / parse_symbols("@watchlist.txt")
+    parse_indicator("Keltner(multiplier=1.5)")   # ("Keltner", {"multiplier": 1.5})
+    parse_params(["max_iter=200", "loss='absolute_error'"])
+"""
+import ast
+from pathlib import Path
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+import typer
+
+
+def parse_symbols(text: str) -> List[str]:
+    """逗号分隔的代码，或 @文件（每行一个代码，# 开头为注释）"""
+    if text.startswith("@"):
+        lines = Path(text[1:]).read_text(encoding='utf-8').splitlines()
+        return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    return [s.strip() for s in text.split(",") if s.strip()]
+
+
+def parse_value(text: str) -> Any:
+    """Python 字面量（数字、布尔、元组等），解析失败时按字符串处理"""
+    text = text.strip()
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_flag(value: Any) -> bool:
+    """开关参数："1" / "true" / "yes" / "on"（不区分大小写）或 JSON 的 true 为真，"0" / "false" / 空等为假"""
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "on"}
+    return bool(value)
+
+
+def parse_params(items: Iterable[str]) -> Dict[str, Any]:
+    """["window=10", "multiplier=1.5"] -> {"window": 10, "multiplier": 1.5}"""
+    params = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep or not key.strip():
+            raise typer.BadParameter(f"参数格式应为 参数=值：{item}")
+        params[key.strip()] = parse_value(value)
+    return params
+
+
+def parse_indicator(text: str) -> Tuple[str, Dict[str, Any]]:
+    """"Keltner(multiplier=1.5,window=10)" -> ("Keltner", {"multiplier": 1.5, "window": 10})"""
+    match = re.fullmatch(r"\s*([^()\s]+)\s*(?:\((.*)\))?\s*", text)
+    if not match:
+        raise typer.BadParameter(f"指标格式应为 指标名 或 指标名(参数=值,...)：{text}")
+    name, args = match.groups()
+    return name, parse_params(filter(None, (args or "").split(",")))
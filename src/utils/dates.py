@@ -0,0 +1,35 @@
+# src/utils/dates.py
+"""
+交易日相关的共用函数（交互入口 main.py 与批量入口 analyze.py 共用）
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+HISTORY_START = "20240101"  # 下载行情时的默认起始日期，与分析区间无关，保证指标预热期有足够的历史
+
+
+def get_latest_trading_day(today: Optional[datetime] = None) -> str:
+    """获取最近一个交易日（周末取上周五）"""
+    today = today or datetime.now()
+    if today.weekday() >= 5:  # 周末
+        return (today - timedelta(days=today.weekday()-4)).strftime('%Y%m%d')
+    return today.strftime('%Y%m%d')
+
+
+def history_start(start: Optional[str] = None) -> str:
+    """下载的起始日期：默认 HISTORY_START，分析区间更早时取分析区间的起点"""
+    if start and pd.Timestamp(start) < pd.Timestamp(HISTORY_START):
+        return pd.Timestamp(start).strftime('%Y%m%d')
+    return HISTORY_START
+
+
+def check_data_update_needed(last_date: Optional[pd.Timestamp]) -> bool:
+    """检查数据是否需要更新（last_date 为行情库中最后一根K线的日期）"""
+    if last_date is None:
+        return True
+
+    latest_trading_day = pd.to_datetime(get_latest_trading_day())
+
+    return last_date < latest_trading_day
@@ -1,45 +1,59 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.font_manager import FontProperties
+
+from .chart import ChartTemplate
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 使用黑体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
-def plot_xuess_channel(df, stock_code):
-    """薛斯通道可视化"""
-    plt.figure(figsize=(16, 10))
-
-    # 将索引转换为datetime
-    df.index = pd.to_datetime(df.index)
-    
-    # 将日期转换为matplotlib格式
-    dates = mdates.date2num(df.index.to_pydatetime())
-
-    # 价格图
-    ax1 = plt.subplot(2, 1, 1, title=f"{stock_code} 薛斯通道分析")
-    ax1.plot(dates, df['收盘'], label='收盘价', lw=2.5, color='black')
-    # 设置x轴范围
-    ax1.set_xlim(dates[0], dates[-1])
-
-    # 颜色映射
-    color_map = {
-        '静态支撑带': 'green',
-        '静态压力带': 'red',
-        '动态趋势上轨': 'blue',
-        '动态趋势下轨': 'purple'
-    }
-
-    # 处理NaN值并动态添加指标线
-    for col, color in color_map.items():
-        if col in df.columns:
-            # 前向填充和后向填充NaN值
-            df[col] = df[col].ffill().bfill()
-            ax1.plot(df.index, df[col], lw=1.5, linestyle='--', color=color, label=col)
-
-    ax1.legend(loc='best', fontsize=10)
-    ax1.grid(True, alpha=0.3)
-
-    plt.tight_layout()
+# 颜色映射
+COLOR_MAP = {
+    '静态支撑带': 'green',
+    '静态压力带': 'red',
+    '动态趋势上轨': 'blue',
+    '动态趋势下轨': 'purple'
+}
+
+
+class SchaffChart(ChartTemplate):
+    """薛斯通道图模板"""
+    FIGSIZE = (16, 10)
+
+    def build(self):
+        # 价格图
+        self.ax1 = self.fig.add_subplot(2, 1, 1)
+        self.axes = [self.ax1]
+        self.close_line, = self.ax1.plot([], [], label='收盘价', lw=2.5, color='black')
+        self.band_lines = {
+            col: self.ax1.plot([], [], lw=1.5, linestyle='--', color=color, label=col)[0]
+            for col, color in COLOR_MAP.items()
+        }
+        self.ax1.grid(True, alpha=0.3)
+        self._legend_key = None
+
+    def update(self, df, dates, index, stock_code):
+        self.ax1.set_title(f"{stock_code} 薛斯通道分析")
+        self.close_line.set_data(*self.line(dates, df['收盘']))
+
+        # 处理NaN值并动态添加指标线
+        present = tuple(col for col in COLOR_MAP if col in df.columns)
+        for col, line in self.band_lines.items():
+            if col in present:
+                # 前向填充和后向填充NaN值（不修改传入的 df）；通道保留每个像素内的极值
+                line.set_data(*self.envelope(dates, df[col].ffill().bfill()))
+            else:
+                line.set_data([], [])
+            line.set_visible(col in present)
+        if present != self._legend_key:
+            handles = [self.close_line] + [self.band_lines[col] for col in present]
+            self.ax1.legend(handles=handles, loc='best', fontsize=10)
+            self._legend_key = present
+
+
+def plot_xuess_channel(df, stock_code, width_px=None):
+    """
+    薛斯通道可视化
+    :param width_px: 目标像素宽度，超过该宽度的数据会被降采样；None 取图形宽度，0 不降采样
+    """
+    SchaffChart(width_px).render(df, stock_code).enable_zoom()
     plt.show()
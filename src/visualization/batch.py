@@ -0,0 +1,188 @@
+# src/visualization/batch.py
+"""
+批量无界面出图
+
+    results = render_batch(["300100", "600276"], [("MACD", {}), ("薛斯通道", {"N": 40})])
+
+工作进程使用 Agg 后端，每种指标保留一个图表模板（ChartTemplate），连续渲染多只股票时只替换数据。
+图片输出到 config.FIGURES_DIR/{代码}_{请求标签}.png。每张图的输入指纹（行情数据 + 指标 + 参数 + 图表版本）
+记录在输出目录的 _render_manifest.json 中，指纹未变且图片仍存在时跳过。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import hashlib
+from importlib import import_module
+import json
+import os
+from pathlib import Path
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import FIGURES_DIR, PRICE_STORE_DIR
+
+CHART_VERSION = 1  # 图表样式有变化时递增，使已有图片全部重绘
+MANIFEST_FILE = "_render_manifest.json"
+
+# 指标名 -> (模块, 图表模板类)
+CHARTS = {
+    '薛斯通道': ('visualization.Plot_Schaffchannel', 'SchaffChart'),
+    'ADX': ('visualization.polt_adx', 'ADXChart'),
+    'MACD': ('visualization.plot_macd', 'MACDChart'),
+    'Donchian': ('visualization.plot_channel', 'DonchianChart'),
+    'Keltner': ('visualization.plot_channel', 'KeltnerChart'),
+}
+
+Request = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class RenderResult:
+    symbol: str
+    label: str
+    status: str                 # rendered / skipped / failed
+    path: Optional[str] = None
+    fingerprint: Optional[str] = None
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+_templates: Dict[Tuple[str, Optional[int]], Any] = {}  # 进程内复用的图表模板
+
+
+def init_worker() -> None:
+    """无界面出图的进程初始化（Agg 后端，屏蔽字体警告）；也可作为进程池的 initializer"""
+    import logging
+    import warnings
+
+    import matplotlib
+    matplotlib.use('Agg')  # 无界面后端
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore', module='matplotlib')
+
+
+def get_template(indicator_name: str, width_px: Optional[int] = None):
+    """进程内复用的图表模板（按 指标名 × 像素宽度），indicator_name 须在 CHARTS 中"""
+    template = _templates.get((indicator_name, width_px))
+    if template is None:
+        module_name, cls_name = CHARTS[indicator_name]
+        template = getattr(import_module(module_name), cls_name)(width_px)
+        _templates[(indicator_name, width_px)] = template
+    return template
+
+
+def _manifest_key(symbol: str, label: str, fmt: str) -> str:
+    return f"{symbol}|{label}|{fmt}"
+
+
+def _render_symbol(task) -> List[RenderResult]:
+    """渲染一只股票的所有请求（在工作进程中执行）"""
+    from data_processing.data_downloader import clean_filename
+    from data_processing.price_store import PriceStore
+    from indicators.cache import get_default_cache
+    from indicators.pipeline import build_indicator, request_label
+
+    symbol, requests, store_root, start, end, output_dir, fmt, dpi, width_px, previous, force = task
+    cache = get_default_cache()
+    results = []
+    try:
+        df = PriceStore(store_root).read_frame(symbol, start, end)
+        if df.empty:
+            raise ValueError("行情库中没有该区间的数据")
+    except Exception as e:
+        return [RenderResult(symbol, request_label(build_indicator(name, params), params), "failed",
+                             error=f"{type(e).__name__}: {e}") for name, params in requests]
+
+    for name, params in requests:
+        t0 = time.perf_counter()
+        indicator = build_indicator(name, params)
+        label = request_label(indicator, params)
+        path = Path(output_dir) / f"{clean_filename(f'{symbol}_{label}')}.{fmt}"
+        payload = json.dumps([CHART_VERSION, cache.key(indicator, df), dpi, fmt, width_px])
+        fingerprint = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+        if not force and previous.get(_manifest_key(symbol, label, fmt)) == fingerprint and path.exists():
+            results.append(RenderResult(symbol, label, "skipped", str(path), fingerprint))
+            continue
+        try:
+            out = cache.calculate(indicator, df)
+            get_template(name, width_px).render(out, symbol).save(path, dpi=dpi)
+            results.append(RenderResult(symbol, label, "rendered", str(path), fingerprint,
+                                        time.perf_counter() - t0))
+        except Exception as e:
+            results.append(RenderResult(symbol, label, "failed", error=f"{type(e).__name__}: {e}"))
+    return results
+
+
+def _load_manifest(output_dir: Path) -> Dict[str, str]:
+    try:
+        return json.loads((output_dir / MANIFEST_FILE).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir: Path, manifest: Dict[str, str]) -> None:
+    tmp = output_dir / f"{MANIFEST_FILE}.tmp"
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=0), encoding='utf-8')
+    os.replace(tmp, output_dir / MANIFEST_FILE)
+
+
+def render_batch(symbols: Iterable[str], requests: Iterable[Request],
+                 output_dir: Path = FIGURES_DIR, store_root: Path = PRICE_STORE_DIR,
+                 start: Optional[str] = None, end: Optional[str] = None,
+                 fmt: str = "png", dpi: int = 100, width_px: Optional[int] = None,
+                 max_workers: Optional[int] = None,
+                 force: bool = False, progress: bool = True) -> List[RenderResult]:
+    """
+    批量渲染 股票 × 指标 图表
+    :param requests: [(指标名, 参数字典), ...]，指标名须在 CHARTS 中
+    :param width_px: 目标像素宽度（降采样），None 取图形宽度，0 不降采样
+    :param max_workers: 进程数，1 表示在当前进程渲染
+    :param force: 忽略指纹，全部重绘
+    """
+    requests = [(name, dict(params or {})) for name, params in requests]
+    unknown = [name for name, _ in requests if name not in CHARTS]
+    if unknown:
+        raise KeyError(f"没有对应的图表：{unknown}，支持：{', '.join(CHARTS)}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(output_dir)
+    symbols = list(dict.fromkeys(symbols))
+    tasks = [
+        (symbol, requests, str(store_root), start, end, str(output_dir), fmt, dpi, width_px,
+         {k: v for k, v in manifest.items() if k.startswith(f"{symbol}|")}, force)
+        for symbol in symbols
+    ]
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks) or 1))
+    if max_workers == 1:
+        init_worker()
+        batches = map(_render_symbol, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker)
+        # 每个进程连续处理一批股票，图表模板在批内复用
+        batches = executor.map(_render_symbol, tasks, chunksize=max(1, len(tasks) // (max_workers * 4)))
+
+    if progress:
+        from tqdm import tqdm
+        batches = tqdm(batches, total=len(tasks), desc="渲染图表")
+
+    results: List[RenderResult] = []
+    try:
+        for batch in batches:
+            for r in batch:
+                if r.status != "failed":
+                    manifest[_manifest_key(r.symbol, r.label, fmt)] = r.fingerprint
+                results.append(r)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        _save_manifest(output_dir, manifest)
+    return results
+
+
+def summarize(results: List[RenderResult]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    return counts
@@ -0,0 +1,168 @@
+# src/visualization/chart.py
+"""
+图表模板基类
+
+图形、坐标轴和线条在构造时创建一次，render(df, stock_code) 只替换数据、标题和坐标范围，
+批量出图时同一个模板可以连续渲染多只股票。交互使用时 plot_xxx 函数构造模板后调用 plt.show()。
+
+绘制前按目标像素宽度 width_px 对可见日期范围内的数据降采样（见 downsample.py），
+因此无论输入有多少根K线，渲染时间都大致不变；交互缩放时按新的可见范围重新降采样。
+"""
+from pathlib import Path
+from typing import List, Optional, Union
+
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from profiling import stage
+from .downsample import bucket_bars, lttb_indices, minmax_indices
+
+
+def to_datetime_index(df: pd.DataFrame) -> pd.DatetimeIndex:
+    """DataFrame 索引转为 DatetimeIndex（已经是时不做转换，也不修改 df）"""
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index
+    return pd.DatetimeIndex(pd.to_datetime(df.index))
+
+
+def set_date_locator(ax, index: pd.DatetimeIndex) -> None:
+    """根据数据时间跨度自动调整刻度间隔"""
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    date_range = (index[-1] - index[0]).days
+    if date_range <= 30:  # 小于1个月，按天显示
+        ax.xaxis.set_major_locator(mdates.DayLocator(interval=max(1, date_range//7)))
+    elif date_range <= 365:  # 小于1年，按月显示
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+    elif date_range <= 3 * 365:  # 小于3年，按季度显示
+        ax.xaxis.set_major_locator(mdates.MonthLocator(interval=3))
+    else:  # 更长的区间按年显示，避免刻度重叠
+        ax.xaxis.set_major_locator(mdates.YearLocator(max(1, date_range // (365 * 12))))
+
+
+def autoscale_y(ax) -> None:
+    """按当前数据重新计算 y 轴范围（x 轴范围由调用方设置）"""
+    ax.relim()
+    ax.autoscale_view(scalex=False, scaley=True)
+
+
+class ChartTemplate:
+    FIGSIZE = (12, 8)
+
+    def __init__(self, width_px: Optional[int] = None):
+        """
+        :param width_px: 目标像素宽度，决定降采样后的点数；None 取图形宽度（英寸 × dpi），0 表示不降采样
+        """
+        self.fig = plt.figure(figsize=self.FIGSIZE)
+        self.width_px = width_px
+        self.axes: List = []        # 共享日期轴的坐标轴，由子类在 build 中填充
+        self._laid_out = False
+        self._full = None           # (df, dates, index, stock_code)，交互缩放时重新降采样用
+        self._zooming = False
+        self.build()
+
+    def build(self) -> None:
+        """创建坐标轴和线条（子类实现）"""
+        raise NotImplementedError
+
+    def update(self, df: pd.DataFrame, dates: np.ndarray, index: pd.DatetimeIndex, stock_code: str) -> None:
+        """替换数据（子类实现），df/dates/index 只包含可见范围内的行"""
+        raise NotImplementedError
+
+    # ---------------- 降采样 ----------------
+
+    @property
+    def pixels(self) -> int:
+        if self.width_px is None:
+            return int(self.fig.get_figwidth() * self.fig.dpi)
+        return self.width_px
+
+    def line(self, dates: np.ndarray, values) -> tuple:
+        """折线：LTTB，约每像素一个点"""
+        values = np.asarray(values, dtype=float)
+        if not self.pixels:
+            return dates, values
+        idx = lttb_indices(values, self.pixels, dates)
+        return dates[idx], values[idx]
+
+    def envelope(self, dates: np.ndarray, values) -> tuple:
+        """通道边界、填充区域：每两个像素保留桶内最小值和最大值"""
+        values = np.asarray(values, dtype=float)
+        if not self.pixels:
+            return dates, values
+        idx = minmax_indices(values, self.pixels // 2)
+        return dates[idx], values[idx]
+
+    def bars(self, dates: np.ndarray, values) -> tuple:
+        """柱状图：每根柱子至少占四个像素（每根柱子都是一个图形对象，数量决定绘制时间），返回 (位置, 高度, 柱宽)"""
+        values = np.asarray(values, dtype=float)
+        if not self.pixels:
+            return dates, values, 0.8
+        return bucket_bars(dates, values, self.pixels // 4)
+
+    # ---------------- 渲染 ----------------
+
+    def render(self, df: pd.DataFrame, stock_code: str, start=None, end=None) -> "ChartTemplate":
+        """
+        :param start: 可见范围起始日期（默认数据开头）
+        :param end: 可见范围结束日期（默认数据结尾）
+        """
+        with stage("plot", stock_code, rows=len(df)):
+            index = to_datetime_index(df)
+            dates = mdates.date2num(index.values)  # 转换为matplotlib格式（datetime64 向量化转换）
+            self._full = (df, dates, index, stock_code)
+            if start is not None or end is not None:
+                rows = index.slice_indexer(start, end)
+                df, dates, index = df.iloc[rows], dates[rows], index[rows]
+
+            self._zooming = True  # 下面设置 x 轴范围时不触发缩放回调
+            try:
+                self.update(df, dates, index, stock_code)
+                for ax in self.axes:
+                    ax.set_xlim(dates[0], dates[-1])
+                    set_date_locator(ax, index)
+                    autoscale_y(ax)
+            finally:
+                self._zooming = False
+            if not self._laid_out:
+                # 布局只计算一次，之后渲染的股票沿用
+                self.fig.tight_layout()
+                self._laid_out = True
+        return self
+
+    def enable_zoom(self) -> "ChartTemplate":
+        """交互缩放/平移时按新的可见范围重新降采样"""
+        if self.axes:
+            self.axes[0].callbacks.connect('xlim_changed', self._on_xlim_changed)
+        return self
+
+    def _on_xlim_changed(self, ax) -> None:
+        if self._zooming or self._full is None:
+            return
+        df, dates, index, stock_code = self._full
+        lo, hi = ax.get_xlim()
+        # 两侧各多取一根，保证线条延伸到可见区域边缘
+        first = max(int(np.searchsorted(dates, lo)) - 1, 0)
+        last = min(int(np.searchsorted(dates, hi, side='right')) + 1, len(dates))
+        if last - first < 2:
+            return
+        self._zooming = True
+        try:
+            self.update(df.iloc[first:last], dates[first:last], index[first:last], stock_code)
+            for other in self.axes[1:]:  # 其余坐标轴跟随主坐标轴的日期范围
+                other.set_xlim(lo, hi)
+        finally:
+            self._zooming = False
+        self.fig.canvas.draw_idle()
+
+    def save(self, path: Union[str, Path], dpi: int = 100) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with stage("save_chart", self._full[3] if self._full else None) as span:
+            self.fig.savefig(path, dpi=dpi)
+            span.bytes = path.stat().st_size
+        return path
+
+    def close(self) -> None:
+        plt.close(self.fig)
@@ -0,0 +1,120 @@
+# src/visualization/downsample.py
+"""
+绘图用的保形降采样（LOD）
+
+- lttb_indices：Largest-Triangle-Three-Buckets，用于价格线、MACD 线等折线，保留视觉上的拐点
+- minmax_indices：每个桶保留最小值和最大值所在的点，用于通道上下轨、填充区域，保证极值不丢失
+- bucket_bars：每个桶合并为一根柱子，高度取桶内绝对值最大的那根（保留正负号），用于柱状图
+
+数据点数不超过目标点数时原样返回（np.arange(len(y))），小数据量的图与不降采样时完全相同。
+NaN 点不参与选点，但每段连续 NaN 的第一个点总会保留，折线和填充区域在缺口处照常断开。
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def _finite(y: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.isfinite(y))
+
+
+def _with_breaks(y: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """在选出的下标中加入每段连续 NaN 的第一个点（断点）"""
+    missing = ~np.isfinite(y)
+    if not missing.any():
+        return idx
+    starts = np.flatnonzero(missing & ~np.concatenate(([False], missing[:-1])))
+    return np.union1d(idx, starts)
+
+
+def _lttb(xv: np.ndarray, yv: np.ndarray, n_out: int) -> np.ndarray:
+    n = len(yv)
+    # 首尾两点固定，中间 n - 2 个点分成 n_out - 2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges[-1] = n - 1
+    # 用前缀和求每个桶的平均点（下一个桶的代表点）
+    cx = np.concatenate(([0.0], np.cumsum(xv)))
+    cy = np.concatenate(([0.0], np.cumsum(yv)))
+    next_lo = np.append(edges[1:-1], n - 1)
+    next_hi = np.append(edges[2:], n)
+    counts = next_hi - next_lo
+    avg_x = (cx[next_hi] - cx[next_lo]) / counts
+    avg_y = (cy[next_hi] - cy[next_lo]) / counts
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        ax, ay = xv[a], yv[a]
+        # 以上一个选中点和下一个桶的平均点为底，取三角形面积最大的点
+        area = np.abs((ax - avg_x[i]) * (yv[lo:hi] - ay) - (ax - xv[lo:hi]) * (avg_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return np.unique(out)
+
+
+def lttb_indices(y, n_out: int, x=None) -> np.ndarray:
+    """LTTB 降采样，返回保留点的下标（升序）"""
+    y = np.asarray(y, dtype=float)
+    if n_out >= len(y) or n_out < 3:
+        return np.arange(len(y))
+    valid = _finite(y)
+    n = len(valid)
+    if n_out >= n:
+        return _with_breaks(y, valid)
+    xv = valid.astype(float) if x is None else np.asarray(x, dtype=float)[valid]
+    yv = y[valid]
+    if n > 4 * n_out:
+        # 点数远多于目标时先用向量化的最值分桶预选候选点，LTTB 只在候选点上循环（MinMaxLTTB）
+        candidates = minmax_indices(yv, 2 * n_out)
+        return _with_breaks(y, valid[candidates[_lttb(xv[candidates], yv[candidates], n_out)]])
+    return _with_breaks(y, valid[_lttb(xv, yv, n_out)])
+
+
+def _buckets(values: np.ndarray, n_buckets: int, fill: float) -> Tuple[np.ndarray, int]:
+    """按等长分桶并补齐，返回 (桶数 × 桶长 的二维数组, 桶长)"""
+    size = -(-len(values) // n_buckets)
+    padded = np.full(size * (-(-len(values) // size)), fill)
+    padded[:len(values)] = values
+    return padded.reshape(-1, size), size
+
+
+def minmax_indices(y, n_buckets: int) -> np.ndarray:
+    """每个桶保留最小值和最大值的点（以及首尾点），返回下标（升序）"""
+    y = np.asarray(y, dtype=float)
+    if n_buckets < 1 or len(y) <= 2 * n_buckets:
+        return np.arange(len(y))
+    valid = _finite(y)
+    n = len(valid)
+    if n <= 2 * n_buckets:
+        return _with_breaks(y, valid)
+    yv = y[valid]
+    lows, size = _buckets(yv, n_buckets, np.inf)
+    highs, _ = _buckets(yv, n_buckets, -np.inf)
+    starts = np.arange(len(lows)) * size
+    keep = np.concatenate(([0, n - 1], starts + lows.argmin(axis=1), starts + highs.argmax(axis=1)))
+    return _with_breaks(y, valid[np.unique(keep)])
+
+
+def bucket_bars(x, y, n_buckets: int, width: float = 0.8):
+    """
+    柱状图降采样：每个桶合并为一根柱子
+    :param x: 柱子位置（如 matplotlib 日期数值）
+    :param width: 单根柱子占相邻柱间距的比例（与 Axes.bar 默认的 0.8 一致）
+    :return: (位置, 高度, 柱宽)；点数不超过 n_buckets 时原样返回
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if n_buckets < 1 or len(x) <= n_buckets:
+        return x, y, width
+
+    spacing = float(np.median(np.diff(x)))
+    heights, size = _buckets(np.nan_to_num(y), n_buckets, 0.0)
+    rows = np.arange(len(heights))
+    heights = heights[rows, np.abs(heights).argmax(axis=1)]  # 保留绝对值最大的那根（含正负号）
+    first = rows * size
+    last = np.minimum(first + size, len(x)) - 1
+    centers = (x[first] + x[last]) / 2
+    widths = (x[last] - x[first] + spacing) * width  # 按桶覆盖的日期跨度
+    return centers, heights, widths
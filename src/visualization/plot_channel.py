@@ -0,0 +1,62 @@
+import matplotlib.pyplot as plt
+
+from .chart import ChartTemplate
+
+# 设置中文字体
+plt.rcParams['font.sans-serif'] = ['SimHei']  # 使用黑体
+plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+
+
+class ChannelChart(ChartTemplate):
+    """价格通道图模板：收盘价叠加上轨 / 中轨 / 下轨（子类指定列名和标题）"""
+    FIGSIZE = (16, 8)
+    TITLE = ""
+    UPPER, MIDDLE, LOWER = "", "", ""
+
+    def build(self):
+        self.ax1 = self.fig.add_subplot(1, 1, 1)
+        self.axes = [self.ax1]
+        self.close_line, = self.ax1.plot([], [], label='收盘价', lw=2, color='black')
+        self.upper_line, = self.ax1.plot([], [], label=self.UPPER, lw=1.5, linestyle='--', color='red')
+        self.middle_line, = self.ax1.plot([], [], label=self.MIDDLE, lw=1, linestyle=':', color='blue')
+        self.lower_line, = self.ax1.plot([], [], label=self.LOWER, lw=1.5, linestyle='--', color='green')
+        self.ax1.legend(loc='best', fontsize=10)
+        self.ax1.grid(True, alpha=0.3)
+
+    def update(self, df, dates, index, stock_code):
+        self.ax1.set_title(f"{stock_code} {self.TITLE}")
+        self.close_line.set_data(*self.line(dates, df['收盘']))
+        # 上下轨保留每个像素内的极值，预热期的 NaN 不绘制
+        self.upper_line.set_data(*self.envelope(dates, df[self.UPPER]))
+        self.middle_line.set_data(*self.line(dates, df[self.MIDDLE]))
+        self.lower_line.set_data(*self.envelope(dates, df[self.LOWER]))
+
+
+class DonchianChart(ChannelChart):
+    """唐奇安通道图模板"""
+    TITLE = "唐奇安通道"
+    UPPER, MIDDLE, LOWER = '唐奇安上轨', '唐奇安中轨', '唐奇安下轨'
+
+
+class KeltnerChart(ChannelChart):
+    """肯特纳通道图模板"""
+    TITLE = "肯特纳通道"
+    UPPER, MIDDLE, LOWER = '肯特纳上轨', '肯特纳中轨', '肯特纳下轨'
+
+
+def plot_donchian_channel(df, stock_code, width_px=None):
+    """
+    唐奇安通道可视化
+    :param width_px: 目标像素宽度，超过该宽度的数据会被降采样；None 取图形宽度，0 不降采样
+    """
+    DonchianChart(width_px).render(df, stock_code).enable_zoom()
+    plt.show()
+
+
+def plot_keltner_channel(df, stock_code, width_px=None):
+    """
+    肯特纳通道可视化
+    :param width_px: 目标像素宽度，超过该宽度的数据会被降采样；None 取图形宽度，0 不降采样
+    """
+    KeltnerChart(width_px).render(df, stock_code).enable_zoom()
+    plt.show()
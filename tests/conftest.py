@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# 源码以 src/ 为根目录导入（import config、from indicators import ...），与各命令行入口一致
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+import analyze
+from analyze import EXIT_FAILED, EXIT_OK, EXIT_PARTIAL, AnalysisResult, analyze_batch, exit_code
+from data_processing.price_store import PriceStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2024-01-01", periods=120)
+    close = 10 + np.cumsum(rng.normal(0, 0.2, len(dates)))
+    store = PriceStore(tmp_path / "store")
+    store.write("300100", pd.DataFrame({'日期': dates, '开盘': close, '收盘': close, '最高': close + 0.3,
+                                        '最低': close - 0.3, '成交量': np.full(len(dates), 1000.0)}))
+    return store
+
+
+def test_exit_code():
+    ok, failed = AnalysisResult("300100", "MACD", "ok"), AnalysisResult("999999", "MACD", "failed")
+    assert exit_code([ok, ok]) == EXIT_OK
+    assert exit_code([ok, failed]) == EXIT_PARTIAL
+    assert exit_code([failed, failed]) == EXIT_FAILED
+
+
+def test_partial_failure_and_slicing(store, tmp_path):
+    results = analyze_batch(["300100", "999999"], [("MACD", {}), ("Donchian", {"window": 10})],
+                            tmp_path / "out", store.root, "20240301", "20240329", ('csv', 'json'),
+                            max_workers=1, progress=False)
+    by_symbol = {}
+    for r in results:
+        by_symbol.setdefault(r.symbol, []).append(r)
+    assert [r.status for r in by_symbol["999999"]] == ["failed", "failed"]
+    assert all(r.status == "ok" and r.rows == 21 and len(r.paths) == 2 for r in by_symbol["300100"])
+    assert exit_code(results) == EXIT_PARTIAL
+
+    csv = pd.read_csv(next(p for p in by_symbol["300100"][0].paths if p.endswith(".csv")),
+                      index_col=0, parse_dates=True)
+    assert csv.index[0] == pd.Timestamp("2024-03-01") and csv.index[-1] == pd.Timestamp("2024-03-29")
+    # 指标在完整历史上计算，区间开头没有预热期的 NaN，且与直接计算的结果一致
+    from indicators.pipeline import build_indicator
+    expected = build_indicator("MACD").calculate(store.read_frame("300100"))
+    np.testing.assert_allclose(csv["MACD"], expected.loc["2024-03-01":"2024-03-29", "MACD"], rtol=1e-9)
+
+
+def test_cli_exit_codes(store, tmp_path):
+    common = ["--store-root", str(store.root), "--output-dir", str(tmp_path / "out"), "--workers", "1",
+              "--no-progress", "--timings", str(tmp_path / "timings.json")]
+    runner = CliRunner()
+    assert runner.invoke(analyze.app, ["300100", *common]).exit_code == EXIT_OK
+    assert runner.invoke(analyze.app, ["300100,999999", *common]).exit_code == EXIT_PARTIAL
+    assert runner.invoke(analyze.app, ["300100", "--indicator", "NoSuch", *common]).exit_code == analyze.EXIT_USAGE
+    assert runner.invoke(analyze.app, ["300100", "--format", "xml", *common]).exit_code == analyze.EXIT_USAGE
+
+
+@pytest.mark.filterwarnings("ignore:Glyph")   # 测试环境可能没有中文字体
+def test_chart_output(store, tmp_path):
+    results = analyze_batch(["300100"], [("MACD", {}), ("Donchian", {})], tmp_path / "out", store.root,
+                            "20240301", None, ('png',), max_workers=1, progress=False)
+    assert [r.status for r in results] == ["ok", "ok"]
+    for r in results:
+        assert len(r.paths) == 1 and open(r.paths[0], "rb").read(4) == b"\x89PNG"
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators.backtest import LIMIT_TOLERANCE, CostModel, backtest, price_limit
+from indicators.panel import Panel
+
+COSTS = CostModel(commission=0.001, stamp_duty=0.002, slippage=0.0005, price_limits=True)
+
+
+def make_panel(n_dates=120, symbols=('300001', '600001', '600002'), seed=0):
+    rng = np.random.default_rng(seed)
+    shape = (n_dates, len(symbols))
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.03, shape), axis=0))
+    # 隔夜跳空，偶尔触及涨跌停
+    gap = np.clip(rng.normal(0, 0.02, shape) + rng.choice([0, 0.25, -0.25], shape, p=[0.9, 0.05, 0.05]), -0.3, 0.3)
+    open_ = np.vstack([close[:1], close[:-1] * (1 + gap[1:])])
+    mask = rng.random(shape) > 0.1                  # 随机停牌
+    mask[:rng.integers(0, 30), 2] = False           # 第三只股票晚上市
+    mask[-40:, 1] = False                           # 第二只股票提前退市（压紧后末尾有补位）
+    data = {'开盘': open_, '收盘': close, '最高': np.maximum(open_, close), '最低': np.minimum(open_, close),
+            '成交量': np.ones(shape)}
+    return Panel(pd.date_range('2024-01-01', periods=n_dates, name='日期'), list(symbols), data, mask)
+
+
+def naive_backtest(open_, close, symbol, entry, exit, costs):
+    """逐根K线的参考实现：只用该股票自己的有效K线"""
+    limit = price_limit(symbol)
+    pos_prev = target_prev = 0.0
+    equity, trades, turnover = 1.0, 0, 0.0
+    for i in range(len(close)):
+        gap = open_[i] / close[i - 1] - 1 if i else np.nan
+        desired = target_prev
+        if costs.price_limits and i:
+            if desired > pos_prev and gap >= limit - LIMIT_TOLERANCE:
+                desired = pos_prev
+            if desired < pos_prev and gap <= -limit + LIMIT_TOLERANCE:
+                desired = pos_prev
+        pos = desired
+        trade = pos - pos_prev
+        cost = abs(trade) * (costs.commission + costs.slippage) + max(-trade, 0) * costs.stamp_duty
+        overnight = 0.0 if np.isnan(gap) else gap
+        equity *= (1 + pos_prev * overnight) * (1 + pos * (close[i] / open_[i] - 1)) - cost
+        trades += trade > 0
+        turnover += abs(trade)
+        pos_prev = pos
+
+        enter = entry(open_, close, i)
+        leave = exit(open_, close, i) if exit else not enter
+        target_prev = 0.0 if leave else 1.0 if enter else target_prev
+    return equity - 1, trades, turnover / len(close)
+
+
+def crosses_above(open_, close, i):
+    return i > 0 and close[i - 1] <= open_[i - 1] and close[i] > open_[i]
+
+
+def crosses_below(open_, close, i):
+    return i > 0 and close[i - 1] >= open_[i - 1] and close[i] < open_[i]
+
+
+@pytest.mark.parametrize("exit", [None, ["收盘 crosses_below 开盘"]])
+def test_backtest_matches_naive_loop(exit):
+    panel = make_panel()
+    result = backtest(panel, ["收盘 crosses_above 开盘"], exit, costs=COSTS)
+    stats = result.stats.set_index('symbol')
+    for j, symbol in enumerate(panel.symbols):
+        rows = panel.mask[:, j]
+        open_, close = panel.data['开盘'][rows, j], panel.data['收盘'][rows, j]
+        total, trades, turnover = naive_backtest(open_, close, symbol, crosses_above,
+                                                 crosses_below if exit else None, COSTS)
+        assert stats.loc[symbol, 'total_return'] == pytest.approx(total, rel=1e-9, abs=1e-12)
+        assert stats.loc[symbol, 'trades'] == trades
+        assert stats.loc[symbol, 'turnover'] == pytest.approx(turnover)
+        assert stats.loc[symbol, 'bars'] == rows.sum()
+
+
+def test_no_phantom_exit_after_last_bar():
+    # 一只股票 4 根K线、另一只 8 根：压紧后前者末尾有补位，持仓到最后不应被记为一次卖出
+    dates = pd.date_range('2024-01-01', periods=8, name='日期')
+    close = np.full((8, 2), 10.0)
+    mask = np.ones((8, 2), dtype=bool)
+    mask[4:, 0] = False
+    data = {'开盘': close.copy(), '收盘': close, '最高': close, '最低': close, '成交量': np.ones((8, 2))}
+    panel = Panel(dates, ['600001', '600002'], data, mask)
+
+    stats = backtest(panel, ["收盘 > 0"], costs=CostModel(price_limits=False)).stats.set_index('symbol')
+    assert stats.loc['600001', 'trades'] == 1
+    assert stats.loc['600001', 'turnover'] == pytest.approx(0.25)
+    assert stats.loc['600002', 'turnover'] == pytest.approx(1 / 8)
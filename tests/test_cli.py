@@ -0,0 +1,39 @@
+import pytest
+import typer
+
+from utils.cli import parse_indicator, parse_params, parse_symbols
+
+
+def test_parse_symbols(tmp_path):
+    assert parse_symbols(" 300100, 600276 ,,") == ['300100', '600276']
+    watchlist = tmp_path / "watchlist.txt"
+    watchlist.write_text("# 自选\n300100\n\n600276\n", encoding='utf-8')
+    assert parse_symbols(f"@{watchlist}") == ['300100', '600276']
+
+
+def test_parse_indicator():
+    assert parse_indicator("MACD") == ("MACD", {})
+    assert parse_indicator("Keltner(multiplier=1.5, window=10)") == ("Keltner", {"multiplier": 1.5, "window": 10})
+    assert parse_indicator("薛斯通道(N=40,M=10)") == ("薛斯通道", {"N": 40, "M": 10})
+    with pytest.raises(typer.BadParameter):
+        parse_indicator("MACD(fast)")
+    with pytest.raises(typer.BadParameter):
+        parse_indicator("MACD(")
+
+
+def test_parse_params():
+    assert parse_params(["max_iter=200", "loss=absolute_error", "flag=True"]) == \
+        {"max_iter": 200, "loss": "absolute_error", "flag": True}
+    with pytest.raises(typer.BadParameter):
+        parse_params(["=1"])
+
+
+def test_scan_and_backtest_params():
+    from backtest import parse_grid
+    from scan import parse_params as parse_scan_params
+
+    assert parse_scan_params(["MACD.fast_period=8", "Keltner.ma= ema "]) == \
+        {"MACD": {"fast_period": 8}, "Keltner": {"ma": "ema"}}
+    assert parse_grid(["MACD.fast_period=8, 12", "MACD.signal=9"]) == {"MACD": {"fast_period": [8, 12], "signal": [9]}}
+    with pytest.raises(typer.BadParameter):
+        parse_grid(["fast_period=8"])
@@ -0,0 +1,150 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from data_processing.data_downloader import RetryPolicy, StockDataDownloader
+from data_processing.price_store import PriceStore
+from data_processing.sources import SOURCES, DataSource, EastmoneySource, create_source
+
+DAYS = pd.bdate_range('2024-01-02', '2024-01-12')
+
+
+class FakeEastmoney(BaseHTTPRequestHandler):
+    """东方财富 K 线接口的假服务：按股票代码返回固定的K线，可让指定股票先失败若干次"""
+    fail_first = {}     # 代码 -> 先返回 500 的次数（-1 表示一直失败）
+    empty = set()       # 返回 data=null 的代码
+    requests = []       # 收到的 (代码, beg, end)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        symbol = query['secid'].split('.')[1]
+        type(self).requests.append((symbol, query['beg'], query['end']))
+        remaining = self.fail_first.get(symbol, 0)
+        if remaining:
+            self.fail_first[symbol] = remaining - 1 if remaining > 0 else remaining
+            self.send_response(500)
+            self.end_headers()
+            return
+        if url.path != EastmoneySource.KLINE_PATH or symbol in self.empty:
+            payload = {"data": None}
+        else:
+            beg, end = pd.Timestamp(query['beg']), pd.Timestamp(query['end'])
+            klines = [f"{day:%Y-%m-%d},{10 + i},{10.5 + i},{11 + i},{9.5 + i},{1000 + i},0,0,0,0,0"
+                      for i, day in enumerate(DAYS) if beg <= day <= end]
+            payload = {"data": {"code": symbol, "klines": klines}}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RecordingRetry(RetryPolicy):
+    """记录每次重试前计算出的等待时间，实际只等待很短的时间"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.delays = []
+
+    def delay(self, attempt: int) -> float:
+        self.delays.append(super().delay(attempt))
+        return 0.001
+
+
+@pytest.fixture
+def fake_server():
+    FakeEastmoney.fail_first, FakeEastmoney.empty, FakeEastmoney.requests = {}, set(), []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeEastmoney)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def download(base_url, store, symbols, end_date, retry):
+    source = EastmoneySource(base_url=base_url, timeout=5)
+    downloader = StockDataDownloader(symbols, "20240101", end_date, store=store, source=source,
+                                     max_concurrency=4, rate_limit=None, retry=retry)
+    try:
+        return downloader.download_data()
+    finally:
+        source.close()
+
+
+def test_download_retry_backoff_and_report(fake_server, tmp_path):
+    FakeEastmoney.fail_first = {'000002': 2, '000003': -1}
+    FakeEastmoney.empty = {'000004'}
+    retry = RecordingRetry(max_retries=3, base_delay=1.0, max_delay=3.0, jitter=0.0)
+    store = PriceStore(tmp_path)
+
+    report = download(fake_server, store, ['000001', '000002', '000003', '000004'], "20240108", retry)
+    results = {r.symbol: r for r in report.results}
+
+    assert [r.symbol for r in report.results] == ['000001', '000002', '000003', '000004']
+    assert (results['000001'].status, results['000001'].attempts, results['000001'].rows_added) == ("rewritten", 1, 5)
+    # 两次 500 后成功：共 3 次请求
+    assert (results['000002'].status, results['000002'].attempts, results['000002'].rows_total) == ("rewritten", 3, 5)
+    # 一直失败：首次请求 + max_retries 次重试，之后记为失败并给出错误
+    assert results['000003'].status == "failed" and results['000003'].attempts == 4
+    assert "500" in results['000003'].error
+    # 数据源返回空结果（DataSourceError）不重试
+    assert results['000004'].status == "failed" and results['000004'].attempts == 1
+    assert results['000004'].error.startswith("DataSourceError")
+    # 指数退避：000002 两次（1, 2），000003 三次（1, 2, 4 截断为 3）
+    assert sorted(retry.delays) == [1.0, 1.0, 2.0, 2.0, 3.0]
+
+    assert [r.symbol for r in report.failed] == ['000003', '000004']
+    frame = report.to_frame()
+    assert list(frame['status']) == ["rewritten", "rewritten", "failed", "failed"]
+    assert "failed 2" in report.summary() and "rewritten 2" in report.summary()
+    assert store.rows('000001') == 5 and not store.has('000003')
+
+
+def test_download_incremental_update(fake_server, tmp_path):
+    store = PriceStore(tmp_path)
+    retry = RecordingRetry(max_retries=0)
+    download(fake_server, store, ['000001'], "20240105", retry)
+    assert store.rows('000001') == 4
+
+    FakeEastmoney.requests = []
+    report = download(fake_server, store, ['000001'], "20240112", retry)
+    result = report.results[0]
+    # 增量请求从最后一根已存储的K线开始（用于校验复权价格），只追加新的K线
+    assert FakeEastmoney.requests == [('000001', '20240105', '20240112')]
+    assert (result.status, result.rows_added, result.rows_total) == ("updated", 5, 9)
+
+    report = download(fake_server, store, ['000001'], "20240112", retry)
+    assert report.results[0].status == "up_to_date" and report.results[0].attempts == 0
+
+
+def test_create_source(monkeypatch):
+    monkeypatch.delenv("STOCK_DATA_SOURCE", raising=False)
+    monkeypatch.setenv("STOCK_DATA_SOURCE_URL", "http://127.0.0.1:9/")
+    source = create_source("eastmoney")
+    assert isinstance(source, EastmoneySource) and source.base_url == "http://127.0.0.1:9"
+
+    monkeypatch.setenv("STOCK_DATA_SOURCE", "EastMoney")
+    assert isinstance(create_source(), EastmoneySource)
+    with pytest.raises(ValueError):
+        create_source("yahoo")
+
+    # 未设置环境变量时默认 akshare（替换注册表中的类，测试环境不需要安装 akshare）
+    class DefaultSource(DataSource):
+        def fetch_hist(self, symbol, start_date, end_date, adjust="qfq"):
+            raise NotImplementedError
+
+    monkeypatch.setitem(SOURCES, 'akshare', DefaultSource)
+    monkeypatch.delenv("STOCK_DATA_SOURCE")
+    assert isinstance(create_source(), DefaultSource)
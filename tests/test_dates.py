@@ -0,0 +1,18 @@
+from datetime import datetime
+
+import pandas as pd
+
+from utils.dates import HISTORY_START, check_data_update_needed, get_latest_trading_day, history_start
+
+
+def test_latest_trading_day():
+    assert get_latest_trading_day(datetime(2024, 6, 28)) == "20240628"   # 周五
+    assert get_latest_trading_day(datetime(2024, 6, 30)) == "20240628"   # 周日
+    assert check_data_update_needed(None)
+    assert not check_data_update_needed(pd.Timestamp(get_latest_trading_day()))
+
+
+def test_history_start_ignores_later_window():
+    assert history_start(None) == HISTORY_START
+    assert history_start("20250601") == HISTORY_START
+    assert history_start("2020-01-01") == "20200101"
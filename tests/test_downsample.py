@@ -0,0 +1,45 @@
+import numpy as np
+
+from visualization.downsample import lttb_indices, minmax_indices
+
+
+def with_gaps(n, seed=0):
+    y = np.cumsum(np.random.default_rng(seed).normal(size=n))
+    y[:30] = np.nan            # 预热期
+    y[500:520] = np.nan        # 停牌缺口
+    return y
+
+
+def test_no_downsampling_returns_every_point():
+    y = with_gaps(1000)
+    np.testing.assert_array_equal(lttb_indices(y, 1000), np.arange(1000))
+    np.testing.assert_array_equal(minmax_indices(y, 500), np.arange(1000))
+
+
+def test_downsampling_keeps_nan_breaks():
+    y = with_gaps(5000)
+    for idx in (lttb_indices(y, 200), minmax_indices(y, 100), lttb_indices(y, 2000)):
+        assert np.all(np.diff(idx) > 0)
+        assert len(idx) < len(y)
+        # 每段 NaN 的第一个点保留，缺口两侧的有效点不会被直接连起来
+        assert {0, 500} <= set(idx.tolist())
+        assert np.isnan(y[idx]).sum() == 2
+
+
+def test_downsampling_keeps_extremes_and_ends():
+    y = np.sin(np.linspace(0, 20, 10_000))
+    y[1234] = 5.0
+    idx = minmax_indices(y, 100)
+    assert {0, 1234, 9999} <= set(idx.tolist())
+    idx = lttb_indices(y, 300)
+    assert {0, 1234, 9999} <= set(idx.tolist())
+    assert len(idx) <= 300
+
+
+def test_mostly_missing_series():
+    y = np.full(1000, np.nan)
+    y[::100] = 1.0
+    idx = lttb_indices(y, 50)
+    # 有效点少于目标点数：保留全部有效点和所有断点
+    assert set(np.flatnonzero(~np.isnan(y))) <= set(idx.tolist())
+    assert np.isnan(y[idx]).sum() == 10
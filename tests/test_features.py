@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+import features
+from features import FeatureSpec, build_features, load_features, partition_of
+from data_processing.price_store import PriceStore
+
+SYMBOLS = ['000001', '000002', '300100', '600000', '600276', '688185']
+
+
+def make_prices(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        '日期': pd.bdate_range('2023-01-02', periods=n),
+        '开盘': close, '收盘': close, '最高': close * 1.01, '最低': close * 0.99,
+        '成交量': np.full(n, 1000),
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceStore(tmp_path / "store")
+    for i, symbol in enumerate(SYMBOLS):
+        store.write(symbol, make_prices(120 + i, i))
+    return store
+
+
+def test_default_lag_columns_follow_indicators():
+    spec = FeatureSpec(indicators=[("MACD", {}), ("Keltner", {"multiplier": 1.5})], lags=(1, 2, 3))
+    assert spec.resolve_lag_columns() == ('ret_1', 'Hist')
+    assert FeatureSpec().resolve_lag_columns() == ('ret_1', 'Hist', 'ADX')
+
+    explicit = FeatureSpec(indicators=[("MACD", {})], lag_columns=('ADX',))
+    with pytest.raises(KeyError, match="ADX"):
+        explicit.resolve_lag_columns()
+
+
+def test_build_with_default_lag_columns(store, tmp_path):
+    spec = FeatureSpec(indicators=[("MACD", {}), ("Keltner", {"multiplier": 1.5})], lags=(1, 2, 3))
+    result = build_features(None, spec, store.root, tmp_path / "features", partitions=2, progress=False)
+    df = load_features(root=tmp_path / "features")
+    assert result.rows == len(df) == sum(store.rows(s) for s in SYMBOLS)
+    assert {'Hist_lag3', 'ret_1_lag1'} <= set(df.columns)
+    assert not any(col.startswith('ADX') for col in df.columns)
+
+
+def test_explicit_missing_lag_column_fails_before_building(store, tmp_path):
+    spec = FeatureSpec(indicators=[("MACD", {})], lag_columns=('ADX',))
+    with pytest.raises(KeyError):
+        build_features(None, spec, store.root, tmp_path / "features", partitions=2, progress=False)
+    assert not (tmp_path / "features").exists()
+
+
+def test_cli_docstring_example(store, tmp_path):
+    args = ["--indicator", "MACD", "--indicator", "Keltner(multiplier=1.5)", "--lags", "1,2,3", "--force",
+            "--partitions", "2", "--store-root", str(store.root), "--output-dir", str(tmp_path / "features")]
+    assert CliRunner().invoke(features.app, args).exit_code == 0
+    bad = CliRunner().invoke(features.app, args[:-4] + ["--lag-columns", "ADX", "--output-dir", str(tmp_path / "bad")])
+    assert bad.exit_code == 2
+    assert not (tmp_path / "bad").exists()
+
+
+def test_subset_build_keeps_other_symbols_and_partitions(store, tmp_path):
+    output = tmp_path / "features"
+    spec = FeatureSpec(indicators=[("MACD", {})])
+    build_features(None, spec, store.root, output, partitions=3, progress=False)
+    before = load_features(root=output)
+
+    # 追加一根K线后只更新一只股票：所在分区重算，分区里其他股票和其余分区都保留
+    target = '300100'
+    store.append(target, make_prices(200, 99).iloc[-1:].assign(日期=pd.Timestamp('2024-06-03')))
+    result = build_features([target], spec, store.root, output, partitions=3, progress=False)
+    assert result.built == [partition_of(target, 3)] and result.removed == []
+
+    after = load_features(root=output)
+    assert sorted(after['代码'].unique()) == SYMBOLS
+    assert len(after) == len(before) + 1
+    # 之后的全量运行认为所有分区都是最新的
+    result = build_features(None, spec, store.root, output, partitions=3, progress=False)
+    assert result.built == [] and len(result.skipped) == len({partition_of(s, 3) for s in SYMBOLS})
+
+    with pytest.raises(ValueError, match="分区数"):
+        build_features([target], spec, store.root, output, partitions=4, progress=False)
@@ -0,0 +1,117 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indicators.cache import IndicatorCache
+from indicators.technical import TechnicalIndicator
+
+
+class Blocking(TechnicalIndicator):
+    """计算时等待 release，用于检查计算不占用缓存的锁"""
+    INDICATOR_NAME = "Blocking"
+
+    def __init__(self, started: threading.Event, release: threading.Event):
+        self._started, self._release = started, release
+
+    def compute(self, ctx):
+        self._started.set()
+        assert self._release.wait(5)
+        return {"blocking": np.zeros(3)}
+
+
+class Doubled(TechnicalIndicator):
+    INDICATOR_NAME = "Doubled"
+
+    def compute(self, ctx):
+        return {"doubled": np.arange(3.0)}
+
+
+def test_compute_outside_lock():
+    df = pd.DataFrame({"收盘": [1.0, 2.0, 3.0]}, index=pd.date_range("2024-01-01", periods=3))
+    cache = IndicatorCache(disk_dir=None)
+    started, release = threading.Event(), threading.Event()
+    worker = threading.Thread(target=cache.get_outputs, args=(Blocking(started, release), df))
+    worker.start()
+    try:
+        assert started.wait(5)
+        # 另一个线程正在计算时，其余指标的查询和计算不被阻塞
+        outputs = cache.get_outputs(Doubled(), df)
+        assert cache.get_outputs(Doubled(), df) is outputs
+    finally:
+        release.set()
+        worker.join(5)
+    assert not worker.is_alive()
+    assert (cache.stats.memory_hits, cache.stats.misses) == (1, 2)
+    assert len(cache._memory) == 2
+
+
+def prices(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.normal(0, 0.2, n))
+    return pd.DataFrame({"开盘": close, "收盘": close, "最高": close + 0.3, "最低": close - 0.3,
+                         "成交量": rng.integers(1000, 5000, n).astype(float)},
+                        index=pd.date_range("2024-01-01", periods=n, freq="B"))
+
+
+def test_memory_and_disk_hits(tmp_path):
+    from indicators.pipeline import build_indicator
+
+    df = prices()
+    cache = IndicatorCache(disk_dir=tmp_path)
+    first = cache.calculate(build_indicator("MACD"), df)
+    pd.testing.assert_frame_equal(first, build_indicator("MACD").calculate(df))
+    cache.get_outputs(build_indicator("MACD"), df)
+    assert (cache.stats.memory_hits, cache.stats.disk_hits, cache.stats.misses) == (1, 0, 1)
+
+    cache.clear()
+    outputs = cache.get_outputs(build_indicator("MACD"), df)
+    assert (cache.stats.memory_hits, cache.stats.disk_hits, cache.stats.misses) == (1, 1, 1)
+    np.testing.assert_allclose(outputs["MACD"], first["MACD"])
+    assert [p.suffix for p in tmp_path.iterdir()] == [".npz"]
+
+    cache.clear(disk=True)
+    assert not list(tmp_path.iterdir())
+    cache.get_outputs(build_indicator("MACD"), df)
+    assert cache.stats.misses == 2
+
+
+def test_memory_lru_eviction():
+    from indicators.pipeline import build_indicator
+
+    df = prices()
+    cache = IndicatorCache(max_items=2, disk_dir=None)
+    for window in (5, 10, 5, 20):   # 访问 5 后它比 10 新，加入 20 时淘汰 10
+        cache.get_outputs(build_indicator("Donchian", {"window": window}), df)
+    assert len(cache._memory) == 2
+    cache.get_outputs(build_indicator("Donchian", {"window": 5}), df)
+    cache.get_outputs(build_indicator("Donchian", {"window": 10}), df)
+    assert (cache.stats.memory_hits, cache.stats.misses) == (2, 4)
+
+
+def test_disk_eviction(tmp_path):
+    from indicators.pipeline import build_indicator
+
+    df = prices()
+    cache = IndicatorCache(disk_dir=tmp_path)
+    cache.get_outputs(build_indicator("Donchian", {"window": 5}), df)
+    (tmp_path / "unfinished.tmp").write_bytes(b"x" * 100)   # 正在写入的临时文件不参与淘汰
+    cache.max_disk_bytes = 2 * next(tmp_path.glob("*.npz")).stat().st_size   # 各结果大小相同，只能保留两个
+    cache.get_outputs(build_indicator("Donchian", {"window": 10}), df)
+    cache.get_outputs(build_indicator("Donchian", {"window": 20}), df)
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+    assert (tmp_path / "unfinished.tmp").exists()
+    cache.clear(disk=True)
+    assert [p.name for p in tmp_path.iterdir()] == ["unfinished.tmp"]
+
+
+def test_key_depends_on_params_and_used_columns():
+    from indicators.pipeline import build_indicator
+
+    df = prices()
+    cache = IndicatorCache(disk_dir=None)
+    key = cache.key(build_indicator("Donchian"), df)
+    assert cache.key(build_indicator("Donchian", {"window": 10}), df) != key
+    assert cache.key(build_indicator("Donchian"), df.assign(最高=df["最高"] + 1)) != key
+    # Donchian 不读取收盘价和成交量
+    assert cache.key(build_indicator("Donchian"), df.assign(收盘=0.0, 成交量=0.0)) == key
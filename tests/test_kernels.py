@@ -0,0 +1,77 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import kernels
+
+BACKENDS = ['numpy'] + (['numba'] if importlib.util.find_spec("numba") else [])
+
+
+def series_with_gaps(n=600, m=3, seed=0):
+    """(日期 × 股票) 随机游走，带开头的 NaN、中间的停牌缺口和常数段"""
+    rng = np.random.default_rng(seed)
+    values = 10 + np.cumsum(rng.normal(size=(n, m)), axis=0)
+    values[:7, 0] = np.nan
+    values[100:130, 1] = np.nan
+    values[rng.random((n, m)) < 0.05] = np.nan
+    values[200:260, 2] = 5.0
+    return values
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("op", kernels.ROLLING_OPS)
+@pytest.mark.parametrize("window,min_periods", [(1, None), (20, None), (20, 5), (50, 1)])
+def test_rolling_matches_pandas(backend, op, window, min_periods):
+    values = series_with_gaps()
+    expected = getattr(pd.DataFrame(values).rolling(window, min_periods=min_periods), op)().to_numpy()
+    result = kernels.rolling(values, window, op, min_periods, backend=backend)
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+    # 单只股票（1-D）与面板中的对应列一致
+    np.testing.assert_array_equal(kernels.rolling(values[:, 1], window, op, min_periods, backend=backend),
+                                  result[:, 1])
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("alpha", [0.5, 2 / 13, 1 / 14, 1.0])
+def test_ewm_matches_pandas(backend, alpha):
+    values = series_with_gaps()
+    expected = pd.DataFrame(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    result = kernels.ewm(values, alpha, backend=backend)
+    np.testing.assert_array_equal(result, expected)   # 运算顺序与 pandas 相同，逐位一致
+    np.testing.assert_array_equal(kernels.ewm(values[:, 0], alpha, backend=backend), result[:, 0])
+    np.testing.assert_array_equal(kernels.wilder(values, 14, backend=backend),
+                                  kernels.ewm(values, 1 / 14, backend=backend))
+
+
+@pytest.mark.skipif(len(BACKENDS) < 2, reason="需要 numba")
+def test_backends_agree():
+    values = series_with_gaps(seed=1)
+    for op in kernels.ROLLING_OPS:
+        np.testing.assert_allclose(kernels.rolling(values, 10, op, 3, backend='numba'),
+                                   kernels.rolling(values, 10, op, 3, backend='numpy'),
+                                   rtol=1e-12, equal_nan=True)
+    np.testing.assert_array_equal(kernels.ewm(values, 0.1, backend='numba'),
+                                  kernels.ewm(values, 0.1, backend='numpy'))
+    filled = np.nan_to_num(values)
+    alpha = np.random.default_rng(2).uniform(0.01, 0.5, filled.shape)
+    for x, a in ((filled, alpha), (filled[:, 0], alpha[:, 0])):
+        np.testing.assert_array_equal(kernels.recursive_filter(x, a, backend='numba'),
+                                      kernels.recursive_filter(x, a, backend='numpy'))
+
+
+def test_recursive_filter_matches_loop():
+    rng = np.random.default_rng(3)
+    x, alpha = rng.normal(size=200), rng.uniform(0.05, 0.9, 200)
+    expected = np.empty_like(x)
+    expected[0] = x[0]
+    for i in range(1, len(x)):
+        expected[i] = alpha[i] * x[i] + (1 - alpha[i]) * expected[i - 1]
+    for backend in BACKENDS:
+        np.testing.assert_array_equal(kernels.recursive_filter(x, alpha, backend=backend), expected)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        kernels.rolling(np.zeros(5), 2, 'sum', backend='python')
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing.loader import load_many, load_ohlcv, symbol_from_filename
+
+CSV = """﻿日期,股票代码,开盘,收盘,最高,最低,成交量,成交额
+2024-01-03,300100,10.1,10.5,10.8,10.0,12345.0,1.2e7
+2024-01-02,300100,10.0,10.2,10.4,9.9,,1.1e7
+bad-date,300100,1,1,1,1,1,1
+2024-01-04,300100,10.5,10.4,10.6,10.2,2000,2.1e7
+"""
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "300100_双林股份_his_20240104.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+def test_dtypes_and_date_index(path):
+    df = load_ohlcv(path)
+    assert list(df.columns) == ['开盘', '收盘', '最高', '最低', '成交量']
+    assert df.index.name == '日期' and isinstance(df.index, pd.DatetimeIndex)
+    # 无效日期被丢弃，乱序的行按日期排序
+    assert list(df.index) == list(pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04']))
+    assert (df.dtypes[['开盘', '收盘', '最高', '最低']] == np.float64).all()
+    assert df['成交量'].dtype == np.int64 and list(df['成交量']) == [0, 12345, 2000]
+    assert df.loc['2024-01-03', '收盘'] == 10.5
+
+
+def test_price_dtype_and_columns(path):
+    df = load_ohlcv(path, columns=['收盘', '成交量'], price_dtype='float32')
+    assert list(df.columns) == ['收盘', '成交量']
+    assert df['收盘'].dtype == np.float32 and df['成交量'].dtype == np.int64
+    np.testing.assert_allclose(df['收盘'], [10.2, 10.5, 10.4], rtol=1e-6)
+
+    assert list(load_ohlcv(path, columns=['日期', '最高']).columns) == ['最高']
+    with pytest.raises(KeyError, match="成交额"):
+        load_ohlcv(path, columns=['成交额'])
+
+
+def test_load_many(path, tmp_path):
+    other = tmp_path / "600276_恒瑞医药_his_20240104.csv"
+    other.write_text(CSV, encoding="utf-8")
+    frames = load_many([path, other], max_workers=2, columns=['收盘'])
+    assert list(frames) == ['300100', '600276'] and all(list(df.columns) == ['收盘'] for df in frames.values())
+    assert list(load_many({'x': path})) == ['x']
+
+    assert symbol_from_filename("AAPL_Apple_his_20240104.csv") == "AAPL"
+    with pytest.raises(ValueError):
+        symbol_from_filename("prices.csv")
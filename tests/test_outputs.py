@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators.pipeline import build_indicator
+from indicators.technical import assemble_outputs
+
+
+@pytest.fixture
+def df():
+    close = 20 + np.sin(np.arange(120) / 5)
+    return pd.DataFrame({'开盘': close, '收盘': close, '最高': close + 0.5, '最低': close - 0.5,
+                         '成交量': np.full(120, 1000)}, index=pd.date_range('2024-01-01', periods=120, name='日期'))
+
+
+def test_assemble_outputs_modes(df):
+    outputs = {"a": np.arange(120.0), "b": pd.Series(np.ones(120), index=df.index)}
+
+    frame = assemble_outputs(df, outputs)
+    assert list(frame.columns) == [*df.columns, "a", "b"] and "a" not in df.columns
+    assert np.shares_memory(frame['收盘'].to_numpy(), df['收盘'].to_numpy())   # 不复制输入数据
+
+    columns = assemble_outputs(df, outputs, 'columns')
+    assert list(columns.columns) == ["a", "b"] and columns.index.equals(df.index)
+
+    arrays = assemble_outputs(df, outputs, 'arrays', dtype=np.float32)
+    assert set(arrays) == {"a", "b"} and all(v.dtype == np.float32 for v in arrays.values())
+    assert assemble_outputs(df, outputs, 'arrays')["a"] is outputs["a"]      # 类型相同时不复制
+    assert assemble_outputs(df, outputs, 'arrays', copy=True)["a"] is not outputs["a"]
+
+    target = df.copy()
+    assert assemble_outputs(target, outputs, inplace=True) is target and "a" in target.columns
+
+    with pytest.raises(ValueError):
+        assemble_outputs(df, outputs, 'series')
+    with pytest.raises(ValueError):
+        assemble_outputs(df, outputs, 'arrays', inplace=True)
+
+
+@pytest.mark.parametrize("name", ["MACD", "ADX", "Donchian", "Keltner", "薛斯通道"])
+def test_calculate_output_contract(df, name):
+    indicator = build_indicator(name)
+    frame = indicator.calculate(df)
+    outputs = [col for col in frame.columns if col not in df.columns]
+    assert set(indicator.OUTPUT_COLUMNS) <= set(outputs) and list(df.columns) == ['开盘', '收盘', '最高', '最低', '成交量']
+
+    columns = indicator.calculate(df, output='columns', dtype=np.float32)
+    assert list(columns.columns) == outputs and (columns.dtypes == np.float32).all()
+    np.testing.assert_allclose(columns.to_numpy(dtype=float), frame[outputs].to_numpy(dtype=float),
+                               rtol=1e-6, atol=1e-5, equal_nan=True)
+
+    arrays = indicator.calculate(df, output='arrays')
+    assert list(arrays) == outputs and all(isinstance(v, np.ndarray) for v in arrays.values())
+
+    target = df.copy()
+    assert indicator.calculate(target, inplace=True) is target and set(outputs) <= set(target.columns)
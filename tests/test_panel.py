@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from indicators.panel import Panel
+
+
+def test_panel_does_not_mutate_caller_arrays():
+    dates = pd.date_range('2024-01-01', periods=3, name='日期')
+    close = np.array([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+    data = {'收盘': close}
+    mask = np.array([[True, False], [True, True], [False, True]])
+
+    panel = Panel(dates, ['a', 'b'], data, mask)
+
+    assert data['收盘'] is close
+    np.testing.assert_array_equal(close, [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+    assert np.isnan(panel.data['收盘'][~mask]).all()
+    np.testing.assert_array_equal(panel.data['收盘'][mask], close[mask])
+
+
+def test_panel_without_invalid_values_shares_arrays():
+    dates = pd.date_range('2024-01-01', periods=2, name='日期')
+    close = np.array([[1.0, np.nan], [2.0, 3.0]])
+    panel = Panel(dates, ['a', 'b'], {'收盘': close})
+    assert panel.data['收盘'] is close
+    np.testing.assert_array_equal(panel.mask, [[True, False], [True, True]])
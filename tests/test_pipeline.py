@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import primitives
+from indicators.pipeline import IndicatorPipeline, build_indicator, request_label
+from indicators.primitives import PrimitiveContext
+
+REQUESTS = [("MACD", {}), ("MACD", {"fast_period": 8}), ("ADX", {}), ("Keltner", {"atr_window": 14})]
+
+
+def make_prices(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({'开盘': close, '收盘': close, '最高': close * 1.01, '最低': close * 0.99,
+                         '成交量': np.full(n, 1000.0)}, index=pd.date_range('2024-01-01', periods=n, name='日期'))
+
+
+@pytest.fixture
+def contexts(monkeypatch):
+    """记录流水线创建的原语上下文"""
+    created = []
+    original = PrimitiveContext.from_frame.__func__
+
+    def from_frame(cls, df):
+        ctx = original(cls, df)
+        created.append(ctx)
+        return ctx
+
+    monkeypatch.setattr(PrimitiveContext, "from_frame", classmethod(from_frame))
+    return created
+
+
+def test_shared_primitives_computed_once(contexts, monkeypatch):
+    calls = {}
+    for name, func in list(primitives.PRIMITIVES.items()):
+        def counted(*args, _name=name, _func=func):
+            calls[_name] = calls.get(_name, 0) + 1
+            return _func(*args)
+        monkeypatch.setitem(primitives.PRIMITIVES, name, counted)
+
+    pipeline = IndicatorPipeline(REQUESTS)
+    pipeline.run(make_prices())
+    ctx, = contexts
+    assert len(ctx.computed) == len(set(ctx.computed)) == len(pipeline.plan())
+    # 两组 MACD 共用慢线 EMA，ADX 与 Keltner 共用 Wilder 平滑的真实波幅
+    assert ctx.computed.count(('ema', ('field', '收盘'), 26)) == 1
+    assert ctx.computed.count(('wilder', ('tr',), 14)) == 1
+    assert calls['tr'] == 1 and calls['field'] == 3      # 收盘、最高、最低各读取一次
+
+    separate = sum(len(set(primitives.topological_order(build_indicator(n, p).primitives())))
+                   for n, p in REQUESTS)
+    assert len(ctx.computed) < separate
+
+
+def test_outputs_match_calculate():
+    df = make_prices()
+    results = IndicatorPipeline(REQUESTS + [("MACD", {})]).run(df)
+    assert list(results) == ["MACD", "MACD(fast_period=8)", "ADX", "Keltner(atr_window=14)"]
+    for name, params in REQUESTS:
+        indicator = build_indicator(name, params)
+        label = request_label(indicator, params)
+        expected = indicator.calculate(df, output='columns')
+        assert set(results[label]) == set(expected.columns)
+        for column in expected.columns:
+            np.testing.assert_allclose(np.asarray(results[label][column], dtype=float),
+                                       expected[column].to_numpy(dtype=float), rtol=1e-12, equal_nan=True)
+
+    frame = IndicatorPipeline([("MACD", {}), ("MACD", {"fast_period": 8})]).run_frame(df)
+    assert {"MACD.MACD", "MACD(fast_period=8).MACD"} <= set(frame.columns)
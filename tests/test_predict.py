@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing.price_store import PriceStore
+from features import FeatureSpec, build_features, feature_partitions, load_features
+from modeling.predict import FeatureIndex, MicroBatcher, Predictor, score_features
+
+SYMBOLS = ['000001', '000002', '300100', '600000', '600276', '688185']
+FEATURES = ['MACD', 'ret_1']
+
+
+class SumModel:
+    """得分 = 特征之和，记录每次调用的行数"""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        if self.fail:
+            raise RuntimeError("模型出错")
+        return np.nansum(np.asarray(X, dtype=float), axis=1)
+
+
+def make_predictor(model=None):
+    return Predictor(model or SumModel(), FEATURES, 'fwd_ret_5', None, {})
+
+
+@pytest.fixture(scope="module")
+def feature_root(tmp_path_factory):
+    root = tmp_path_factory.mktemp("predict")
+    store = PriceStore(root / "store")
+    rng = np.random.default_rng(0)
+    for i, symbol in enumerate(SYMBOLS):
+        n = 40 + 2 * i     # 各股票最后日期不同
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        store.write(symbol, pd.DataFrame({'日期': pd.bdate_range('2024-01-01', periods=n), '开盘': close,
+                                          '收盘': close, '最高': close * 1.01, '最低': close * 0.99,
+                                          '成交量': np.full(n, 1000)}))
+    build_features(None, FeatureSpec(indicators=[("MACD", {})]), store.root, root / "features",
+                   partitions=2, progress=False)
+    assert len(feature_partitions(root / "features")) == 2
+    return root / "features"
+
+
+def expected_scores(frame):
+    return np.nansum(frame[FEATURES].to_numpy(dtype=np.float32).astype(float), axis=1)
+
+
+def test_score_latest_and_given_date(feature_root):
+    features = load_features(root=feature_root)
+    predictor = make_predictor()
+    latest = score_features(predictor, feature_root, progress=False)
+    assert list(latest['代码']) == [SYMBOLS[-1]] and (latest['日期'] == features['日期'].max()).all()
+
+    day = pd.Timestamp('2024-02-01')
+    result = score_features(predictor, feature_root, date='20240201', symbols=['000001', '600276', '999999'],
+                            progress=False)
+    assert sorted(result['代码']) == ['000001', '600276'] and (result['日期'] == day).all()
+    expected = features[(features['日期'] == day) & features['代码'].isin(['000001', '600276'])]
+    assert result.set_index('代码')['score'].to_dict() == \
+        pytest.approx(dict(zip(expected['代码'], expected_scores(expected))))
+
+
+def test_score_batches_across_partitions(feature_root):
+    features = load_features(root=feature_root)
+    model = SumModel()
+    result = score_features(make_predictor(model), feature_root, all_dates=True, progress=False)
+    assert model.calls == [len(features)]      # 两个分区的行合并成一批
+
+    model = SumModel()
+    result = score_features(make_predictor(model), feature_root, all_dates=True, batch_rows=50, progress=False)
+    assert sum(model.calls) == len(features) and len(model.calls) > 2
+    assert all(n < 100 for n in model.calls)
+    merged = result.merge(features, on=['代码', '日期'])
+    np.testing.assert_allclose(merged['score'], expected_scores(merged), rtol=1e-6)
+
+
+def test_feature_index_lookup(feature_root):
+    features = load_features(root=feature_root)
+    index = FeatureIndex(feature_root, FEATURES)
+    last = features.groupby('代码').tail(1).set_index('代码')
+
+    codes, dates, X, missing = index.lookup(['600276', '999999', '000001'])
+    assert codes == ['600276', '000001'] and missing == ['999999']
+    assert dates == [str(last.loc[c, '日期'].date()) for c in codes]
+    np.testing.assert_array_equal(X, last.loc[codes, FEATURES].to_numpy(dtype=np.float32))
+
+    codes, dates, X, missing = index.lookup(['000001', '688185', '999999'], date='2024-02-15')
+    assert codes == ['000001', '688185'] and dates == ['2024-02-15'] * 2 and missing == ['999999']
+    row = features[(features['代码'] == '688185') & (features['日期'] == '2024-02-15')]
+    np.testing.assert_array_equal(X[1], row[FEATURES].to_numpy(dtype=np.float32)[0])
+
+    # 000001 只有 40 根K线（到 2024-02-23），688185 有 50 根
+    codes, _, X, missing = index.lookup(['000001', '688185'], date='2024-03-01')
+    assert codes == ['688185'] and missing == ['000001'] and X.shape == (1, 2)
+
+
+def test_micro_batcher_merges_and_slices():
+    model = SumModel()
+    batcher = MicroBatcher(make_predictor(model), max_batch=1000, max_wait=0.5)
+    try:
+        requests = [np.full((n, 2), i, dtype=np.float32) for i, n in enumerate((1, 3, 2), start=1)]
+        futures = []
+        threads = [threading.Thread(target=lambda X=X: futures.append((X, batcher.submit(X)))) for X in requests]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for X, future in futures:
+            np.testing.assert_array_equal(future.result(5), X.sum(axis=1))
+        assert model.calls == [6]
+        assert batcher.stats.count == 1 and batcher.stats.rows == 6
+    finally:
+        batcher.close()
+
+
+def test_micro_batcher_propagates_errors():
+    batcher = MicroBatcher(make_predictor(SumModel(fail=True)), max_wait=0.2)
+    try:
+        futures = [batcher.submit(np.zeros((2, 2), dtype=np.float32)) for _ in range(3)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="模型出错"):
+                future.result(5)
+        # 批处理线程继续运行
+        batcher.predictor = make_predictor()
+        np.testing.assert_array_equal(batcher.submit(np.ones((1, 2))).result(5), [2.0])
+    finally:
+        batcher.close()
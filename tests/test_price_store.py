@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from loguru import logger
+
+from data_processing.columnar import append_table, read_meta, read_table, write_table
+from data_processing.price_store import PriceStore, normalize_prices
+
+
+def make_prices(dates, volume=None):
+    dates = pd.to_datetime(dates)
+    n = len(dates)
+    close = np.arange(1, n + 1, dtype=float)
+    return pd.DataFrame({
+        '日期': dates,
+        '开盘': close - 0.5,
+        '收盘': close,
+        '最高': close + 1,
+        '最低': close - 1,
+        '成交量': np.arange(100, 100 + n) if volume is None else volume,
+    })
+
+
+def test_columnar_round_trip_and_append(tmp_path):
+    columns = {'date': np.array(['2024-01-02', '2024-01-03'], dtype='datetime64[D]'),
+               'close': np.array([1.5, 2.5])}
+    write_table(tmp_path / "t", columns, {"start": "2024-01-01"})
+    append_table(tmp_path / "t", {'date': np.array(['2024-01-04'], dtype='datetime64[D]'),
+                                  'close': np.array([3.5])})
+
+    meta = read_meta(tmp_path / "t")
+    assert meta["rows"] == 3 and meta["start"] == "2024-01-01"
+    for mmap in (True, False):
+        table = read_table(tmp_path / "t", mmap=mmap)
+        np.testing.assert_array_equal(table['close'], [1.5, 2.5, 3.5])
+        assert table['date'].dtype == np.dtype('datetime64[D]')
+
+
+def test_columnar_rejects_mismatched_columns(tmp_path):
+    with pytest.raises(ValueError):
+        write_table(tmp_path / "t", {'a': np.zeros(2), 'b': np.zeros(3)})
+    assert read_meta(tmp_path / "t") is None
+
+
+def test_write_read_round_trip(tmp_path):
+    store = PriceStore(tmp_path)
+    df = make_prices(['2024-01-02', '2024-01-03', '2024-01-04'])
+    assert store.write('300100', df, start='2023-12-01') == 3
+
+    frame = store.read_frame('300100')
+    assert list(frame.columns) == ['开盘', '收盘', '最高', '最低', '成交量']
+    assert frame.index.name == '日期'
+    np.testing.assert_array_equal(frame['收盘'], df['收盘'])
+    np.testing.assert_array_equal(frame['成交量'], df['成交量'])
+    assert frame['成交量'].dtype == np.int64
+    assert store.history_start('300100') == pd.Timestamp('2023-12-01')
+    assert store.date_range('300100') == (pd.Timestamp('2024-01-02'), pd.Timestamp('2024-01-04'))
+
+    arrays = store.read_arrays('300100', start='2024-01-03', columns=['收盘'])
+    assert set(arrays) == {'日期', '收盘'}
+    np.testing.assert_array_equal(arrays['收盘'], [2.0, 3.0])
+    np.testing.assert_array_equal(store.read_arrays('300100', tail=1)['收盘'], [3.0])
+
+
+def test_append_skips_old_and_duplicate_dates(tmp_path):
+    store = PriceStore(tmp_path)
+    store.write('300100', make_prices(['2024-01-02', '2024-01-03']))
+    version = store.version('300100')
+
+    # 与已存储日期重叠的K线被忽略，只追加更新的日期
+    assert store.append('300100', make_prices(['2024-01-03', '2024-01-04', '2024-01-05'])) == 2
+    assert store.append('300100', make_prices(['2024-01-04'])) == 0
+    assert store.version('300100') != version
+
+    dates = store.read_frame('300100').index
+    assert list(dates) == list(pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']))
+    assert store.rows('300100') == 4
+
+
+def test_normalize_sorts_and_keeps_last_duplicate():
+    df = make_prices(['2024-01-03', '2024-01-02', '2024-01-03'])
+    columns = normalize_prices(df)
+    np.testing.assert_array_equal(columns['date'], np.array(['2024-01-02', '2024-01-03'], dtype='datetime64[D]'))
+    # 2024-01-03 出现两次，保留最后一条（收盘 3）
+    np.testing.assert_array_equal(columns['close'], [2.0, 3.0])
+
+
+def test_normalize_logs_missing_volume():
+    messages = []
+    sink = logger.add(messages.append, level="WARNING")
+    try:
+        columns = normalize_prices(make_prices(['2024-01-02', '2024-01-03'], volume=[np.nan, 5.0]))
+    finally:
+        logger.remove(sink)
+    np.testing.assert_array_equal(columns['volume'], [0, 5])
+    assert len(messages) == 1 and "2024-01-02" in messages[0]
+
+
+def test_missing_symbol(tmp_path):
+    store = PriceStore(tmp_path)
+    assert not store.has('300100')
+    assert store.version('300100') is None
+    assert store.history_start('300100') is None
+    assert store.symbols() == []
@@ -0,0 +1,29 @@
+import time
+
+from profiling import Timings, format_summary, symbol_scope
+
+
+def test_symbol_totals_skip_nested_stages():
+    timings = Timings()
+    with symbol_scope("300100"):
+        with timings.stage("calculate:MACD"):
+            with timings.stage("primitive:ema"):
+                time.sleep(0.02)
+        with timings.stage("save"):
+            time.sleep(0.01)
+
+    other = Timings()
+    with other.stage("calculate:MACD", "300100"):
+        pass
+    timings.merge(other.snapshot())
+
+    summary = timings.summary()
+    stages = summary["symbols"]["300100"]
+    assert stages["primitive:ema"]["top_seconds"] == 0.0
+    assert stages["calculate:MACD"]["count"] == 2
+    assert stages["calculate:MACD"]["top_seconds"] == stages["calculate:MACD"]["seconds"]
+    assert stages["calculate:MACD"]["seconds"] >= stages["primitive:ema"]["seconds"] >= 0.02
+
+    total = stages["calculate:MACD"]["seconds"] + stages["save"]["seconds"]
+    line = format_summary(summary, 1.0).splitlines()[-1]
+    assert line == f"耗时最多的股票：300100 {total:.3f}s"
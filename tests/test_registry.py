@@ -0,0 +1,77 @@
+from pathlib import Path
+import subprocess
+import sys
+
+from loguru import logger
+import pytest
+
+from indicators.register import INDICATOR_MANIFEST, IndicatorRegistry, register_indicator
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+def run_python(code: str) -> str:
+    """在新的解释器中运行（当前进程已导入过各指标模块）"""
+    result = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+def test_indicator_modules_imported_on_first_access():
+    out = run_python(
+        "import sys\n"
+        "from indicators import INDICATOR_REGISTRY\n"
+        "loaded = lambda: sorted(m for m in sys.modules if m.startswith('indicators.indicator_'))\n"
+        "names = list(INDICATOR_REGISTRY)\n"
+        "assert 'MACD' in INDICATOR_REGISTRY and len(INDICATOR_REGISTRY) == len(names)\n"
+        "print(loaded())\n"
+        "INDICATOR_REGISTRY['MACD']\n"
+        "print(loaded())\n"
+        "print(sorted(INDICATOR_REGISTRY.loaded()))\n"
+    )
+    assert out.splitlines() == ["[]", "['indicators.indicator_macd']", "['MACD']"]
+
+
+def test_config_setup_deferred():
+    out = run_python(
+        "import sys\n"
+        "import config\n"
+        "print('dotenv' in sys.modules, 'loguru' in sys.modules)\n"
+        "config.setup()\n"
+        "from loguru import logger\n"
+        "sinks = len(logger._core.handlers)\n"
+        "config.setup()\n"
+        "print('dotenv' in sys.modules, sinks == len(logger._core.handlers))\n"
+    )
+    assert out.splitlines() == ["False False", "True True"]
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(sink)
+
+
+def test_failed_import_is_isolated(warnings):
+    registry = IndicatorRegistry({**INDICATOR_MANIFEST, "Broken": "no_such_module:Broken"})
+    assert "Broken" in registry
+    with pytest.raises(KeyError):
+        registry["Broken"]
+    assert registry["MACD"].INDICATOR_NAME == "MACD"
+    assert len(warnings) == 1 and "indicators.no_such_module" in warnings[0]
+
+    register_indicator("no_such_module")
+    assert len(warnings) == 2
+
+
+def test_registry_mapping():
+    registry = IndicatorRegistry({"MACD": "indicator_macd:MACD"})
+    custom = type("Custom", (), {"INDICATOR_NAME": "Custom"})
+    registry["Custom"] = custom
+    assert list(registry) == ["MACD", "Custom"] and registry["Custom"] is custom
+    del registry["MACD"]
+    assert "MACD" not in registry and len(registry) == 1
+    with pytest.raises(KeyError):
+        registry["MACD"]
@@ -0,0 +1,80 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing.price_store import PriceStore
+from server import AnalysisServer, AnalysisService, MarketData
+from utils.cli import parse_flag
+
+
+@pytest.fixture
+def base_url(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2024-01-01", periods=120)
+    close = 10 + np.cumsum(rng.normal(0, 0.2, len(dates)))
+    store = PriceStore(tmp_path)
+    store.write("300100", pd.DataFrame({'日期': dates, '开盘': close, '收盘': close, '最高': close + 0.3,
+                                        '最低': close - 0.3, '成交量': np.full(len(dates), 1000.0)}))
+    server = AnalysisServer(("127.0.0.1", 0), AnalysisService(MarketData(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def get(url):
+    try:
+        with urlopen(url, timeout=30) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+    except HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read()
+
+
+def test_parse_flag():
+    assert [parse_flag(v) for v in ("1", "true", "Yes", True)] == [True] * 4
+    assert [parse_flag(v) for v in ("0", "false", "", None, False)] == [False] * 5
+
+
+def test_indicator_prices_and_tail(base_url):
+    status, _, body = get(f"{base_url}/indicator?symbol=300100&indicator=MACD&tail=5&prices=0")
+    data = json.loads(body)
+    assert status == 200 and len(data["dates"]) == 5
+    assert "收盘" not in data["columns"] and "MACD" in data["columns"]
+
+    status, _, body = get(f"{base_url}/indicator?symbol=300100&indicator=MACD&tail=5&prices=1")
+    data = json.loads(body)
+    assert status == 200 and "收盘" in data["columns"] and len(data["columns"]["收盘"]) == 5
+
+    status, _, body = get(f"{base_url}/indicator?symbol=300100&indicator=MACD&start=20240301&end=20240329"
+                          "&fast_period=8&format=csv")
+    lines = body.decode("utf-8").splitlines()
+    assert status == 200 and lines[1].startswith("2024-03-01") and lines[-1].startswith("2024-03-29")
+
+
+@pytest.mark.filterwarnings("ignore:Glyph")   # 测试环境可能没有中文字体
+def test_indicator_chart_width(base_url):
+    status, content_type, body = get(f"{base_url}/indicator?symbol=300100&indicator=MACD&format=png&width=200")
+    assert status == 200 and content_type == "image/png" and body.startswith(b"\x89PNG")
+    status, _, body = get(f"{base_url}/indicator?symbol=300100&indicator=MACD&format=png&width=abc")
+    assert status == 400
+
+
+def test_indicator_errors(base_url):
+    status, _, body = get(f"{base_url}/indicator?symbol=999999&indicator=MACD")
+    assert status == 404 and "999999" in json.loads(body)["error"]
+    assert get(f"{base_url}/indicator?symbol=300100")[0] == 400
+    assert get(f"{base_url}/indicator?symbol=300100&indicator=MACD&format=xml")[0] == 400
+
+    request = Request(f"{base_url}/indicator", method="POST",
+                      data=json.dumps({"symbol": "300100", "indicator": "MACD", "tail": 3, "prices": False}).encode())
+    with urlopen(request, timeout=30) as response:
+        data = json.loads(response.read())
+    assert len(data["dates"]) == 3 and "收盘" not in data["columns"]
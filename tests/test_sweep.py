@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators.pipeline import build_indicator
+from indicators.sweep import expand_grid, parameter_sweep
+
+
+def make_prices(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({'开盘': close, '收盘': close, '最高': close * 1.01, '最低': close * 0.99,
+                         '成交量': rng.integers(1_000, 100_000, n).astype(float)},
+                        index=pd.date_range('2024-01-01', periods=n, name='日期'))
+
+
+def last_values(outputs):
+    return {name: float(np.asarray(values)[-1]) for name, values in outputs.items()}
+
+
+def test_expand_grid():
+    assert expand_grid({"a": [1, 2], "b": "x"}) == [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}]
+
+
+@pytest.mark.parametrize("name,grid", [
+    ("MACD", {"fast_period": [8, 12], "slow_period": [21, 26]}),
+    ("薛斯通道", {"N": [40, 50], "M": [5, 10]}),
+])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sweep_matches_calculate(name, grid, workers):
+    frames = {"300100": make_prices(seed=0), "600276": make_prices(seed=1)}
+    table = parameter_sweep(name, grid, frames, max_workers=workers)
+    combos = expand_grid(grid)
+    assert len(table) == len(frames) * len(combos) * 200
+
+    for symbol, df in frames.items():
+        for params in combos:
+            expected = build_indicator(name, params).calculate(df, output='columns')
+            mask = (table['symbol'] == symbol) & np.logical_and.reduce([table[k] == v for k, v in params.items()])
+            rows = table[mask]
+            np.testing.assert_array_equal(rows['日期'].to_numpy(), df.index.to_numpy())
+            for column in expected.columns:
+                np.testing.assert_allclose(rows[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                                           rtol=1e-12, equal_nan=True)
+
+
+def test_sweep_with_reducer():
+    frames = {"300100": make_prices()}
+    grid = {"fast_period": [8, 12], "slow_period": [26]}
+    table = parameter_sweep("MACD", grid, frames, reducer=last_values, max_workers=1)
+    assert len(table) == 2
+    for params in expand_grid(grid):
+        expected = build_indicator("MACD", params).calculate(frames["300100"], output='columns').iloc[-1]
+        row = table[table['fast_period'] == params['fast_period']].iloc[0]
+        assert row['MACD'] == pytest.approx(expected['MACD'], rel=1e-12)
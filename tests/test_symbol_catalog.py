@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+import json
+
+import pandas as pd
+import pytest
+
+from data_processing.sources import DataSource, LISTING_COLUMNS
+from data_processing.symbol_catalog import SymbolCatalog
+
+
+class FakeSource(DataSource):
+    """返回固定股票列表，记录请求次数"""
+
+    def __init__(self, names=None, fail=False):
+        self.names = names or {"300100": "双林股份", "600276": "恒瑞医药"}
+        self.fail = fail
+        self.listings = 0
+        self.lookups = []
+
+    def fetch_hist(self, symbol, start_date, end_date, adjust="qfq"):
+        raise NotImplementedError
+
+    def fetch_listing(self):
+        self.listings += 1
+        if self.fail:
+            raise ConnectionError("列表接口不可用")
+        return pd.DataFrame([(code, name, "sh" if code.startswith("6") else "sz", "20100101")
+                             for code, name in self.names.items()], columns=LISTING_COLUMNS)
+
+    def fetch_name(self, symbol):
+        self.lookups.append(symbol)
+        return "新股"
+
+
+def test_lookup_by_code_and_persist(tmp_path):
+    source = FakeSource()
+    catalog = SymbolCatalog(tmp_path / "symbols.json", source=source)
+    assert catalog.name("600276") == "恒瑞医药"
+    assert catalog.get("300100").exchange == "sz"
+    assert source.listings == 1 and "300100" in catalog and len(catalog) == 2
+
+    # 列表中没有的代码单独请求一次并写回目录
+    assert catalog.name("301999") == "新股" and catalog.name("301999") == "新股"
+    assert source.lookups == ["301999"]
+    assert catalog.get("688999", fetch_missing=False) is None
+
+    reloaded = SymbolCatalog(tmp_path / "symbols.json", source=FakeSource())
+    assert not reloaded.is_stale() and reloaded.name("301999") == "新股"
+    assert reloaded.source.listings == 0
+
+
+def test_ttl_expiry_and_refresh(tmp_path):
+    source = FakeSource()
+    catalog = SymbolCatalog(tmp_path / "symbols.json", ttl=timedelta(hours=1), source=source)
+    catalog.name("300100")
+    catalog.name("600276")
+    assert source.listings == 1
+
+    catalog.refreshed_at = datetime.now() - timedelta(hours=2)
+    source.names["600276"] = "恒瑞医药新"
+    assert catalog.is_stale()
+    assert catalog.name("600276") == "恒瑞医药新" and source.listings == 2
+    assert not catalog.is_stale()
+    assert catalog.refresh() == 2 and source.listings == 2   # 未过期时不请求
+    assert catalog.refresh(force=True) == 2 and source.listings == 3
+
+
+def test_refresh_failure_keeps_old_catalog(tmp_path):
+    SymbolCatalog(tmp_path / "symbols.json", source=FakeSource()).refresh()
+    failing = FakeSource(fail=True)
+    catalog = SymbolCatalog(tmp_path / "symbols.json", ttl=timedelta(0), source=failing)
+    assert catalog.is_stale()
+    assert catalog.name("300100") == "双林股份"
+    catalog.name("600276")
+    assert failing.listings == 1        # 失败后一段时间内不再重试
+
+    empty = SymbolCatalog(tmp_path / "other.json", source=FakeSource(fail=True))
+    with pytest.raises(ConnectionError):
+        empty.name("300100")
+    assert empty.name("300100", default="") == ""
+
+
+@pytest.mark.parametrize("content", ["", "{not json", json.dumps({"symbols": {}})])
+def test_corrupt_or_missing_file(tmp_path, content):
+    path = tmp_path / "symbols.json"
+    if content:
+        path.write_text(content, encoding="utf-8")
+    source = FakeSource()
+    catalog = SymbolCatalog(path, source=source)
+    assert len(catalog) == 0 and catalog.is_stale()
+    assert catalog.name("300100") == "双林股份" and source.listings == 1
+    assert json.loads(path.read_text(encoding="utf-8"))["symbols"]["300100"]["name"] == "双林股份"
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modeling import train
+from modeling.train import TrainingData, final_fold, fold_key, run_fold, walk_forward_folds
+
+
+@pytest.fixture
+def data(tmp_path):
+    """两只股票 × 40 个交易日的小训练矩阵"""
+    rng = np.random.default_rng(0)
+    days = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-02-10"))
+    dates = np.repeat(days, 2)
+    X = rng.normal(size=(len(dates), 3)).astype(np.float32)
+    np.save(tmp_path / "X.npy", X)
+    np.save(tmp_path / "y.npy", (X[:, 0] + rng.normal(scale=0.1, size=len(dates))).astype(np.float32))
+    np.save(tmp_path / "dates.npy", dates)
+    np.save(tmp_path / "symbols.npy", np.tile(["300100", "600276"], len(days)))
+    (tmp_path / "meta.json").write_text(json.dumps({"features": ["a", "b", "c"], "target": "fwd_ret_5",
+                                                   "digest": "test"}), encoding="utf-8")
+    return TrainingData.open(tmp_path)
+
+
+def test_run_fold_cache(data, tmp_path):
+    fold = walk_forward_folds(np.asarray(data.dates), valid_days=10, gap_days=2, min_train_days=20)[0]
+    first = run_fold(data.path, fold, "ridge", {"alpha": 1.0}, tmp_path / "cache")
+    second = run_fold(data.path, fold, "ridge", {"alpha": 1.0}, tmp_path / "cache")
+    assert not first.cached and second.cached
+    assert second.metrics == first.metrics and second.n_train == first.n_train == 40
+
+    final = final_fold(np.asarray(data.dates), train_days=30)
+    assert final.valid is None and final.train == slice(20, 80)
+
+
+def test_fold_key_versioned(data, monkeypatch):
+    fold = final_fold(np.asarray(data.dates))
+    key = fold_key(data, fold, "ridge", {})
+    monkeypatch.setattr(train, "FOLD_CACHE_VERSION", train.FOLD_CACHE_VERSION + 1)
+    assert fold_key(data, fold, "ridge", {}) != key
+
+
+def test_cli_writes_only_to_given_dirs(tmp_path):
+    from typer.testing import CliRunner
+
+    from data_processing.price_store import PriceStore
+    from features import FeatureSpec, build_features
+
+    rng = np.random.default_rng(0)
+    store = PriceStore(tmp_path / "store")
+    for symbol in ("300100", "600276"):
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, 150)))
+        store.write(symbol, pd.DataFrame({'日期': pd.bdate_range('2023-01-02', periods=150), '开盘': close,
+                                          '收盘': close, '最高': close * 1.01, '最低': close * 0.99,
+                                          '成交量': np.full(150, 1000)}))
+    build_features(None, FeatureSpec(indicators=[("MACD", {})]), store.root, tmp_path / "features",
+                   partitions=1, progress=False)
+
+    args = ["--feature-dir", str(tmp_path / "features"), "--model", "ridge", "--valid-days", "20",
+            "--min-train-days", "40", "--data-dir", str(tmp_path / "training"),
+            "--cache-dir", str(tmp_path / "folds"), "--model-path", str(tmp_path / "model.joblib"),
+            "--report-path", str(tmp_path / "folds.csv")]
+    result = CliRunner().invoke(train.app, args)
+    assert result.exit_code == 0, result.output
+    assert len(list((tmp_path / "training").glob("*/X.npy"))) == 1
+    assert list((tmp_path / "folds").glob("*.joblib")) and (tmp_path / "model.joblib").exists()